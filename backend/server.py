@@ -1,12 +1,21 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, WriteConcern
+from pymongo.errors import BulkWriteError, PyMongoError
+import asyncio
+import base64
+import binascii
+import json
 import os
+import sys
 import logging
+from collections import OrderedDict
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
 import uuid
 from datetime import datetime
 
@@ -14,6 +23,12 @@ from datetime import datetime
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# The scraper lives at the repository root. It is imported when the worker
+# pool starts, so the rest of the API works without it.
+sys.path.insert(0, str(ROOT_DIR.parent))
+if TYPE_CHECKING:
+    from html_scraper_mejorado import HTMLToMarkdownScraper
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
@@ -35,6 +50,330 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+# Only the fields of StatusCheck are read back from MongoDB
+STATUS_CHECK_PROJECTION = {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+STATUS_CHECK_SORT = [("timestamp", ASCENDING), ("id", ASCENDING)]
+
+# A job keeps the Markdown of every URL in memory until it is evicted
+MAX_URLS_PER_JOB = int(os.environ.get('SCRAPER_MAX_URLS_PER_JOB', '100'))
+
+class ScrapeJobCreate(BaseModel):
+    urls: List[str] = Field(min_length=1, max_length=MAX_URLS_PER_JOB)
+
+class ScrapeResult(BaseModel):
+    url: str
+    status: str = "pending"  # pending, running, done, failed, cancelled
+    markdown: Optional[str] = None
+    error: Optional[str] = None
+    words: int = 0
+    duration_ms: Optional[float] = None
+
+class ScrapeJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"  # queued, running, done, cancelled
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    results: List[ScrapeResult] = []
+
+
+# Scraper config when SCRAPER_CONFIG is not set: no batch URLs, no log files
+SERVICE_SCRAPER_CONFIG = {
+    "urls": [],
+    "urls_file": None,
+    "output_dir": str(ROOT_DIR / "scraper_output"),
+    "logging": {"console": True, "file": False},
+}
+
+class ScrapeWorkerPool:
+    """
+    Long-lived scraper shared by a fixed set of worker tasks.
+
+    The browser and its page pool are opened once at startup and stay warm
+    between jobs, so a job only pays for navigation and conversion. URLs from
+    every job go through one queue; cancelling a job skips its queued URLs
+    and cancels the ones in flight.
+
+    If the scraper cannot start (missing dependency, config or browser) the
+    pool stays unavailable and the job endpoints answer 503.
+    """
+
+    def __init__(self, config_path: Optional[str], workers: int, retention: int, allow_file_urls: bool,
+                 retention_chars: int = 256 * 1024 * 1024):
+        self.config_path = config_path
+        self.workers = workers
+        self.retention = retention
+        self.retention_chars = retention_chars
+        self.stored_chars = 0
+        self.allow_file_urls = allow_file_urls
+        self.scraper: Optional["HTMLToMarkdownScraper"] = None
+        self.error: Optional[str] = "not started"
+        self.jobs: "OrderedDict[str, ScrapeJob]" = OrderedDict()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight: Dict[str, Set[asyncio.Task]] = {}
+
+    @property
+    def available(self) -> bool:
+        return self.scraper is not None
+
+    def require_available(self) -> None:
+        if not self.available:
+            raise HTTPException(status_code=503, detail=f"Scraper unavailable: {self.error}")
+
+    async def start(self) -> None:
+        scraper = None
+        try:
+            if self.config_path is not None and not Path(self.config_path).is_file():
+                # The scraper would silently fall back to its built-in URLs
+                raise FileNotFoundError(f"SCRAPER_CONFIG not found: {self.config_path}")
+            from html_scraper_mejorado import HTMLToMarkdownScraper
+            scraper = HTMLToMarkdownScraper(self.config_path or SERVICE_SCRAPER_CONFIG)
+            # Pages in the pool match the number of workers
+            scraper.config['options']['max_concurrent'] = self.workers
+            await scraper.start()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            logger.exception("Scrape worker pool could not start; /api/jobs will answer 503")
+            if scraper is not None:
+                await asyncio.gather(scraper.close(), return_exceptions=True)
+            return
+        self.scraper = scraper
+        self.error = None
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Scrape worker pool started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.scraper is not None:
+            await self.scraper.close()
+            self.scraper = None
+            self.error = "stopped"
+
+    def submit(self, urls: List[str]) -> ScrapeJob:
+        self.require_available()
+        for url in urls:
+            if not url.startswith(('http://', 'https://')) and not (
+                    self.allow_file_urls and url.startswith('file://')):
+                raise HTTPException(status_code=422, detail=f"Unsupported URL: {url}")
+        job = ScrapeJob(total=len(urls), results=[ScrapeResult(url=url) for url in urls])
+        self.jobs[job.id] = job
+        self._evict_finished()
+        for index in range(len(urls)):
+            self._queue.put_nowait((job.id, index))
+        return job
+
+    def cancel(self, job: ScrapeJob) -> None:
+        if job.status in ("done", "cancelled"):
+            return
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+        for result in job.results:
+            if result.status == "pending":
+                result.status = "cancelled"
+        for task in self._in_flight.get(job.id, ()):
+            task.cancel()
+
+    def _evict_finished(self) -> None:
+        # Oldest finished jobs go first, until both the job count and the
+        # stored Markdown are within bounds; running jobs are never evicted
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished:
+            if len(self.jobs) <= self.retention and self.stored_chars <= self.retention_chars:
+                break
+            job = self.jobs.pop(job_id)
+            self.stored_chars -= sum(len(result.markdown or '') for result in job.results)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, index = await self._queue.get()
+            job = self.jobs.get(job_id)
+            if job is None or job.status == "cancelled":
+                continue
+            job.status = "running"
+            result = job.results[index]
+            result.status = "running"
+            task = asyncio.create_task(self.scraper.convert_url(result.url))
+            self._in_flight.setdefault(job_id, set()).add(task)
+            try:
+                # wait() does not propagate the task's own cancellation
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._in_flight[job_id].discard(task)
+                if not self._in_flight[job_id]:
+                    del self._in_flight[job_id]
+            self._record(job, result, task)
+
+    def _record(self, job: ScrapeJob, result: ScrapeResult, task: asyncio.Task) -> None:
+        if task.cancelled():
+            result.status = "cancelled"
+            return
+        if task.exception() is not None:
+            output = {'ok': False, 'error': type(task.exception()).__name__}
+        else:
+            output = task.result()
+        result.duration_ms = output.get('ms')
+        if output['ok']:
+            result.status = "done"
+            result.markdown = output['markdown']
+            result.words = output['palabras']
+            if self.jobs.get(job.id) is job:
+                # A cancelled job may have been evicted while this URL ran
+                self.stored_chars += len(result.markdown)
+            job.completed += 1
+        else:
+            result.status = "failed"
+            result.error = output['error']
+            job.failed += 1
+        if job.status != "cancelled" and job.completed + job.failed == job.total:
+            job.status = "done"
+            job.finished_at = datetime.utcnow()
+            self._evict_finished()
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces single-document inserts into insert_many batches.
+
+    A document is written as soon as no insert is running; the ones that
+    arrive while an insert is in flight are written together, up to
+    max_batch per insert_many, when it returns. A max_delay_s above zero
+    holds each batch up to that long (or until it is full) to coalesce more
+    under light load, at the cost of that latency. With wait=True each
+    add() returns only once its batch is stored (and surfaces the write
+    error); with wait=False it returns immediately and a crash can lose the
+    writes not yet stored. The write concern applies to every batch.
+
+    close() lets the batch in progress finish and writes what is left; a
+    document that still could not be written fails its add() instead of
+    leaving it waiting forever.
+    """
+
+    def __init__(self, collection, max_batch: int = 500, max_delay_s: float = 0.0,
+                 wait: bool = True, write_concern: Optional[WriteConcern] = None):
+        self.collection = collection.with_options(write_concern=write_concern) if write_concern else collection
+        self.max_batch = max_batch
+        self.max_delay_s = max_delay_s
+        self.wait = wait
+        self._pending: List[tuple] = []
+        self._first = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        # Wake the loop instead of cancelling it, so no insert_many is cut short
+        self._closing = True
+        self._first.set()
+        self._full.set()
+        try:
+            if self._task is not None:
+                await asyncio.gather(self._task, return_exceptions=True)
+                self._task = None
+            await self.flush()
+        finally:
+            pending, self._pending = self._pending, []
+            if pending:
+                logger.error(f"Write-behind buffer closed with {len(pending)} documents not stored")
+            for _, future in pending:
+                if future is not None and not future.done():
+                    future.set_exception(PyMongoError("Write-behind buffer closed"))
+
+    async def add(self, document: dict) -> None:
+        if self._closing:
+            raise PyMongoError("Write-behind buffer closed")
+        future = asyncio.get_running_loop().create_future() if self.wait else None
+        self._pending.append((document, future))
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        self._first.set()
+        if future is not None:
+            await future
+
+    async def _run(self) -> None:
+        while not self._closing:
+            await self._first.wait()
+            if self.max_delay_s > 0:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay_s)
+                except asyncio.TimeoutError:
+                    pass
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                failed = {}
+                try:
+                    await self.collection.insert_many([document for document, _ in batch], ordered=False)
+                except asyncio.CancelledError:
+                    # Back in the buffer: close() fails its futures if it cannot write it
+                    self._pending[:0] = batch
+                    raise
+                except BulkWriteError as e:
+                    # Unordered: only the documents listed in writeErrors were rejected
+                    failed = {error['index']: e for error in e.details.get('writeErrors', [])}
+                    if e.details.get('writeConcernErrors'):
+                        failed = dict.fromkeys(range(len(batch)), e)
+                except PyMongoError as e:
+                    failed = dict.fromkeys(range(len(batch)), e)
+                except Exception as e:
+                    # e.g. bson InvalidDocument: fail this batch, keep the loop alive
+                    logger.exception("Write-behind batch could not be encoded or sent")
+                    failed = dict.fromkeys(range(len(batch)), e)
+                if failed:
+                    logger.error(f"Write-behind batch: {len(failed)} of {len(batch)} documents not stored")
+                for index, (_, future) in enumerate(batch):
+                    if future is None or future.done():
+                        continue
+                    if index in failed:
+                        future.set_exception(failed[index])
+                    else:
+                        future.set_result(None)
+            self._first.clear()
+            self._full.clear()
+
+
+def write_concern_from_env() -> Optional[WriteConcern]:
+    w = os.environ.get('MONGO_WRITE_CONCERN')
+    journal = os.environ.get('MONGO_WRITE_JOURNAL')
+    if w is None and journal is None:
+        return None
+    return WriteConcern(
+        w=int(w) if w and w.isdigit() else w,
+        j=None if journal is None else journal.lower() == 'true',
+    )
+
+
+status_writer = WriteBehindBuffer(
+    db.status_checks,
+    max_batch=int(os.environ.get('MONGO_WRITE_BATCH_SIZE', '500')),
+    max_delay_s=int(os.environ.get('MONGO_WRITE_DELAY_MS', '0')) / 1000,
+    wait=os.environ.get('MONGO_WRITE_MODE', 'wait') != 'async',
+    write_concern=write_concern_from_env(),
+)
+
+scrape_pool = ScrapeWorkerPool(
+    config_path=os.environ.get('SCRAPER_CONFIG'),
+    workers=int(os.environ.get('SCRAPER_WORKERS', '3')),
+    retention=int(os.environ.get('SCRAPER_JOB_RETENTION', '500')),
+    retention_chars=int(os.environ.get('SCRAPER_JOB_RETENTION_MB', '256')) * 1024 * 1024,
+    allow_file_urls=os.environ.get('SCRAPER_ALLOW_FILE_URLS', 'false').lower() == 'true',
+)
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
@@ -44,13 +383,94 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    try:
+        await status_writer.add(status_obj.dict())
+    except PyMongoError:
+        raise HTTPException(status_code=503, detail="Could not store the status check")
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+def encode_status_cursor(status_check: dict) -> str:
+    key = json.dumps([status_check["timestamp"].isoformat(), status_check["id"]])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_status_cursor(cursor: str) -> dict:
+    try:
+        timestamp, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        timestamp = datetime.fromisoformat(timestamp)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Keyset: everything after (timestamp, id) in index order
+    return {"$or": [
+        {"timestamp": {"$gt": timestamp}},
+        {"timestamp": timestamp, "id": {"$gt": str(last_id)}},
+    ]}
+
+# Streamed, so there is no response_model. Without paginate or cursor the
+# body is the original list of up to `limit` (default 1000) status checks;
+# with them it is {"items": [...], "next_cursor": str | null}.
+@api_router.get("/status")
+async def get_status_checks(limit: Optional[int] = Query(None, ge=1, le=1000),
+                            cursor: Optional[str] = None, paginate: bool = False):
+    paginate = paginate or cursor is not None
+    if limit is None:
+        limit = 100 if paginate else 1000
+    query = decode_status_cursor(cursor) if cursor else {}
+    # One extra document tells whether there is a next page
+    documents = (db.status_checks.find(query, STATUS_CHECK_PROJECTION)
+                 .sort(STATUS_CHECK_SORT).limit(limit + 1).batch_size(min(limit + 1, 500)))
+
+    async def stream_page():
+        yield '{"items": [' if paginate else '['
+        last = None
+        count = 0
+        has_more = False
+        async for status_check in documents:
+            if count == limit:
+                has_more = True
+                break
+            if last is not None:
+                yield ","
+            yield json.dumps({**status_check, "timestamp": status_check["timestamp"].isoformat()})
+            last = status_check
+            count += 1
+        if not paginate:
+            yield "]"
+            return
+        next_cursor = encode_status_cursor(last) if has_more else None
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + "}"
+
+    return StreamingResponse(stream_page(), media_type="application/json")
+
+@api_router.post("/jobs", response_model=ScrapeJob, status_code=202)
+async def create_scrape_job(input: ScrapeJobCreate):
+    return scrape_pool.submit(input.urls)
+
+@api_router.get("/jobs/{job_id}", response_model=ScrapeJob)
+async def get_scrape_job(job_id: str):
+    scrape_pool.require_available()
+    job = scrape_pool.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@api_router.post("/jobs/{job_id}/cancel", response_model=ScrapeJob)
+async def cancel_scrape_job(job_id: str):
+    scrape_pool.require_available()
+    job = scrape_pool.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    scrape_pool.cancel(job)
+    return job
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def scraper_metrics(request: Request):
+    scrape_pool.require_available()
+    from html_scraper_mejorado import TIPO_OPENMETRICS, TIPO_PROMETHEUS
+    openmetrics = 'application/openmetrics-text' in request.headers.get('accept', '')
+    return PlainTextResponse(
+        scrape_pool.scraper.prometheus_metrics(openmetrics),
+        media_type=TIPO_OPENMETRICS if openmetrics else TIPO_PROMETHEUS,
+    )
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -70,6 +490,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    # Serves the keyset pagination of GET /api/status
+    await db.status_checks.create_index(STATUS_CHECK_SORT)
+
+@app.on_event("startup")
+async def start_status_writer():
+    status_writer.start()
+
+@app.on_event("startup")
+async def start_scrape_pool():
+    await scrape_pool.start()
+
+@app.on_event("shutdown")
+async def stop_scrape_pool():
+    await scrape_pool.stop()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Buffered inserts must reach MongoDB before the client goes away
+    await status_writer.close()
     client.close()
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Banco de pruebas de rendimiento del HTML to Markdown Scraper
+============================================================
+
+Genera corpus HTML sintéticos y reproducibles, los sirve desde un servidor
+HTTP local y mide por separado las etapas del scraper:
+
+- `_extract_content_safe` (descarga / renderizado)
+- `_convert_to_markdown` (HTML -> Markdown)
+- `_clean_markdown` (limpieza del Markdown, por página y sobre un único
+  documento de varios MB)
+- `_save_markdown_file` (escritura atómica)
+- `run_sequential` y `run_parallel` (ejecución completa)
+
+El resultado es un JSON con páginas/segundo y latencias por etapa para
+comparar versiones (`--baseline` muestra la variación respecto a otro JSON).
+
+Corpus disponibles:
+- small:  páginas pequeñas de artículo (~5 KB)
+- large:  páginas grandes con tablas, código y listas (~130 KB)
+- spa:    un único index.html con rutas hash renderizadas por JavaScript
+- static: sitio estático con navegación, cabecera y pie enlazados
+
+Uso:
+    python benchmark_scraper.py
+    python benchmark_scraper.py --corpus small large --pages 50 --output bench.json
+    python benchmark_scraper.py --fetch-mode static --baseline bench_anterior.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import html
+import json
+import logging
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from html_scraper_mejorado import HTMLToMarkdownScraper
+
+
+CORPUS_DISPONIBLES = ('small', 'large', 'spa', 'static')
+# Variación (en %) por debajo de la cual una diferencia se considera ruido
+UMBRAL_RUIDO_PCT = 5.0
+
+PALABRAS = (
+    "contenido proceso análisis sistema datos usuario módulo servicio registro "
+    "consulta informe gestión calidad proyecto requisito prueba entrega diseño "
+    "arquitectura componente interfaz validación documento versión control"
+).split()
+
+
+# ==================== GENERACIÓN DE CORPUS ====================
+
+def _frase(rng: random.Random, minimo: int = 8, maximo: int = 20) -> str:
+    """Genera una frase aleatoria con las palabras del vocabulario."""
+    palabras = [rng.choice(PALABRAS) for _ in range(rng.randint(minimo, maximo))]
+    return ' '.join(palabras).capitalize() + '.'
+
+
+def _parrafo(rng: random.Random) -> str:
+    """Genera un párrafo con énfasis y un enlace interno."""
+    frases = [_frase(rng) for _ in range(rng.randint(3, 6))]
+    frases[0] = f"<strong>{frases[0]}</strong>"
+    frases[-1] = f'<a href="#ref{rng.randint(1, 99)}">{frases[-1]}</a>'
+    return f"<p>{' '.join(frases)}</p>"
+
+
+def _tabla(rng: random.Random, filas: int) -> str:
+    """Genera una tabla HTML con cabecera."""
+    cabecera = ''.join(f"<th>{rng.choice(PALABRAS)}</th>" for _ in range(4))
+    cuerpo = ''.join(
+        '<tr>' + ''.join(f"<td>{rng.randint(0, 9999)} {rng.choice(PALABRAS)}</td>" for _ in range(4)) + '</tr>'
+        for _ in range(filas)
+    )
+    return f"<table><thead><tr>{cabecera}</tr></thead><tbody>{cuerpo}</tbody></table>"
+
+
+def _codigo(rng: random.Random) -> str:
+    """Genera un bloque de código con sangría significativa."""
+    lineas = [f"def {rng.choice(PALABRAS)}_{i}(x):\n    y  =  x * {i}\n    return y\n" for i in range(rng.randint(2, 6))]
+    return f"<pre><code>{html.escape(''.join(lineas))}</code></pre>"
+
+
+def _lista(rng: random.Random) -> str:
+    """Genera una lista con un nivel de anidamiento."""
+    anidada = ''.join(f"<li>{_frase(rng, 3, 6)}</li>" for _ in range(3))
+    return f"<ul><li>{_frase(rng, 3, 6)}<ul>{anidada}</ul></li><li>{_frase(rng, 3, 6)}</li></ul>"
+
+
+def _cuerpo_articulo(rng: random.Random, bloques: int, con_tablas: bool) -> str:
+    """Genera el contenido principal de una página."""
+    partes = []
+    for i in range(bloques):
+        partes.append(f"<h2>{_frase(rng, 2, 5)}</h2>")
+        partes.append(_parrafo(rng))
+        if con_tablas:
+            eleccion = i % 4
+            if eleccion == 0:
+                partes.append(_tabla(rng, rng.randint(5, 20)))
+            elif eleccion == 1:
+                partes.append(_codigo(rng))
+            elif eleccion == 2:
+                partes.append(_lista(rng))
+    return ''.join(partes)
+
+
+def _documento(titulo: str, cuerpo: str, navegacion: str = '', script: str = '') -> str:
+    """Envuelve el contenido en un documento HTML completo."""
+    return (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8">'
+        f'<title>{titulo}</title><style>body{{font-family:sans-serif}}</style></head>'
+        f'<body>{navegacion}<main id="contenido">{cuerpo}</main>'
+        '<footer><p>Pie de página del sitio de pruebas</p></footer>'
+        f'{script}</body></html>'
+    )
+
+
+def generar_corpus(directorio: Path, tipo: str, paginas: int, semilla: int = 1) -> Dict:
+    """
+    Genera un corpus sintético en disco.
+    
+    Args:
+        directorio: Directorio donde escribir el corpus
+        tipo: Uno de `CORPUS_DISPONIBLES`
+        paginas: Número de páginas (o rutas, en el corpus spa)
+        semilla: Semilla del generador, para que el corpus sea reproducible
+    
+    Returns:
+        Diccionario con las rutas relativas de las páginas (`rutas`), el HTML
+        de contenido de cada una (`html`) y el tamaño total en bytes
+    """
+    rng = random.Random(f"{tipo}-{semilla}")
+    directorio.mkdir(parents=True, exist_ok=True)
+    rutas, contenidos = [], []
+    
+    if tipo == 'spa':
+        # Las secciones van en un JSON embebido y el router las pinta al cambiar el hash
+        secciones = {f"/seccion/{i}": _cuerpo_articulo(rng, 6, con_tablas=True) for i in range(paginas)}
+        script = (
+            '<script>const SECCIONES=' + json.dumps(secciones).replace('</', '<\\/') + ';'
+            'function pintar(){const r=location.hash.slice(1)||"/seccion/0";'
+            'document.getElementById("contenido").innerHTML=SECCIONES[r]||"<p>No encontrado</p>";}'
+            'window.addEventListener("hashchange",pintar);pintar();</script>'
+        )
+        (directorio / 'index.html').write_text(_documento('SPA de pruebas', '', script=script), encoding='utf-8')
+        rutas = [f"index.html#{ruta}" for ruta in secciones]
+        contenidos = [_documento('SPA de pruebas', cuerpo) for cuerpo in secciones.values()]
+    else:
+        bloques, con_tablas = {'small': (3, False), 'large': (120, True), 'static': (10, True)}[tipo]
+        for i in range(paginas):
+            navegacion = ''
+            if tipo == 'static':
+                enlaces = ''.join(f'<li><a href="pagina_{j}.html">Página {j}</a></li>'
+                                  for j in range(max(0, i - 5), min(paginas, i + 6)) if j != i)
+                navegacion = f'<header><nav><ul>{enlaces}</ul></nav></header>'
+            documento = _documento(f"Página {i}", _cuerpo_articulo(rng, bloques, con_tablas), navegacion)
+            nombre = f"pagina_{i}.html"
+            (directorio / nombre).write_text(documento, encoding='utf-8')
+            rutas.append(nombre)
+            contenidos.append(documento)
+    
+    return {
+        'rutas': rutas,
+        'html': contenidos,
+        'bytes': sum(len(c.encode('utf-8')) for c in contenidos),
+    }
+
+
+# ==================== SERVIDOR LOCAL ====================
+
+class _ManejadorSilencioso(SimpleHTTPRequestHandler):
+    """Sirve archivos estáticos sin escribir una línea por petición."""
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class ServidorLocal:
+    """Servidor HTTP en un hilo que sirve un directorio en un puerto libre."""
+    
+    def __init__(self, directorio: Path):
+        self.directorio = directorio
+        self.servidor: Optional[ThreadingHTTPServer] = None
+        self.hilo: Optional[threading.Thread] = None
+    
+    def __enter__(self) -> 'ServidorLocal':
+        manejador = partial(_ManejadorSilencioso, directory=str(self.directorio))
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), manejador)
+        self.servidor.daemon_threads = True
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.servidor.shutdown()
+        self.servidor.server_close()
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}/"
+
+
+# ==================== MEDICIÓN ====================
+
+def resumir_latencias(muestras: List[float], bytes_procesados: int = 0) -> Dict:
+    """
+    Resume una serie de latencias (en segundos).
+    
+    Args:
+        muestras: Duración de cada llamada
+        bytes_procesados: Bytes de entrada de todas las llamadas, para el caudal
+    
+    Returns:
+        Diccionario con llamadas, total, media, percentiles y caudal
+    """
+    if not muestras:
+        return {'llamadas': 0}
+    
+    ordenadas = sorted(muestras)
+    
+    def percentil(p: float) -> float:
+        return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+    
+    total = sum(muestras)
+    resumen = {
+        'llamadas': len(muestras),
+        'total_s': round(total, 4),
+        'media_ms': round(statistics.fmean(muestras) * 1000, 3),
+        'p50_ms': round(percentil(50) * 1000, 3),
+        'p95_ms': round(percentil(95) * 1000, 3),
+        'max_ms': round(ordenadas[-1] * 1000, 3),
+        'paginas_por_s': round(len(muestras) / total, 2) if total > 0 else None,
+    }
+    if bytes_procesados:
+        resumen['mb_por_s'] = round(bytes_procesados / 1e6 / total, 2) if total > 0 else None
+    return resumen
+
+
+def medir(funcion: Callable, entradas: List, repeticiones: int) -> List[float]:
+    """Mide `funcion(entrada)` para cada entrada, `repeticiones` veces."""
+    muestras = []
+    for _ in range(repeticiones):
+        for entrada in entradas:
+            inicio = time.perf_counter()
+            funcion(entrada)
+            muestras.append(time.perf_counter() - inicio)
+    return muestras
+
+
+def crear_scraper(directorio: Path, urls: List[str], args: argparse.Namespace,
+                  spa: bool, nombre: str) -> HTMLToMarkdownScraper:
+    """
+    Crea un scraper con una configuración aislada para el banco de pruebas.
+    
+    Sin caché, sin diario, sin salida incremental y sin pausas de cortesía,
+    para que cada ejecución haga todo el trabajo.
+    
+    Args:
+        directorio: Directorio temporal de trabajo
+        urls: URLs a procesar
+        args: Argumentos de línea de comandos
+        spa: Activar `spa_hash_routes`
+        nombre: Nombre de la ejecución (subdirectorio de salida)
+    
+    Returns:
+        Scraper listo para ejecutar
+    """
+    config = {
+        'urls': urls,
+        'output_dir': str(directorio / 'salida' / nombre),
+        'options': {
+            'headless': True,
+            'wait_until': 'load',
+            'timeout': 30000,
+            'max_concurrent': args.concurrency,
+            'delay_between_requests': 0,
+            'retry_attempts': 0,
+            'spa_hash_routes': spa,
+            'incremental': False,
+            'resume': False,
+            'fetch_mode': args.fetch_mode,
+            'politeness': {'requests_per_second': None, 'max_per_host': args.concurrency},
+            'html_cache': {'enabled': False},
+            'journal': {'enabled': False},
+        },
+        'logging': {'level': 'WARNING', 'console': False, 'file': False,
+                    'log_dir': str(directorio / 'logs')},
+    }
+    ruta_config = directorio / f"config_{nombre}.json"
+    ruta_config.write_text(json.dumps(config), encoding='utf-8')
+    # Los mensajes del scraper van a stderr: stdout queda para el JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        return HTMLToMarkdownScraper(str(ruta_config))
+
+
+async def medir_extraccion(scraper: HTMLToMarkdownScraper, urls: List[str], bytes_corpus: int) -> Dict:
+    """Mide `_extract_content_safe` URL a URL, sin contar el arranque del navegador."""
+    try:
+        # La primera URL de cada documento arranca el navegador: se hace antes de medir
+        await scraper._extract_content_safe(urls[0])
+        muestras, fallos = [], 0
+        for url in urls:
+            inicio = time.perf_counter()
+            contenido = await scraper._extract_content_safe(url)
+            muestras.append(time.perf_counter() - inicio)
+            fallos += contenido is None
+        resumen = resumir_latencias(muestras, bytes_corpus)
+        resumen['fallos'] = fallos
+        return resumen
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+    finally:
+        await scraper._close_browser()
+
+
+async def medir_ejecucion(scraper: HTMLToMarkdownScraper, modo: str) -> Dict:
+    """Mide una ejecución completa (`run_sequential` o `run_parallel`)."""
+    inicio = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            await getattr(scraper, modo)()
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+    duracion = time.perf_counter() - inicio
+    procesadas = scraper.stats.archivos_procesados
+    return {
+        'duracion_s': round(duracion, 3),
+        'procesadas': procesadas,
+        'fallidas': scraper.stats.archivos_fallidos,
+        'paginas_por_s': round(procesadas / duracion, 2) if duracion > 0 else None,
+        # Histogramas por etapa del propio scraper (sin los buckets)
+        'latencias': {
+            etapa: {clave: valor for clave, valor in histograma.resumen().items() if clave != 'buckets'}
+            for etapa, histograma in scraper.stats.latencias.items()
+        },
+    }
+
+
+async def medir_corpus(tipo: str, directorio: Path, servidor: ServidorLocal, args: argparse.Namespace) -> Dict:
+    """
+    Genera un corpus y mide todas las etapas sobre él.
+    
+    Args:
+        tipo: Tipo de corpus
+        directorio: Directorio temporal de trabajo
+        servidor: Servidor local que sirve `directorio / 'corpus'`
+        args: Argumentos de línea de comandos
+    
+    Returns:
+        Resultados del corpus por etapa
+    """
+    corpus = generar_corpus(directorio / 'corpus' / tipo, tipo, args.pages, args.seed)
+    urls = [f"{servidor.base_url}{tipo}/{ruta}" for ruta in corpus['rutas']]
+    spa = tipo == 'spa'
+    resultado = {'paginas': len(urls), 'bytes_html': corpus['bytes'], 'etapas': {}}
+    etapas = resultado['etapas']
+    print(f"📊 Corpus {tipo}: {len(urls)} páginas, {corpus['bytes'] / 1e6:.2f} MB", file=sys.stderr)
+    
+    # Etapas aisladas: no necesitan navegador
+    scraper = crear_scraper(directorio, urls, args, spa, f"{tipo}_etapas")
+    Path(scraper.config['output_dir']).mkdir(parents=True, exist_ok=True)
+    markdowns = [scraper._convert_to_markdown(c) for c in corpus['html']]
+    bytes_markdown = sum(len(m.encode('utf-8')) for m in markdowns)
+    
+    etapas['_convert_to_markdown'] = resumir_latencias(
+        medir(scraper._convert_to_markdown, corpus['html'], args.repeat), corpus['bytes'] * args.repeat)
+    etapas['_clean_markdown'] = resumir_latencias(
+        medir(scraper._clean_markdown, markdowns, args.repeat), bytes_markdown * args.repeat)
+    if args.cleanup_mb > 0 and bytes_markdown:
+        # Salidas de varios MB (p. ej. un curso entero en un solo documento)
+        copias = max(1, round(args.cleanup_mb * 1e6 / bytes_markdown))
+        documento = '\n\n'.join(markdowns * copias)
+        etapas['_clean_markdown_documento'] = resumir_latencias(
+            medir(scraper._clean_markdown, [documento], args.repeat),
+            len(documento.encode('utf-8')) * args.repeat)
+    nombres = iter(range(len(markdowns) * args.repeat))
+    etapas['_save_markdown_file'] = resumir_latencias(
+        medir(lambda m: scraper._save_markdown_file(m, f"pagina_{next(nombres)}.md"), markdowns, args.repeat),
+        bytes_markdown * args.repeat)
+    
+    # Las rutas hash solo se pintan en el navegador
+    if spa and args.fetch_mode == 'static':
+        omitido = {'omitido': 'el corpus spa no se puede descargar con fetch_mode=static'}
+        etapas.update({'_extract_content_safe': omitido, 'run_sequential': omitido, 'run_parallel': omitido})
+        return resultado
+    
+    etapas['_extract_content_safe'] = await medir_extraccion(
+        crear_scraper(directorio, urls, args, spa, f"{tipo}_extraccion"), urls, corpus['bytes'])
+    for modo in ('run_sequential', 'run_parallel'):
+        etapas[modo] = await medir_ejecucion(crear_scraper(directorio, urls, args, spa, f"{tipo}_{modo}"), modo)
+    
+    return resultado
+
+
+def comparar(actual: Dict, base: Dict) -> None:
+    """
+    Muestra la variación de páginas/segundo y p50 respecto a otro resultado.
+    
+    Args:
+        actual: Resultado de esta ejecución
+        base: Resultado JSON de referencia (`--baseline`)
+    """
+    print("\n📈 Comparación con la referencia:", file=sys.stderr)
+    for tipo, datos in actual['corpus'].items():
+        etapas_base = base.get('corpus', {}).get(tipo, {}).get('etapas', {})
+        for etapa, medida in datos['etapas'].items():
+            anterior = etapas_base.get(etapa, {})
+            for clave in ('paginas_por_s', 'p50_ms'):
+                if medida.get(clave) and anterior.get(clave):
+                    variacion = (medida[clave] - anterior[clave]) / anterior[clave] * 100
+                    # Más páginas/s es mejor; más latencia es peor
+                    mejora = variacion >= 0 if clave == 'paginas_por_s' else variacion <= 0
+                    icono = '✅' if mejora or abs(variacion) < UMBRAL_RUIDO_PCT else '⚠️'
+                    print(f"   {icono} {tipo:7} {etapa:22} {clave:13} "
+                          f"{anterior[clave]:>10} -> {medida[clave]:>10} ({variacion:+.1f}%)", file=sys.stderr)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Analiza los argumentos de línea de comandos.
+    
+    Returns:
+        Argumentos analizados
+    """
+    parser = argparse.ArgumentParser(
+        description='Banco de pruebas de rendimiento del HTML to Markdown Scraper',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  %(prog)s
+  %(prog)s --corpus small large --pages 50 --output bench.json
+  %(prog)s --fetch-mode static --baseline bench_anterior.json
+        """
+    )
+    parser.add_argument('--corpus', nargs='+', choices=CORPUS_DISPONIBLES, default=list(CORPUS_DISPONIBLES),
+                        help='Corpus a medir (default: todos)')
+    parser.add_argument('--pages', type=int, default=20, help='Páginas por corpus (default: 20)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Repeticiones de las etapas aisladas (default: 3)')
+    parser.add_argument('--cleanup-mb', type=float, default=4,
+                        help='Tamaño del documento de la limpieza en bloque, 0 para omitirla (default: 4)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='max_concurrent para run_parallel (default: 4)')
+    parser.add_argument('--fetch-mode', choices=['browser', 'static', 'auto'], default='browser',
+                        help='Modo de descarga del scraper (default: browser)')
+    parser.add_argument('--seed', type=int, default=1, help='Semilla de los corpus (default: 1)')
+    parser.add_argument('--output', help='Archivo JSON de resultados (default: stdout)')
+    parser.add_argument('--baseline', help='Resultado JSON anterior con el que comparar')
+    parser.add_argument('--keep', action='store_true', help='Conservar el directorio temporal')
+    return parser.parse_args()
+
+
+async def main() -> None:
+    """Genera los corpus, los sirve en local y mide cada etapa."""
+    args = parse_arguments()
+    directorio = Path(tempfile.mkdtemp(prefix='bench_scraper_'))
+    (directorio / 'corpus').mkdir()
+    # Los mensajes del scraper no deben mezclarse con el informe
+    logging.getLogger('HTMLScraper').disabled = True
+    
+    resultados = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'keep')},
+        'corpus': {},
+    }
+    
+    try:
+        with ServidorLocal(directorio / 'corpus') as servidor:
+            for tipo in args.corpus:
+                resultados['corpus'][tipo] = await medir_corpus(tipo, directorio, servidor, args)
+    finally:
+        if args.keep:
+            print(f"📁 Directorio de trabajo conservado: {directorio}", file=sys.stderr)
+        else:
+            shutil.rmtree(directorio, ignore_errors=True)
+    
+    salida = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(salida, encoding='utf-8')
+        print(f"💾 Resultados guardados en: {args.output}", file=sys.stderr)
+    else:
+        print(salida)
+    
+    if args.baseline:
+        comparar(resultados, json.loads(Path(args.baseline).read_text(encoding='utf-8')))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
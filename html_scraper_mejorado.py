@@ -20,692 +20,5698 @@ Fecha: 2025
 """
 
 import asyncio
+import bisect
+import copy
+import fnmatch
+import gzip
+import hashlib
+import heapq
 import json
 import logging
+import math
+import multiprocessing
 import os
+import queue
+import random
+import re
+import socket
+import sqlite3
+import sys
+import threading
 import time
+import uuid
 import argparse
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import List, Optional, Dict, Tuple
-from dataclasses import dataclass, asdict
+from typing import List, Optional, Dict, Tuple, Callable, Awaitable, AsyncIterator, Iterable, Iterator, Union
+from dataclasses import dataclass, asdict, fields
+from itertools import groupby
+from urllib.parse import urlparse, urlsplit, urlunsplit, urljoin, parse_qsl, urlencode
+from urllib.request import url2pathname
+from xml.etree import ElementTree
 
-from playwright.async_api import async_playwright, Browser, BrowserContext
-from markdownify import markdownify as md
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from bs4 import BeautifulSoup, Comment
+from markdownify import MarkdownConverter
+
+try:
+    import lxml  # noqa: F401  (parser más rápido para BeautifulSoup, opcional)
+    PARSER_HTML_PREDETERMINADO = 'lxml'
+except ImportError:
+    PARSER_HTML_PREDETERMINADO = 'html.parser'
+
+try:
+    import resource  # Memoria máxima del proceso (no disponible en Windows)
+except ImportError:
+    resource = None
+
+try:
+    import pymongo  # Cola de trabajos compartida en MongoDB (opcional)
+    from pymongo.errors import BulkWriteError
+except ImportError:
+    pymongo = None
+
+
+# Navega a un fragmento dentro del documento ya cargado (routers hash de SPA)
+JS_NAVEGAR_HASH = """
+(hash) => {
+    if (window.location.hash === '#' + hash) {
+        window.dispatchEvent(new HashChangeEvent('hashchange'));
+    } else {
+        window.location.hash = hash;
+    }
+}
+"""
+
+# Memoria del heap de JavaScript de la página (solo Chromium expone performance.memory)
+JS_MEMORIA_PAGINA = "() => (performance.memory ? performance.memory.usedJSHeapSize : null)"
+
+# Espera a que el DOM deje de mutar y el texto se estabilice (o se agote el tiempo)
+JS_ESPERAR_CONTENIDO = """
+async ({selector, quietMs, textStableMs, maxWaitMs, pollMs}) => {
+    const inicio = performance.now();
+    let ultimaMutacion = inicio;
+    let ultimoLargo = -1;
+    let ultimoCambioTexto = inicio;
+    const observer = new MutationObserver(() => { ultimaMutacion = performance.now(); });
+    observer.observe(document.documentElement || document, {
+        childList: true, subtree: true, attributes: true, characterData: true
+    });
+    try {
+        while (true) {
+            const ahora = performance.now();
+            const largo = document.body ? document.body.textContent.length : 0;
+            if (largo !== ultimoLargo) {
+                ultimoLargo = largo;
+                ultimoCambioTexto = ahora;
+            }
+            const selectorPresente = !selector || document.querySelector(selector) !== null;
+            const domQuieto = ahora - ultimaMutacion >= quietMs;
+            // Sin texto (página vacía o solo imágenes) basta con que el DOM
+            // tampoco haya cambiado durante la ventana de texto estable
+            const textoEstable = ahora - ultimoCambioTexto >= textStableMs
+                && (largo > 0 || ahora - ultimaMutacion >= textStableMs);
+            if (selectorPresente && domQuieto && textoEstable) {
+                return {estable: true, ms: ahora - inicio};
+            }
+            if (ahora - inicio >= maxWaitMs) {
+                return {estable: false, ms: ahora - inicio};
+            }
+            await new Promise(resolve => setTimeout(resolve, pollMs));
+        }
+    } finally {
+        observer.disconnect();
+    }
+}
+"""
+
+# Poda el documento dentro de la página y devuelve solo la región de contenido.
+# Trabaja sobre una copia para no alterar el DOM vivo (las páginas del pool se reutilizan).
+JS_EXTRAER_CONTENIDO = """
+({selectors, strip, readability, links}) => {
+    const negativo = /comment|footer|footnote|menu|nav|sidebar|sponsor|share|social|banner|cookie|popup|related|breadcrumb/i;
+    const positivo = /article|content|entry|main|page|post|text|story|contenido|curso|tema|leccion/i;
+    const largoTexto = (el) => (el.textContent || '').trim().length;
+    const densidadEnlaces = (el) => {
+        const total = largoTexto(el);
+        if (!total) return 1;
+        let enlaces = 0;
+        for (const a of el.querySelectorAll('a')) enlaces += largoTexto(a);
+        return Math.min(1, enlaces / total);
+    };
+    const pesoClase = (el) => {
+        const nombre = (el.id || '') + ' ' + (typeof el.className === 'string' ? el.className : '');
+        if (!nombre.trim()) return 0;
+        return (negativo.test(nombre) ? -25 : 0) + (positivo.test(nombre) ? 25 : 0);
+    };
+    const principal = (raiz) => {
+        const puntos = new Map();
+        for (const parrafo of raiz.querySelectorAll('p, pre, td, blockquote, li')) {
+            const texto = (parrafo.textContent || '').trim();
+            if (texto.length < 25) continue;
+            const valor = 1 + (texto.split(',').length - 1) + Math.min(Math.floor(texto.length / 100), 3);
+            const padre = parrafo.parentElement;
+            const abuelo = padre && padre !== raiz ? padre.parentElement : null;
+            [padre, abuelo].forEach((ancestro, nivel) => {
+                if (!ancestro) return;
+                if (!puntos.has(ancestro)) puntos.set(ancestro, pesoClase(ancestro));
+                puntos.set(ancestro, puntos.get(ancestro) + (nivel === 0 ? valor : valor / 2));
+            });
+        }
+        let mejor = null;
+        let mejorPuntos = -Infinity;
+        for (const [el, valor] of puntos) {
+            const ajustado = valor * (1 - densidadEnlaces(el));
+            if (ajustado > mejorPuntos) { mejor = el; mejorPuntos = ajustado; }
+        }
+        if (!mejor) return null;
+        let largo = largoTexto(mejor);
+        while (mejor !== raiz && mejor.parentElement) {
+            const largoPadre = largoTexto(mejor.parentElement);
+            if (largoPadre > largo * 1.25) break;
+            mejor = mejor.parentElement;
+            largo = largoPadre;
+        }
+        return mejor;
+    };
+    
+    let raiz = null;
+    for (const selector of selectors) {
+        raiz = document.querySelector(selector);
+        if (raiz) break;
+    }
+    const copia = (raiz || document.body || document.documentElement).cloneNode(true);
+    if (strip.length) {
+        for (const el of copia.querySelectorAll(strip.join(','))) el.remove();
+    }
+    const comentarios = [];
+    const walker = document.createTreeWalker(copia, NodeFilter.SHOW_COMMENT);
+    while (walker.nextNode()) comentarios.push(walker.currentNode);
+    comentarios.forEach((comentario) => comentario.remove());
+    
+    const resultado = (!raiz && readability && principal(copia)) || copia;
+    const cuerpo = resultado.tagName === 'BODY' ? resultado.outerHTML : '<body>' + resultado.outerHTML + '</body>';
+    return {
+        html: '<html>' + cuerpo + '</html>',
+        links: links ? Array.from(document.querySelectorAll('a[href], area[href]'), (a) => a.href) : null,
+    };
+}
+"""
+
+# Heurísticas para detectar páginas que necesitan JavaScript para mostrar contenido
+RE_SCRIPTS_Y_ESTILOS = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+RE_ETIQUETAS = re.compile(r'<[^>]+>')
+RE_MONTAJE_SPA_VACIO = re.compile(
+    r'<div[^>]+id\s*=\s*["\'](?:root|app|__next|__nuxt|q-app)["\'][^>]*>\s*</div>', re.IGNORECASE
+)
+RE_SCRIPT = re.compile(r'<script\b', re.IGNORECASE)
+RE_ENLACES = re.compile(r'<(?:a|area)\b[^>]*?\shref\s*=\s*(["\'])(.*?)\1', re.IGNORECASE | re.DOTALL)
+RE_BASE_HREF = re.compile(r'<base\b[^>]*?\shref\s*=\s*(["\'])(.*?)\1', re.IGNORECASE | re.DOTALL)
+
+# Etiquetas que markdownify convierte; el resto se reduce a su texto
+ETIQUETAS_CONVERTIDAS = [
+    'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li',
+    'a', 'strong', 'em', 'code', 'pre', 'blockquote',
+    'table', 'tr', 'td', 'th', 'img',
+]
+# Puntuación del contenido principal (estilo readability)
+ETIQUETAS_PARRAFO = ['p', 'pre', 'td', 'blockquote', 'li']
+RE_CANDIDATO_NEGATIVO = re.compile(
+    r'comment|footer|footnote|menu|nav|sidebar|sponsor|share|social|banner|cookie|popup|related|breadcrumb',
+    re.IGNORECASE
+)
+RE_CANDIDATO_POSITIVO = re.compile(
+    r'article|content|entry|main|page|post|text|story|contenido|curso|tema|leccion',
+    re.IGNORECASE
+)
+
+# Límites (en segundos) de los buckets de los histogramas de latencia por etapa
+LIMITES_HISTOGRAMA_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                        1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Tipos de contenido del endpoint de métricas
+TIPO_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+TIPO_OPENMETRICS = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Reglas de `markdown.cleanup` (cada una puede desactivarse en la configuración)
+REGLAS_LIMPIEZA_PREDETERMINADAS = {
+    'strip_trailing_spaces': True,
+    'collapse_spaces': True,
+    'max_blank_lines': 2,
+    'protect_code': True,
+    'protect_tables': True,
+    'extra_rules': [],
+}
+
+# Parámetros de seguimiento que no cambian el contenido de la página
+PARAMETROS_SEGUIMIENTO = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+# Extensiones que no son páginas HTML y no se rastrean
+EXTENSIONES_NO_HTML = (
+    '.pdf', '.zip', '.gz', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico',
+    '.css', '.js', '.json', '.mp3', '.mp4', '.webm', '.woff', '.woff2', '.ttf',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+)
+
+
+def split_document_url(url: str) -> Tuple[str, str]:
+    """
+    Separa una URL en documento (todo lo anterior a '#') y fragmento.
+    
+    Args:
+        url: URL a separar
+        
+    Returns:
+        Tupla (documento, fragmento); el fragmento es '' si no existe
+    """
+    documento, _, fragmento = url.partition('#')
+    return documento, fragmento
+
+
+def file_url_to_path(url: str) -> Path:
+    """
+    Convierte una URL file:// en ruta local, decodificando caracteres especiales.
+    
+    Args:
+        url: URL con esquema file:// (el fragmento se ignora)
+        
+    Returns:
+        Ruta del archivo local
+    """
+    return Path(url2pathname(urlparse(url).path))
+
+
+class ErrorDescarga(Exception):
+    """Error al obtener una URL con su categoría para la política de reintentos."""
+    
+    def __init__(self, categoria: str, mensaje: str, status: Optional[int] = None):
+        super().__init__(mensaje)
+        self.categoria = categoria
+        self.status = status
+
+
+def error_http(status: int, url: str) -> ErrorDescarga:
+    """
+    Crea el ErrorDescarga correspondiente a un código de estado HTTP.
+    
+    Args:
+        status: Código de estado (>= 400)
+        url: URL solicitada
+        
+    Returns:
+        Error con categoría http_429, http_4xx o http_5xx
+    """
+    if status == 429:
+        categoria = 'http_429'
+    elif status >= 500:
+        categoria = 'http_5xx'
+    else:
+        categoria = 'http_4xx'
+    return ErrorDescarga(categoria, f"HTTP {status} en {url}", status)
+
+
+def clasificar_error(error: BaseException) -> str:
+    """
+    Clasifica un error de descarga para decidir si merece reintento.
+    
+    Args:
+        error: Excepción producida al obtener la URL
+        
+    Returns:
+        Una de: timeout, dns, conexion, http_429, http_4xx, http_5xx,
+        no_encontrado, contenido_vacio u otro
+    """
+    if isinstance(error, ErrorDescarga):
+        return error.categoria
+    if isinstance(error, (PlaywrightTimeoutError, asyncio.TimeoutError, TimeoutError)):
+        return 'timeout'
+    if isinstance(error, FileNotFoundError) or 'ERR_FILE_NOT_FOUND' in str(error):
+        return 'no_encontrado'
+    
+    mensaje = str(error)
+    if 'ERR_NAME_NOT_RESOLVED' in mensaje or 'ENOTFOUND' in mensaje or 'EAI_AGAIN' in mensaje:
+        return 'dns'
+    if 'Timeout' in mensaje or 'ERR_TIMED_OUT' in mensaje or 'ETIMEDOUT' in mensaje:
+        return 'timeout'
+    if any(marca in mensaje for marca in ('ERR_CONNECTION', 'ECONNREFUSED', 'ECONNRESET',
+                                           'ERR_INTERNET_DISCONNECTED', 'ERR_NETWORK_CHANGED')):
+        return 'conexion'
+    return 'otro'
+
+
+def normalizar_url(url: str, conservar_rutas_hash: bool = True) -> str:
+    """
+    Normaliza una URL para detectar duplicados en el rastreo.
+    
+    Pasa esquema y host a minúsculas, quita puertos por defecto y
+    parámetros de seguimiento, ordena la query y descarta el fragmento,
+    salvo las rutas hash de SPA (`#/curso/tema1`) si se conservan.
+    
+    Args:
+        url: URL absoluta
+        conservar_rutas_hash: Si los fragmentos que empiezan por '/' o '!/' se mantienen
+        
+    Returns:
+        URL normalizada
+    """
+    partes = urlsplit(url)
+    esquema = partes.scheme.lower()
+    host = (partes.hostname or '').lower()
+    try:
+        puerto = partes.port
+    except ValueError:
+        puerto = None
+    if puerto and (esquema, puerto) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{puerto}"
+    
+    ruta = partes.path or ('/' if esquema in ('http', 'https') else '')
+    parametros = [
+        (clave, valor) for clave, valor in parse_qsl(partes.query, keep_blank_values=True)
+        if not clave.lower().startswith(PARAMETROS_SEGUIMIENTO)
+    ]
+    query = urlencode(sorted(parametros))
+    
+    fragmento = partes.fragment
+    if not (conservar_rutas_hash and fragmento.startswith(('/', '!/'))):
+        fragmento = ''
+    
+    return urlunsplit((esquema, host, ruta, query, fragmento))
+
+
+def extraer_enlaces(html: str, base_url: str) -> List[str]:
+    """
+    Extrae los enlaces absolutos de los elementos <a> y <area> de un HTML.
+    
+    Respeta <base href> y resuelve los enlaces relativos, incluidas las
+    rutas hash de SPA (`href="#/curso/tema1"`).
+    
+    Args:
+        html: Contenido HTML
+        base_url: URL del documento
+        
+    Returns:
+        Enlaces absolutos en el orden en que aparecen
+    """
+    base = RE_BASE_HREF.search(html)
+    if base:
+        base_url = urljoin(base_url, base.group(2).strip())
+    
+    enlaces = []
+    for coincidencia in RE_ENLACES.finditer(html):
+        href = coincidencia.group(2).strip().replace('&amp;', '&')
+        if not href or href.lower().startswith(('javascript:', 'mailto:', 'tel:', 'data:')):
+            continue
+        enlaces.append(urljoin(base_url, href))
+    return enlaces
+
+
+def host_key(url: str) -> str:
+    """
+    Obtiene la clave de host usada por el planificador de cortesía.
+    
+    Args:
+        url: URL a clasificar
+        
+    Returns:
+        Nombre de host en minúsculas, o '' para archivos locales
+    """
+    if url.startswith('file://'):
+        return ''
+    return (urlparse(url).hostname or '').lower()
+
+
+def indice_fragmento(url: str, total: int, por_host: bool = True) -> int:
+    """
+    Asigna una URL a uno de `total` procesos de forma estable.
+    
+    Con `por_host` todas las URLs de un host caen en el mismo proceso, de
+    modo que la cortesía por host sigue valiendo para toda la ejecución.
+    Los archivos locales (y todas las URLs sin `por_host`) se reparten por
+    documento, conservando juntas las rutas SPA de un mismo documento.
+    
+    Args:
+        url: URL a repartir
+        total: Número de procesos
+        por_host: Repartir por host en lugar de por documento
+        
+    Returns:
+        Índice del proceso, entre 0 y total - 1
+    """
+    clave = host_key(url) if por_host else ''
+    if not clave:
+        clave = split_document_url(url)[0]
+    digest = hashlib.blake2b(clave.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % total
+
+
+def atomic_write_text(destino: Path, contenido: str) -> None:
+    """
+    Escribe un archivo de texto de forma atómica (archivo temporal + rename).
+    
+    Args:
+        destino: Ruta final del archivo
+        contenido: Texto a escribir en UTF-8
+    """
+    temporal = destino.with_name(f".{destino.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(contenido)
+        os.replace(temporal, destino)
+    finally:
+        if temporal.exists():
+            temporal.unlink()
+
+
+def content_hash(contenido: str) -> str:
+    """Calcula el hash SHA-256 de un texto."""
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+async def iterar_en_hilo(iterable: Iterable, lote: int = 256,
+                         max_espera_s: float = 0.05) -> AsyncIterator:
+    """
+    Recorre un iterable síncrono en un hilo sin bloquear el event loop.
+    
+    Sirve para fuentes que pueden bloquear, como stdin o un archivo grande.
+    Un hilo lector deja cada elemento en una cola acotada en cuanto lo lee, y
+    el event loop los recoge en lotes de hasta `lote`: un lote se entrega a
+    más tardar `max_espera_s` segundos después de su primer elemento, aunque
+    la fuente tarde en producir el siguiente (p. ej. stdin interactivo).
+    
+    Args:
+        iterable: Iterable síncrono (puede ser un generador perezoso)
+        lote: Máximo de elementos por salto al hilo
+        max_espera_s: Tiempo máximo acumulando un lote
+        
+    Yields:
+        Los elementos del iterable, en orden
+    """
+    lote = max(1, lote)
+    # Acotada: el hilo lector no se adelanta más de dos lotes al consumidor
+    cola: queue.Queue = queue.Queue(maxsize=lote * 2)
+    fin = object()
+    detenido = threading.Event()
+    
+    def entregar(elemento) -> bool:
+        while not detenido.is_set():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def leer() -> None:
+        try:
+            for elemento in iterable:
+                if not entregar((elemento, None)):
+                    return
+        except BaseException as e:
+            entregar((fin, e))
+        else:
+            entregar((fin, None))
+    
+    def siguiente_lote() -> list:
+        elementos = []
+        limite = None
+        while len(elementos) < lote and not detenido.is_set():
+            # Sin elementos se espera en tramos cortos para notar la cancelación
+            espera = 0.1 if limite is None else max(0.0, limite - time.monotonic())
+            try:
+                elemento = cola.get(timeout=espera)
+            except queue.Empty:
+                if limite is not None:
+                    break
+                continue
+            elementos.append(elemento)
+            if elemento[0] is fin:
+                break
+            if limite is None:
+                limite = time.monotonic() + max_espera_s
+        return elementos
+    
+    threading.Thread(target=leer, name='lector-entrada', daemon=True).start()
+    try:
+        while True:
+            for elemento, error in await asyncio.to_thread(siguiente_lote):
+                if elemento is fin:
+                    if error is not None:
+                        raise error
+                    return
+                yield elemento
+    finally:
+        detenido.set()
+
+
+def _peso_clase(elemento) -> float:
+    """Ajusta la puntuación de un candidato según su id y sus clases."""
+    nombre = ' '.join([elemento.get('id') or ''] + list(elemento.get('class') or []))
+    if not nombre.strip():
+        return 0.0
+    peso = 0.0
+    if RE_CANDIDATO_NEGATIVO.search(nombre):
+        peso -= 25
+    if RE_CANDIDATO_POSITIVO.search(nombre):
+        peso += 25
+    return peso
+
+
+def _densidad_enlaces(elemento) -> float:
+    """Fracción del texto de un elemento que está dentro de enlaces."""
+    texto = len(elemento.get_text(strip=True))
+    if not texto:
+        return 1.0
+    enlaces = sum(len(enlace.get_text(strip=True)) for enlace in elemento.find_all('a'))
+    return min(1.0, enlaces / texto)
+
+
+def localizar_contenido_principal(raiz):
+    """
+    Localiza el contenido principal con una puntuación estilo readability.
+    
+    Cada párrafo con texto suficiente suma puntos (por longitud y comas) a
+    su padre y la mitad a su abuelo; la puntuación se corrige con el id y
+    las clases del candidato y con su densidad de enlaces. Del mejor
+    candidato se sube mientras el padre apenas añada texto (títulos), para
+    no perder el encabezado de la sección.
+    
+    Args:
+        raiz: Elemento de BeautifulSoup donde buscar
+        
+    Returns:
+        Elemento con el contenido principal, o None si no hay candidatos
+    """
+    puntos: Dict[int, float] = {}
+    nodos: Dict[int, object] = {}
+    
+    for parrafo in raiz.find_all(ETIQUETAS_PARRAFO):
+        texto = parrafo.get_text(' ', strip=True)
+        if len(texto) < 25:
+            continue
+        valor = 1 + texto.count(',') + min(len(texto) // 100, 3)
+        for nivel, ancestro in enumerate(parrafo.parents):
+            if nivel > 1 or ancestro.name in (None, 'html', '[document]'):
+                break
+            clave = id(ancestro)
+            if clave not in nodos:
+                nodos[clave] = ancestro
+                puntos[clave] = _peso_clase(ancestro)
+            puntos[clave] += valor if nivel == 0 else valor / 2
+    
+    if not puntos:
+        return None
+    
+    mejor = max(puntos, key=lambda clave: puntos[clave] * (1 - _densidad_enlaces(nodos[clave])))
+    elemento = nodos[mejor]
+    
+    largo = len(elemento.get_text(strip=True))
+    while elemento.parent is not None and elemento.parent.name not in ('html', '[document]'):
+        largo_padre = len(elemento.parent.get_text(strip=True))
+        if largo_padre > largo * 1.25:
+            break
+        elemento, largo = elemento.parent, largo_padre
+    return elemento
+
+
+def podar_html(html_content: str, markdown_config: Dict):
+    """
+    Reduce el documento a la región de contenido antes de convertirlo.
+    
+    En una sola pasada sobre el árbol se eliminan los `strip_elements` (con
+    su contenido) y los comentarios; después se elige la raíz: el primer
+    `content_selector` que coincida, el contenido principal puntuado si
+    `readability` está activo, o el <body>.
+    
+    Args:
+        html_content: Contenido HTML completo
+        markdown_config: Sección `markdown` de la configuración
+        
+    Returns:
+        Elemento de BeautifulSoup con el contenido a convertir
+    """
+    parser = markdown_config.get('html_parser') or 'auto'
+    soup = BeautifulSoup(html_content, PARSER_HTML_PREDETERMINADO if parser == 'auto' else parser)
+    
+    eliminar = set(markdown_config.get('strip_elements', ['script', 'style']))
+    sobrantes = [
+        nodo for nodo in soup.descendants
+        if isinstance(nodo, Comment) or getattr(nodo, 'name', None) in eliminar
+    ]
+    for nodo in sobrantes:
+        nodo.extract()
+    
+    selectores = markdown_config.get('content_selector') or []
+    if isinstance(selectores, str):
+        selectores = [selectores]
+    for selector in selectores:
+        raiz = soup.select_one(selector)
+        if raiz is not None:
+            return raiz
+    
+    cuerpo = soup.body or soup
+    if markdown_config.get('readability', False):
+        principal = localizar_contenido_principal(cuerpo)
+        if principal is not None:
+            return principal
+    return cuerpo
+
+
+def etiquetas_prometheus(etiquetas: Dict[str, str]) -> str:
+    """
+    Formatea las etiquetas de una muestra de Prometheus.
+    
+    Args:
+        etiquetas: Nombre -> valor
+        
+    Returns:
+        Texto `{nombre="valor",...}` con los valores escapados, o vacío
+    """
+    if not etiquetas:
+        return ''
+    pares = []
+    for nombre, valor in etiquetas.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+
+def json_compacto(datos: Dict, claves_compactas: Tuple[str, ...]) -> str:
+    """
+    Serializa un diccionario con sangría, salvo las secciones indicadas.
+    
+    Cada entrada de las secciones de `claves_compactas` (p. ej. una URL con
+    sus métricas) ocupa una sola línea, así el archivo sigue siendo legible
+    sin crecer decenas de líneas por URL.
+    
+    Args:
+        datos: Diccionario a serializar (no se modifica)
+        claves_compactas: Claves de primer nivel cuyo valor es un diccionario
+        
+    Returns:
+        Texto JSON
+    """
+    secciones = {clave: datos[clave] for clave in claves_compactas if datos.get(clave)}
+    resto = {clave: valor for clave, valor in datos.items() if clave not in secciones}
+    if not secciones:
+        return json.dumps(resto, indent=2, ensure_ascii=False)
+    
+    bloques = []
+    for clave, seccion in secciones.items():
+        lineas = ',\n'.join(
+            f"    {json.dumps(nombre, ensure_ascii=False)}: "
+            f"{json.dumps(valor, ensure_ascii=False, separators=(',', ':'))}"
+            for nombre, valor in seccion.items()
+        )
+        bloques.append(f"  {json.dumps(clave)}: {{\n{lineas}\n  }}")
+    # Se reabre el objeto con sangría quitando su '\n}' final
+    inicio = json.dumps(resto, indent=2, ensure_ascii=False)[:-2] + ',\n' if resto else '{\n'
+    return inicio + ',\n'.join(bloques) + '\n}'
+
+
+def convertir_html_a_markdown(html_content: str, markdown_config: Dict) -> str:
+    """
+    Convierte HTML a Markdown según la sección `markdown` de la configuración.
+    
+    Es una función de módulo (sin estado del scraper) para poder ejecutarse
+    en un ProcessPoolExecutor. El HTML se poda primero (ver `podar_html()`)
+    y markdownify recibe el árbol ya reducido, sin volver a parsearlo.
+    
+    Args:
+        html_content: Contenido HTML a convertir
+        markdown_config: Sección `markdown` de la configuración
+        
+    Returns:
+        Contenido convertido a Markdown
+    """
+    if not html_content:
+        return ""
+    
+    raiz = podar_html(html_content, markdown_config)
+    markdown_content = MarkdownConverter(
+        convert=ETIQUETAS_CONVERTIDAS,
+        heading_style='ATX'
+    ).convert_soup(raiz)
+    
+    # Limpiar contenido si está habilitado
+    if markdown_config.get('clean_excessive_whitespace', True):
+        markdown_content = limpiar_markdown(markdown_content, markdown_config.get('cleanup'))
+    
+    return markdown_content
+
+
+# Separador interno entre los fragmentos que se limpian (NUL no es válido en HTML)
+SEPARADOR_LIMPIEZA = '\x00'
+# Fin de una tabla: la primera línea que no empieza por '|'
+RE_FIN_TABLA = re.compile(r'\n(?![ ]{0,3}\|)')
+# Valla de apertura (con su cadena de información) y línea de cierre de un bloque de código
+RE_VALLA_APERTURA = re.compile(r'(`{3,}|~{3,})([^\n]*)')
+RE_VALLA_CIERRE = re.compile(r'(`{3,}|~{3,})([ \t]*)(?:\n|\Z)')
+RE_ESPACIOS_MULTIPLES = re.compile(r'  +')
+
+
+@lru_cache(maxsize=8)
+def _compilar_limpieza(reglas_json: str) -> Dict:
+    """
+    Compila (una vez por configuración) las reglas de la limpieza de Markdown.
+    
+    Args:
+        reglas_json: Sección `markdown.cleanup` serializada de forma estable
+        
+    Returns:
+        Diccionario con las reglas efectivas, las reglas extra compiladas y el
+        reemplazo de líneas vacías (o None si está desactivado)
+    """
+    reglas = dict(REGLAS_LIMPIEZA_PREDETERMINADAS, **json.loads(reglas_json))
+    
+    extra = [(re.compile(regla['pattern'], re.MULTILINE), regla.get('replace', ''))
+             for regla in reglas.get('extra_rules') or []]
+    
+    lineas_vacias = None
+    if reglas['max_blank_lines'] is not None:
+        maximo = max(0, int(reglas['max_blank_lines']))
+        # Patrón con prefijo literal: el motor lo localiza sin probar cada línea
+        lineas_vacias = (re.compile('\n' * (maximo + 2) + '+'), '\n' * (maximo + 1))
+    
+    return {'reglas': reglas, 'extra': extra, 'lineas_vacias': lineas_vacias}
+
+
+def _fin_bloque_cercado(texto: str, inicio: int) -> Optional[int]:
+    """
+    Devuelve el final del bloque de código cercado que abre en `inicio`.
+    
+    Args:
+        texto: Documento Markdown
+        inicio: Posición del primer carácter de la valla (``` o ~~~)
+        
+    Returns:
+        Posición del final de la línea de cierre (o del documento si el bloque
+        no se cierra), o None si la línea no abre un bloque
+    """
+    apertura = RE_VALLA_APERTURA.match(texto, inicio)
+    valla = apertura.group(1)
+    # ```x``` en una línea es código en línea, no una valla
+    if valla[0] == '`' and '`' in apertura.group(2):
+        return None
+    
+    busqueda = apertura.end()
+    while True:
+        cierre = texto.find(valla[:3], busqueda)
+        if cierre < 0:
+            return len(texto)
+        linea = RE_VALLA_CIERRE.match(texto, cierre)
+        inicio_linea = texto.rfind('\n', 0, cierre) + 1
+        if (linea and len(linea.group(1)) >= len(valla) and linea.group(1)[0] == valla[0]
+                and cierre - inicio_linea <= 3 and not texto[inicio_linea:cierre].strip(' ')):
+            return linea.end(1) + len(linea.group(2))
+        busqueda = cierre + 3
+
+
+def _regiones_protegidas(texto: str, codigo: bool, tablas: bool) -> List[Tuple[int, int]]:
+    """
+    Localiza los bloques de código cercados y las tablas del documento.
+    
+    Solo se buscan las marcas (```, ~~~ y |) con `str.find`, y cada bloque se
+    salta de una vez, así que el coste no depende del número de líneas.
+    
+    Args:
+        texto: Documento Markdown
+        codigo: Proteger bloques de código cercados
+        tablas: Proteger tablas
+        
+    Returns:
+        Lista ordenada de intervalos (inicio, fin) que no deben modificarse
+    """
+    fin_texto = len(texto)
+    marcas = (['```', '~~~'] if codigo else []) + (['|'] if tablas else [])
+    siguiente = [texto.find(marca) for marca in marcas]
+    siguiente = [posicion if posicion >= 0 else fin_texto for posicion in siguiente]
+    regiones = []
+    
+    while True:
+        posicion = min(siguiente, default=fin_texto)
+        if posicion >= fin_texto:
+            return regiones
+        marca = marcas[siguiente.index(posicion)]
+        avance = posicion + 1
+        
+        # La marca debe abrir la línea (con hasta 3 espacios de sangría)
+        inicio_linea = texto.rfind('\n', 0, posicion) + 1
+        if posicion - inicio_linea <= 3 and not texto[inicio_linea:posicion].strip(' '):
+            if marca == '|':
+                fin_tabla = RE_FIN_TABLA.search(texto, posicion)
+                fin = fin_tabla.start() if fin_tabla else fin_texto
+            else:
+                fin = _fin_bloque_cercado(texto, posicion)
+            if fin is not None:
+                regiones.append((inicio_linea, fin))
+                avance = fin
+        
+        for i, otra_posicion in enumerate(siguiente):
+            if otra_posicion < avance:
+                encontrada = texto.find(marcas[i], avance)
+                siguiente[i] = encontrada if encontrada >= 0 else fin_texto
+
+
+def _colapsar_espacios(coincidencia: re.Match) -> str:
+    """Reduce una racha de espacios a uno, salvo la sangría al inicio de línea."""
+    inicio = coincidencia.start()
+    if inicio == 0 or coincidencia.string[inicio - 1] in ('\n', SEPARADOR_LIMPIEZA):
+        return coincidencia.group(0)
+    return ' '
+
+
+def limpiar_markdown(markdown: str, reglas: Optional[Dict] = None) -> str:
+    """
+    Limpia y optimiza el contenido Markdown.
+    
+    Los bloques de código cercados y las tablas se apartan intactos; el resto
+    se une en un único texto sobre el que cada regla es una sola pasada en C
+    (patrón precompilado o método de `str`), y las reglas que no tienen nada
+    que hacer se omiten tras una comprobación `in`. Las `extra_rules` se
+    aplican por separado a cada fragmento entre bloques protegidos, así que
+    nunca abarcan ni alteran un bloque.
+    
+    Args:
+        markdown: Contenido Markdown a limpiar
+        reglas: Sección `markdown.cleanup` (ver `REGLAS_LIMPIEZA_PREDETERMINADAS`)
+        
+    Returns:
+        Contenido Markdown limpio
+    """
+    if not markdown:
+        return ""
+    
+    compilado = _compilar_limpieza(json.dumps(reglas or {}, sort_keys=True))
+    reglas = compilado['reglas']
+    
+    texto = markdown.replace(SEPARADOR_LIMPIEZA, '')
+    protegidos = []
+    regiones = _regiones_protegidas(texto, reglas['protect_code'], reglas['protect_tables'])
+    if regiones:
+        fragmentos = []
+        inicio = 0
+        for region_inicio, region_fin in regiones:
+            fragmentos.append(texto[inicio:region_inicio])
+            protegidos.append(texto[region_inicio:region_fin])
+            inicio = region_fin
+        fragmentos.append(texto[inicio:])
+        texto = SEPARADOR_LIMPIEZA.join(fragmentos)
+    
+    if reglas['strip_trailing_spaces'] and (' \n' in texto or '\t\n' in texto):
+        # Más rápido que `[ \t]+$` con MULTILINE, que prueba cada posición
+        texto = '\n'.join([linea.rstrip(' \t') for linea in texto.split('\n')])
+    if reglas['collapse_spaces'] and '  ' in texto:
+        texto = RE_ESPACIOS_MULTIPLES.sub(_colapsar_espacios, texto)
+    if compilado['extra']:
+        # Las reglas del usuario se aplican fragmento a fragmento: una regla que
+        # abarcase un separador desplazaría los bloques protegidos al reinsertarlos
+        fragmentos = texto.split(SEPARADOR_LIMPIEZA)
+        for patron, sustitucion in compilado['extra']:
+            fragmentos = [patron.sub(sustitucion, fragmento) for fragmento in fragmentos]
+        texto = SEPARADOR_LIMPIEZA.join(fragmento.replace(SEPARADOR_LIMPIEZA, '') for fragmento in fragmentos)
+    if compilado['lineas_vacias']:
+        patron, sustitucion = compilado['lineas_vacias']
+        texto = patron.sub(sustitucion, texto)
+    
+    if protegidos:
+        fragmentos = texto.split(SEPARADOR_LIMPIEZA)
+        partes = [fragmentos[0]]
+        for bloque, fragmento in zip(protegidos, fragmentos[1:]):
+            partes.append(bloque)
+            partes.append(fragmento)
+        texto = ''.join(partes)
+    
+    return texto.strip()
+
+
+class HistogramaLatencias:
+    """
+    Histograma de latencias con buckets fijos (`LIMITES_HISTOGRAMA_S`).
+    
+    Ocupa lo mismo con diez URLs que con un millón; los percentiles se
+    estiman interpolando dentro del bucket, acotados por el mínimo y el
+    máximo observados.
+    """
+    
+    def __init__(self, limites: Tuple[float, ...] = LIMITES_HISTOGRAMA_S):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)  # El último bucket es +Inf
+        self.total = 0
+        self.suma = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+    
+    def observar(self, segundos: float) -> None:
+        """Registra una medición."""
+        self.conteos[bisect.bisect_left(self.limites, segundos)] += 1
+        self.total += 1
+        self.suma += segundos
+        self.minimo = min(self.minimo, segundos)
+        self.maximo = max(self.maximo, segundos)
+    
+    def percentil(self, p: float) -> float:
+        """
+        Estima un percentil.
+        
+        Args:
+            p: Percentil entre 0 y 100
+            
+        Returns:
+            Latencia estimada en segundos (0 si no hay mediciones)
+        """
+        if not self.total:
+            return 0.0
+        objetivo = p / 100 * self.total
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            if conteo and acumulado + conteo >= objetivo:
+                inferior = max(self.limites[i - 1] if i > 0 else 0.0, self.minimo)
+                superior = min(self.limites[i] if i < len(self.limites) else self.maximo, self.maximo)
+                return inferior + (superior - inferior) * (objetivo - acumulado) / conteo
+            acumulado += conteo
+        return self.maximo
+    
+    def resumen(self) -> Dict:
+        """Forma compacta para `estadisticas_procesamiento.json` (tiempos en ms)."""
+        return {
+            'n': self.total,
+            'media_ms': round(self.suma / self.total * 1000, 1) if self.total else 0,
+            'p50_ms': round(self.percentil(50) * 1000, 1),
+            'p95_ms': round(self.percentil(95) * 1000, 1),
+            'p99_ms': round(self.percentil(99) * 1000, 1),
+            'max_ms': round(self.maximo * 1000, 1),
+            'buckets': self.conteos,
+        }
+    
+    def exportar(self) -> Dict:
+        """Estado completo en forma serializable a JSON (ver `importar`)."""
+        return {
+            'limites': list(self.limites),
+            'conteos': self.conteos,
+            'total': self.total,
+            'suma': self.suma,
+            'minimo': None if math.isinf(self.minimo) else self.minimo,
+            'maximo': self.maximo,
+        }
+    
+    @classmethod
+    def importar(cls, datos: Dict) -> 'HistogramaLatencias':
+        """Reconstruye un histograma exportado con `exportar`."""
+        histograma = cls(tuple(datos['limites']))
+        histograma.conteos = list(datos['conteos'])
+        histograma.total = datos['total']
+        histograma.suma = datos['suma']
+        histograma.minimo = math.inf if datos['minimo'] is None else datos['minimo']
+        histograma.maximo = datos['maximo']
+        return histograma
+    
+    def combinar(self, otro: 'HistogramaLatencias') -> None:
+        """Suma las mediciones de otro histograma con los mismos límites."""
+        for i, conteo in enumerate(otro.conteos):
+            self.conteos[i] += conteo
+        self.total += otro.total
+        self.suma += otro.suma
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+
+# Campos de EstadisticasProcesamiento que crecen con una entrada por URL
+CAMPOS_POR_URL = ('urls_procesadas', 'urls_fallidas', 'metricas_por_url', 'red_por_url',
+                  'esperas_contenido_ms')
+
+
+@dataclass
+class EstadisticasProcesamiento:
+    """Clase para almacenar estadísticas del procesamiento."""
+    inicio: float = 0
+    fin: float = 0
+    archivos_procesados: int = 0
+    archivos_fallidos: int = 0
+    total_palabras: int = 0
+    total_caracteres: int = 0
+    pool_aciertos: int = 0
+    pool_fallos: int = 0
+    pool_reciclajes: int = 0
+    cargas_completas: int = 0
+    navegaciones_hash: int = 0
+    tiempo_espera_contenido: float = 0
+    esperas_contenido_ms: Dict[str, float] = None
+    profundidad_max_colas: Dict[str, int] = None
+    cache_aciertos: int = 0
+    cache_fallos: int = 0
+    cache_bytes_ahorrados: int = 0
+    salidas_omitidas: int = 0
+    salidas_reescritas: int = 0
+    trabajos_reanudados: int = 0
+    urls_descubiertas: int = 0
+    urls_duplicadas: int = 0
+    descargas_estaticas: int = 0
+    bytes_html_navegador: int = 0
+    recurrencias_navegador: int = 0
+    solicitudes_bloqueadas: int = 0
+    bytes_red: int = 0
+    red_por_url: Dict[str, Dict[str, int]] = None
+    reintentos: int = 0
+    errores_por_categoria: Dict[str, int] = None
+    latencias: Dict[str, HistogramaLatencias] = None
+    metricas_por_url: Dict[str, Dict] = None
+    paginas_descargadas: int = 0
+    paginas_convertidas: int = 0
+    bytes_html: int = 0
+    bytes_markdown: int = 0
+    memoria_navegador_max_mb: float = 0
+    memoria_proceso_max_mb: float = 0
+    procesos: int = 1
+    urls_procesadas: List[str] = None
+    urls_fallidas: List[str] = None
+    
+    def __post_init__(self):
+        if self.urls_procesadas is None:
+            self.urls_procesadas = []
+        if self.urls_fallidas is None:
+            self.urls_fallidas = []
+        if self.esperas_contenido_ms is None:
+            self.esperas_contenido_ms = {}
+        if self.profundidad_max_colas is None:
+            self.profundidad_max_colas = {}
+        if self.red_por_url is None:
+            self.red_por_url = {}
+        if self.errores_por_categoria is None:
+            self.errores_por_categoria = {}
+        if self.latencias is None:
+            self.latencias = {}
+        if self.metricas_por_url is None:
+            self.metricas_por_url = {}
+    
+    @property
+    def duracion(self) -> float:
+        """Calcula la duración total del procesamiento."""
+        return self.fin - self.inicio if self.fin > self.inicio else 0
+    
+    @property
+    def total_archivos(self) -> int:
+        """Retorna el total de archivos procesados."""
+        return self.archivos_procesados + self.archivos_fallidos
+    
+    @property
+    def tasa_exito(self) -> float:
+        """Calcula la tasa de éxito en porcentaje."""
+        if self.total_archivos == 0:
+            return 0
+        return (self.archivos_procesados / self.total_archivos) * 100
+    
+    def registrar_etapa(self, etapa: str, segundos: float) -> None:
+        """
+        Añade una medición al histograma de una etapa.
+        
+        Args:
+            etapa: Nombre de la etapa (navegacion, conversion, cola_descarga...)
+            segundos: Duración medida
+        """
+        histograma = self.latencias.get(etapa)
+        if histograma is None:
+            histograma = self.latencias[etapa] = HistogramaLatencias()
+        histograma.observar(segundos)
+    
+    def combinar(self, otra: 'EstadisticasProcesamiento') -> None:
+        """
+        Incorpora las estadísticas de otro proceso (modo `--processes`).
+        
+        Los contadores se suman, los máximos se combinan con max, las listas
+        y los diccionarios por URL se unen y los histogramas se suman bucket
+        a bucket. `inicio`, `fin` y `procesos` no se modifican.
+        
+        Args:
+            otra: Estadísticas de un proceso de fragmento
+        """
+        for campo in fields(self):
+            nombre = campo.name
+            if nombre in ('inicio', 'fin', 'procesos'):
+                continue
+            propio, ajeno = getattr(self, nombre), getattr(otra, nombre)
+            if nombre == 'latencias':
+                for etapa, histograma in ajeno.items():
+                    if etapa in propio:
+                        propio[etapa].combinar(histograma)
+                    else:
+                        propio[etapa] = histograma
+            elif nombre == 'profundidad_max_colas':
+                for cola, profundidad in ajeno.items():
+                    propio[cola] = max(propio.get(cola, 0), profundidad)
+            elif nombre == 'errores_por_categoria':
+                for categoria, total in ajeno.items():
+                    propio[categoria] = propio.get(categoria, 0) + total
+            elif isinstance(propio, dict):
+                propio.update(ajeno)
+            elif isinstance(propio, list):
+                propio.extend(ajeno)
+            elif nombre.endswith('_max_mb'):
+                setattr(self, nombre, max(propio, ajeno))
+            else:
+                setattr(self, nombre, propio + ajeno)
+    
+    def exportar(self, por_url: bool = True) -> Dict:
+        """
+        Convierte las estadísticas a un diccionario serializable a JSON.
+        
+        Args:
+            por_url: Incluir las listas y diccionarios con una entrada por URL
+            
+        Returns:
+            Diccionario reconstruible con `importar`
+        """
+        datos = {}
+        for campo in fields(self):
+            valor = getattr(self, campo.name)
+            if campo.name == 'latencias':
+                valor = {etapa: histograma.exportar() for etapa, histograma in valor.items()}
+            elif not por_url and campo.name in CAMPOS_POR_URL:
+                continue
+            datos[campo.name] = copy.deepcopy(valor) if isinstance(valor, (dict, list)) else valor
+        return datos
+    
+    @classmethod
+    def importar(cls, datos: Dict) -> 'EstadisticasProcesamiento':
+        """Reconstruye estadísticas exportadas con `exportar` (ignora campos desconocidos)."""
+        nombres = {campo.name for campo in fields(cls)}
+        estadisticas = cls(**{nombre: valor for nombre, valor in datos.items() if nombre in nombres})
+        estadisticas.latencias = {
+            etapa: HistogramaLatencias.importar(histograma)
+            for etapa, histograma in estadisticas.latencias.items()
+        }
+        return estadisticas
+    
+    def imprimir_resumen(self):
+        """Imprime un resumen detallado de las estadísticas."""
+        print("\n" + "="*60)
+        print("📊 ESTADÍSTICAS FINALES DEL PROCESAMIENTO")
+        print("="*60)
+        print(f"📄 Total de archivos procesados: {self.total_archivos}")
+        print(f"✅ Exitosos: {self.archivos_procesados}")
+        print(f"❌ Fallidos: {self.archivos_fallidos}")
+        print(f"📈 Tasa de éxito: {self.tasa_exito:.1f}%")
+        print(f"📝 Total de palabras extraídas: {self.total_palabras:,}")
+        print(f"📏 Total de caracteres: {self.total_caracteres:,}")
+        print(f"⏱️ Tiempo total: {self.duracion:.2f} segundos")
+        
+        if self.procesos > 1:
+            print(f"🧩 Procesos: {self.procesos} (un navegador y un pipeline por proceso)")
+        
+        if self.archivos_procesados > 0:
+            tiempo_promedio = self.duracion / self.archivos_procesados
+            palabras_promedio = self.total_palabras // self.archivos_procesados
+            print(f"⚡ Tiempo promedio por archivo: {tiempo_promedio:.2f}s")
+            print(f"📊 Palabras promedio por archivo: {palabras_promedio:,}")
+        
+        if self.pool_aciertos or self.pool_fallos:
+            print(f"♻️ Pool de páginas: {self.pool_aciertos} reutilizadas, "
+                  f"{self.pool_fallos} creadas, {self.pool_reciclajes} recicladas")
+        
+        if self.navegaciones_hash:
+            print(f"🧭 Rutas SPA: {self.cargas_completas} cargas completas, "
+                  f"{self.navegaciones_hash} navegaciones por hash")
+        
+        esperas = self.latencias.get('espera_contenido')
+        if esperas is not None and esperas.total:
+            espera_promedio = self.tiempo_espera_contenido / esperas.total
+            print(f"⏳ Espera promedio de contenido: {espera_promedio:.2f}s")
+        
+        if self.descargas_estaticas or self.recurrencias_navegador:
+            print(f"⚡ Descargas sin navegador: {self.descargas_estaticas} "
+                  f"({self.recurrencias_navegador} requirieron navegador)")
+        
+        if self.bytes_html_navegador:
+            print(f"📤 HTML recibido del navegador: {self.bytes_html_navegador:,} caracteres")
+        
+        if self.solicitudes_bloqueadas or self.bytes_red:
+            print(f"🚫 Red: {self.solicitudes_bloqueadas:,} solicitudes bloqueadas, "
+                  f"{self.bytes_red:,} bytes descargados")
+        
+        if self.cache_aciertos or self.cache_fallos:
+            print(f"🗄️ Caché HTML: {self.cache_aciertos} aciertos, {self.cache_fallos} fallos, "
+                  f"{self.cache_bytes_ahorrados:,} bytes sin renderizar")
+        
+        if self.salidas_omitidas:
+            print(f"⏭️ Salidas sin cambios: {self.salidas_omitidas} omitidas, "
+                  f"{self.salidas_reescritas} escritas")
+        
+        if self.urls_descubiertas:
+            print(f"🕸️ Rastreo: {self.urls_descubiertas} URLs descubiertas, "
+                  f"{self.urls_duplicadas} duplicadas descartadas")
+        
+        if self.trabajos_reanudados:
+            print(f"⏯️ Reanudación: {self.trabajos_reanudados} URLs ya completadas omitidas")
+        
+        if self.profundidad_max_colas:
+            colas = ", ".join(f"{nombre}: {valor}" for nombre, valor in self.profundidad_max_colas.items())
+            print(f"📦 Profundidad máxima de colas: {colas}")
+        
+        if self.latencias:
+            print("⏱️ Latencia por etapa (p50 / p95 / p99):")
+            for etapa, histograma in self.latencias.items():
+                print(f"   • {etapa}: {histograma.percentil(50) * 1000:.0f} / "
+                      f"{histograma.percentil(95) * 1000:.0f} / {histograma.percentil(99) * 1000:.0f} ms "
+                      f"({histograma.total} mediciones)")
+        
+        if self.bytes_html or self.bytes_markdown:
+            print(f"📐 Tamaño: {self.bytes_html:,} caracteres de HTML -> {self.bytes_markdown:,} de Markdown")
+        
+        memoria = []
+        if self.memoria_navegador_max_mb:
+            memoria.append(f"{self.memoria_navegador_max_mb:.1f} MB de heap JS por página")
+        if self.memoria_proceso_max_mb:
+            memoria.append(f"{self.memoria_proceso_max_mb:.1f} MB del proceso")
+        if memoria:
+            print(f"🧠 Memoria máxima: {', '.join(memoria)}")
+        
+        if self.errores_por_categoria:
+            errores = ", ".join(f"{categoria}: {total}" for categoria, total in self.errores_por_categoria.items())
+            print(f"🔄 Reintentos: {self.reintentos} (errores por tipo: {errores})")
+        
+        if self.urls_fallidas:
+            print(f"\n❌ URLs que fallaron:")
+            for url in self.urls_fallidas:
+                print(f"   • {url}")
+        
+        print("="*60)
+
+
+class CacheHTML:
+    """
+    Caché en disco del HTML renderizado.
+    
+    Cada entrada se direcciona por el hash de la URL y de la parte de la
+    configuración que afecta al renderizado, y guarda junto al HTML los
+    validadores necesarios para revalidarla: ETag/Last-Modified para http(s)
+    o mtime/tamaño para file://.
+    """
+    
+    def __init__(self, directorio: Path, huella_config: str):
+        """
+        Inicializa la caché.
+        
+        Args:
+            directorio: Directorio donde guardar las entradas
+            huella_config: Serialización estable de la configuración relevante
+        """
+        self.directorio = directorio
+        self.huella_config = huella_config
+        self.directorio.mkdir(parents=True, exist_ok=True)
+    
+    def _clave(self, url: str) -> str:
+        """Calcula la clave de contenido de una URL."""
+        return hashlib.sha256(f"{url}\n{self.huella_config}".encode('utf-8')).hexdigest()
+    
+    def leer(self, url: str) -> Optional[Tuple[str, Dict]]:
+        """
+        Lee una entrada de la caché.
+        
+        Args:
+            url: URL de la entrada
+            
+        Returns:
+            Tupla (html, metadatos) o None si no existe o está corrupta
+        """
+        clave = self._clave(url)
+        try:
+            metadatos = json.loads((self.directorio / f"{clave}.json").read_text(encoding='utf-8'))
+            html = (self.directorio / f"{clave}.html").read_text(encoding='utf-8')
+        except (OSError, ValueError):
+            return None
+        return html, metadatos
+    
+    def guardar(self, url: str, html: str, validadores: Dict, podado: bool = False,
+                enlaces: Optional[List[str]] = None) -> None:
+        """
+        Guarda una entrada de forma atómica (archivo temporal + rename).
+        
+        Args:
+            url: URL de la entrada
+            html: HTML renderizado
+            validadores: Validadores para revalidar la entrada más adelante
+            podado: Si el HTML es solo la región de contenido extraída en el
+                navegador, sin la navegación ni el pie de la página
+            enlaces: Enlaces del documento completo, si se recogieron
+        """
+        clave = self._clave(url)
+        metadatos = {'url': url, 'validadores': validadores, 'guardado': time.time(), 'podado': podado}
+        if enlaces is not None:
+            metadatos['enlaces'] = enlaces
+        atomic_write_text(self.directorio / f"{clave}.html", html)
+        atomic_write_text(self.directorio / f"{clave}.json", json.dumps(metadatos, ensure_ascii=False))
+    
+    @staticmethod
+    def validadores_archivo(url: str) -> Optional[Dict]:
+        """
+        Obtiene mtime y tamaño del documento local de una URL file://.
+        
+        Args:
+            url: URL file://
+            
+        Returns:
+            Diccionario con mtime_ns y size, o None si el archivo no existe
+        """
+        try:
+            info = file_url_to_path(url).stat()
+        except OSError:
+            return None
+        return {'mtime_ns': info.st_mtime_ns, 'size': info.st_size}
+    
+    @staticmethod
+    def validadores_http(headers: Dict[str, str]) -> Dict:
+        """
+        Extrae ETag y Last-Modified de las cabeceras de una respuesta.
+        
+        Args:
+            headers: Cabeceras de la respuesta (nombres en minúsculas)
+            
+        Returns:
+            Diccionario con los validadores presentes
+        """
+        return {nombre: headers[nombre] for nombre in ('etag', 'last-modified') if headers.get(nombre)}
+
+
+class ManifiestoSalida:
+    """
+    Manifiesto del directorio de salida para ejecuciones incrementales.
+    
+    Relaciona cada URL con el hash de su HTML, el hash de su Markdown, el
+    archivo generado y la configuración de conversión usada, de modo que las
+    salidas sin cambios no se vuelvan a convertir ni a escribir.
+    """
+    
+    NOMBRE_ARCHIVO = '.manifiesto.json'
+    
+    def __init__(self, output_dir: Path, huella_config: str, destino: Optional[Path] = None):
+        """
+        Carga el manifiesto existente, si lo hay.
+        
+        Args:
+            output_dir: Directorio de salida
+            huella_config: Serialización de la configuración de conversión
+            destino: Archivo donde guardar solo las entradas actualizadas, en
+                lugar de reescribir el manifiesto (procesos de `--processes`)
+        """
+        self.ruta = output_dir / self.NOMBRE_ARCHIVO
+        self.huella_config = huella_config
+        self.destino = destino
+        self._lock = threading.Lock()
+        self._modificado = False
+        self._actualizadas: set = set()
+        try:
+            self.entradas: Dict[str, Dict] = json.loads(self.ruta.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.entradas = {}
+    
+    def sin_cambios(self, url: str, html_hash: str, filename: str) -> Optional[Dict]:
+        """
+        Comprueba si la salida de una URL puede reutilizarse sin convertir.
+        
+        Args:
+            url: URL procesada
+            html_hash: Hash del HTML obtenido en esta ejecución
+            filename: Archivo de salida esperado
+            
+        Returns:
+            Entrada del manifiesto si el HTML, la configuración y el archivo
+            coinciden con la ejecución anterior; None en otro caso
+        """
+        entrada = self.entradas.get(url)
+        if (entrada and entrada.get('html_hash') == html_hash
+                and entrada.get('config') == self.huella_config
+                and entrada.get('archivo') == filename
+                and (self.ruta.parent / filename).exists()):
+            return entrada
+        return None
+    
+    def markdown_sin_cambios(self, url: str, markdown_hash: str, filename: str) -> bool:
+        """Indica si el archivo existente ya contiene exactamente este Markdown."""
+        entrada = self.entradas.get(url)
+        return bool(entrada and entrada.get('markdown_hash') == markdown_hash
+                    and entrada.get('archivo') == filename
+                    and (self.ruta.parent / filename).exists())
+    
+    def actualizar(self, url: str, **datos) -> None:
+        """Registra los datos de la última salida de una URL."""
+        with self._lock:
+            self.entradas[url] = dict(datos, config=self.huella_config)
+            self._actualizadas.add(url)
+            self._modificado = True
+    
+    def guardar(self, fusionar: bool = False) -> None:
+        """
+        Persiste el manifiesto (o las entradas actualizadas) de forma atómica si hubo cambios.
+        
+        Args:
+            fusionar: Releer el manifiesto del disco y añadirle solo las entradas
+                actualizadas, por si otro worker lo guardó mientras tanto
+        """
+        with self._lock:
+            if not self._modificado:
+                return
+            if fusionar and self.destino is None:
+                try:
+                    entradas = json.loads(self.ruta.read_text(encoding='utf-8'))
+                except (OSError, ValueError):
+                    entradas = {}
+                entradas.update((url, self.entradas[url]) for url in self._actualizadas)
+                contenido = json.dumps(entradas, indent=1, ensure_ascii=False)
+            elif self.destino is None:
+                contenido = json.dumps(self.entradas, indent=1, ensure_ascii=False)
+            else:
+                actualizadas = {url: self.entradas[url] for url in self._actualizadas}
+                contenido = json.dumps(actualizadas, indent=1, ensure_ascii=False)
+            self._modificado = False
+        atomic_write_text(self.destino or self.ruta, contenido)
+    
+    @classmethod
+    def ruta_fragmento(cls, output_dir: Path, indice: int) -> Path:
+        """Archivo de entradas actualizadas del proceso `indice` en modo `--processes`."""
+        return output_dir / f".manifiesto.fragmento{indice}.json"
+    
+    def incorporar(self, ruta: Path) -> int:
+        """
+        Une al manifiesto las entradas guardadas por un proceso y borra su archivo.
+        
+        Args:
+            ruta: Archivo de entradas actualizadas (ver `ruta_fragmento`)
+            
+        Returns:
+            Número de entradas incorporadas
+        """
+        try:
+            entradas = json.loads(ruta.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return 0
+        with self._lock:
+            self.entradas.update(entradas)
+            self._actualizadas.update(entradas)
+            self._modificado = self._modificado or bool(entradas)
+        ruta.unlink()
+        return len(entradas)
+
+
+class DiarioTrabajos:
+    """
+    Diario persistente (SQLite) del estado de cada URL de una ejecución.
+    
+    Cada URL pasa por los estados pendiente, descargado, convertido y
+    completado o fallido. Los cambios se acumulan en memoria (solo el último
+    estado de cada URL) y se vuelcan en lotes dentro de una sola transacción,
+    de modo que el diario no frena al pipeline. Si la ejecución se
+    interrumpe, `--resume` omite las URLs ya completadas.
+    
+    Varios procesos (`run_sharded`) pueden compartir el archivo: un volcado
+    escribe fuera del lock de los cambios, así que `registrar` no espera a
+    SQLite, y las consultas usan su propia conexión, que en modo WAL lee
+    mientras otra escribe. Si un volcado falla sus cambios vuelven a la
+    memoria para el siguiente.
+    """
+    
+    NOMBRE_ARCHIVO = '.trabajos.sqlite'
+    
+    def __init__(self, output_dir: Path, lote: int = 200, intervalo_s: float = 2.0,
+                 timeout_s: float = 30.0):
+        """
+        Abre (o crea) el diario en el directorio de salida.
+        
+        Args:
+            output_dir: Directorio de salida
+            lote: Cambios acumulados que fuerzan un volcado
+            intervalo_s: Segundos máximos entre volcados
+            timeout_s: Espera máxima por el bloqueo de escritura de otro proceso
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        self.ruta = output_dir / self.NOMBRE_ARCHIVO
+        self.lote = max(1, lote)
+        self.intervalo_s = intervalo_s
+        self._lock = threading.Lock()
+        self._lock_escritura = threading.Lock()
+        self._lock_lectura = threading.Lock()
+        self._cambios: Dict[str, Tuple] = {}
+        self._ultimo_volcado = time.monotonic()
+        
+        self._conexion = sqlite3.connect(str(self.ruta), timeout=timeout_s, check_same_thread=False)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute('PRAGMA synchronous=NORMAL')
+        self._conexion.execute(
+            'CREATE TABLE IF NOT EXISTS trabajos ('
+            ' url TEXT PRIMARY KEY,'
+            ' indice INTEGER,'
+            ' estado TEXT NOT NULL,'
+            ' fallos INTEGER NOT NULL DEFAULT 0,'
+            ' error TEXT,'
+            ' actualizado REAL NOT NULL,'
+            ' profundidad INTEGER)'
+        )
+        columnas = {fila[1] for fila in self._conexion.execute('PRAGMA table_info(trabajos)')}
+        if 'profundidad' not in columnas:
+            # Diarios creados antes del modo rastreo reanudable
+            self._conexion.execute('ALTER TABLE trabajos ADD COLUMN profundidad INTEGER')
+        self._conexion.commit()
+        self._lectura = sqlite3.connect(str(self.ruta), timeout=timeout_s, check_same_thread=False)
+    
+    def reiniciar(self) -> None:
+        """Descarta el estado de ejecuciones anteriores."""
+        with self._lock:
+            self._cambios.clear()
+        with self._lock_escritura, self._conexion:
+            self._conexion.execute('DELETE FROM trabajos')
+    
+    def registrar(self, url: str, estado: str, indice: Optional[int] = None,
+                  error: Optional[str] = None, profundidad: Optional[int] = None) -> None:
+        """
+        Anota el nuevo estado de una URL para el siguiente volcado.
+        
+        Args:
+            url: URL del trabajo
+            estado: pendiente, descargado, convertido, completado o fallido
+            indice: Índice de la URL en la lista de entrada
+            error: Descripción del error si el estado es fallido
+            profundidad: Profundidad de la URL en el modo rastreo
+        """
+        with self._lock:
+            anterior = self._cambios.get(url)
+            if anterior is not None:
+                if indice is None:
+                    indice = anterior[1]
+                if profundidad is None:
+                    profundidad = anterior[6]
+            self._cambios[url] = (url, indice, estado, error, time.time(), int(estado == 'fallido'),
+                                  profundidad)
+    
+    def debe_volcar(self) -> bool:
+        """Indica si hay suficientes cambios o tiempo acumulado para volcar."""
+        with self._lock:
+            if not self._cambios:
+                return False
+            return (len(self._cambios) >= self.lote
+                    or time.monotonic() - self._ultimo_volcado >= self.intervalo_s)
+    
+    def volcar(self) -> int:
+        """
+        Escribe los cambios acumulados en una sola transacción.
+        
+        Los cambios se retiran de la memoria antes de escribir, de modo que
+        `registrar` sigue sin esperas mientras SQLite trabaja. Si la escritura
+        falla se reincorporan sin pisar los estados registrados después.
+        
+        Returns:
+            Número de filas escritas
+        
+        Raises:
+            sqlite3.Error: Si la transacción no pudo escribirse
+        """
+        with self._lock:
+            cambios, self._cambios = self._cambios, {}
+            self._ultimo_volcado = time.monotonic()
+        if not cambios:
+            return 0
+        try:
+            with self._lock_escritura, self._conexion:
+                self._conexion.executemany(
+                    'INSERT INTO trabajos (url, indice, estado, error, actualizado, fallos, profundidad)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?)'
+                    ' ON CONFLICT(url) DO UPDATE SET'
+                    ' indice = COALESCE(excluded.indice, trabajos.indice),'
+                    ' profundidad = COALESCE(excluded.profundidad, trabajos.profundidad),'
+                    ' estado = excluded.estado,'
+                    ' error = excluded.error,'
+                    " fallos = trabajos.fallos + (excluded.estado = 'fallido'),"
+                    ' actualizado = excluded.actualizado',
+                    cambios.values(),
+                )
+        except sqlite3.Error:
+            self._reincorporar(cambios)
+            raise
+        return len(cambios)
+    
+    def _reincorporar(self, cambios: Dict[str, Tuple]) -> None:
+        """
+        Devuelve a la memoria los cambios de un volcado fallido.
+        
+        Un estado registrado durante el volcado es más reciente y se conserva;
+        solo hereda el índice y la profundidad que le falten.
+        
+        Args:
+            cambios: Cambios retirados por `volcar`
+        """
+        with self._lock:
+            for url, cambio in cambios.items():
+                actual = self._cambios.get(url)
+                if actual is None:
+                    self._cambios[url] = cambio
+                    continue
+                indice = actual[1] if actual[1] is not None else cambio[1]
+                profundidad = actual[6] if actual[6] is not None else cambio[6]
+                self._cambios[url] = (url, indice, *actual[2:6], profundidad)
+    
+    def completada(self, url: str) -> bool:
+        """Indica si la URL terminó correctamente, aunque aún no se haya volcado."""
+        with self._lock:
+            cambio = self._cambios.get(url)
+        if cambio is not None:
+            return cambio[2] == 'completado'
+        with self._lock_lectura:
+            fila = self._lectura.execute(
+                'SELECT estado FROM trabajos WHERE url = ?', (url,)
+            ).fetchone()
+        return fila is not None and fila[0] == 'completado'
+    
+    def pendientes_rastreo(self) -> Iterator[Tuple[str, int]]:
+        """
+        Recorre las URLs del rastreo anterior que no llegaron a completarse.
+        
+        Yields:
+            Tuplas (url, profundidad) en orden de descubrimiento
+        """
+        with self._lock_lectura:
+            filas = self._lectura.execute(
+                "SELECT url, profundidad FROM trabajos"
+                " WHERE profundidad IS NOT NULL AND estado != 'completado' ORDER BY rowid"
+            ).fetchall()
+        yield from filas
+    
+    def resumen(self) -> Dict[str, int]:
+        """Retorna el número de URLs en cada estado."""
+        with self._lock_lectura:
+            filas = self._lectura.execute(
+                'SELECT estado, COUNT(*) FROM trabajos GROUP BY estado'
+            ).fetchall()
+        return dict(filas)
+    
+    def cerrar(self) -> None:
+        """Vuelca los cambios pendientes y cierra la base de datos."""
+        try:
+            self.volcar()
+        finally:
+            with self._lock_escritura:
+                self._conexion.close()
+            with self._lock_lectura:
+                self._lectura.close()
+
+
+class ColaTrabajos(ABC):
+    """
+    Cola de URLs compartida entre varios workers (`--worker`).
+    
+    Cada URL se arrienda a un worker durante `visibilidad_s` segundos; si
+    el worker no confirma el resultado ni renueva el arriendo a tiempo (por
+    ejemplo porque su nodo cayó), la URL vuelve a estar disponible para
+    otro worker, hasta `max_intentos` arriendos. La misma cola guarda el
+    resultado de cada URL y las estadísticas publicadas por cada nodo.
+    
+    Las subclases implementan el almacenamiento (SQLite, MongoDB...).
+    """
+    
+    ESTADOS_ABIERTOS = ('pendiente', 'arrendado')
+    
+    def encolar(self, urls: Iterable[str], lote: int = 1000) -> int:
+        """
+        Añade URLs a la cola asignándoles índices consecutivos.
+        
+        Args:
+            urls: URLs a añadir (las ya encoladas se ignoran)
+            lote: URLs por transacción
+            
+        Returns:
+            Número de URLs nuevas
+        """
+        nuevas = 0
+        pendientes: List[str] = []
+        for url in urls:
+            pendientes.append(url)
+            if len(pendientes) >= lote:
+                nuevas += self._insertar(pendientes)
+                pendientes = []
+        if pendientes:
+            nuevas += self._insertar(pendientes)
+        return nuevas
+    
+    @abstractmethod
+    def _insertar(self, urls: List[str]) -> int:
+        """Inserta un lote de URLs nuevas; retorna cuántas se añadieron."""
+    
+    @abstractmethod
+    def arrendar(self, trabajador: str, cantidad: int, visibilidad_s: float,
+                 max_intentos: int) -> List[Tuple[int, str]]:
+        """
+        Arrienda hasta `cantidad` URLs pendientes o con el arriendo vencido.
+        
+        Returns:
+            Lista de tuplas (índice, url) en orden de índice
+        """
+    
+    @abstractmethod
+    def renovar(self, trabajador: str, visibilidad_s: float) -> int:
+        """Prolonga los arriendos activos del worker; retorna cuántos renovó."""
+    
+    @abstractmethod
+    def confirmar(self, trabajador: str, resultados: List[Tuple[str, bool, Optional[str]]]) -> int:
+        """
+        Confirma el resultado de URLs arrendadas por el worker.
+        
+        Args:
+            trabajador: Identificador del worker
+            resultados: Tuplas (url, éxito, error)
+            
+        Returns:
+            Número de URLs confirmadas (se ignoran las que ya no le pertenecen)
+        """
+    
+    @abstractmethod
+    def liberar(self, trabajador: str) -> int:
+        """Devuelve a pendiente las URLs que el worker tiene arrendadas."""
+    
+    @abstractmethod
+    def resumen(self) -> Dict[str, int]:
+        """Retorna el número de URLs en cada estado."""
+    
+    def abierta(self) -> bool:
+        """Indica si quedan URLs pendientes o arrendadas."""
+        resumen = self.resumen()
+        return any(resumen.get(estado) for estado in self.ESTADOS_ABIERTOS)
+    
+    @abstractmethod
+    def publicar(self, trabajador: str, estadisticas: Dict) -> None:
+        """Guarda (reemplazando la anterior) la instantánea de estadísticas de un worker."""
+    
+    @abstractmethod
+    def estadisticas(self) -> List[Dict]:
+        """Retorna la última instantánea de estadísticas de cada worker."""
+    
+    def cerrar(self) -> None:
+        """Libera la conexión con el almacenamiento."""
+
+
+class ColaTrabajosSQLite(ColaTrabajos):
+    """
+    Cola de trabajos en un archivo SQLite.
+    
+    Sirve para varios workers en la misma máquina o en un disco compartido
+    con bloqueos fiables; cada arriendo es una transacción `BEGIN IMMEDIATE`,
+    así que dos workers nunca reciben la misma URL.
+    """
+    
+    def __init__(self, ruta: Path):
+        """
+        Abre (o crea) la cola.
+        
+        Args:
+            ruta: Archivo SQLite de la cola
+        """
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        # Sin transacciones implícitas: cada operación abre la suya
+        self._conexion = sqlite3.connect(str(ruta), timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute('PRAGMA synchronous=NORMAL')
+        self._conexion.execute(
+            'CREATE TABLE IF NOT EXISTS cola ('
+            ' url TEXT PRIMARY KEY,'
+            ' indice INTEGER NOT NULL,'
+            " estado TEXT NOT NULL DEFAULT 'pendiente',"
+            ' trabajador TEXT,'
+            ' vence REAL,'
+            ' intentos INTEGER NOT NULL DEFAULT 0,'
+            ' error TEXT,'
+            ' actualizado REAL)'
+        )
+        self._conexion.execute('CREATE INDEX IF NOT EXISTS cola_estado ON cola (estado, indice)')
+        self._conexion.execute(
+            'CREATE TABLE IF NOT EXISTS nodos ('
+            ' trabajador TEXT PRIMARY KEY,'
+            ' estadisticas TEXT NOT NULL,'
+            ' actualizado REAL NOT NULL)'
+        )
+    
+    @contextmanager
+    def _transaccion(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conexion.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conexion
+            except BaseException:
+                self._conexion.execute('ROLLBACK')
+                raise
+            self._conexion.execute('COMMIT')
+    
+    def _insertar(self, urls: List[str]) -> int:
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            # Solo las URLs realmente nuevas consumen índice, para no dejar huecos
+            nuevas = [url for url in dict.fromkeys(urls)
+                      if conexion.execute('SELECT 1 FROM cola WHERE url = ?', (url,)).fetchone() is None]
+            siguiente = conexion.execute('SELECT COALESCE(MAX(indice), 0) FROM cola').fetchone()[0] + 1
+            conexion.executemany(
+                'INSERT INTO cola (url, indice, actualizado) VALUES (?, ?, ?)',
+                ((url, siguiente + i, ahora) for i, url in enumerate(nuevas)),
+            )
+            return len(nuevas)
+    
+    def arrendar(self, trabajador: str, cantidad: int, visibilidad_s: float,
+                 max_intentos: int) -> List[Tuple[int, str]]:
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            conexion.execute(
+                "UPDATE cola SET estado = 'fallido', error = 'arriendo_vencido', actualizado = ?"
+                " WHERE estado = 'arrendado' AND vence < ? AND intentos >= ?",
+                (ahora, ahora, max_intentos),
+            )
+            filas = conexion.execute(
+                "SELECT indice, url FROM cola WHERE estado = 'pendiente'"
+                " OR (estado = 'arrendado' AND vence < ?) ORDER BY indice LIMIT ?",
+                (ahora, cantidad),
+            ).fetchall()
+            conexion.executemany(
+                "UPDATE cola SET estado = 'arrendado', trabajador = ?, vence = ?,"
+                ' intentos = intentos + 1, actualizado = ? WHERE url = ?',
+                ((trabajador, ahora + visibilidad_s, ahora, url) for _, url in filas),
+            )
+        return filas
+    
+    def renovar(self, trabajador: str, visibilidad_s: float) -> int:
+        with self._transaccion() as conexion:
+            return conexion.execute(
+                "UPDATE cola SET vence = ? WHERE estado = 'arrendado' AND trabajador = ?",
+                (time.time() + visibilidad_s, trabajador),
+            ).rowcount
+    
+    def confirmar(self, trabajador: str, resultados: List[Tuple[str, bool, Optional[str]]]) -> int:
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            antes = conexion.total_changes
+            conexion.executemany(
+                'UPDATE cola SET estado = ?, error = ?, vence = NULL, actualizado = ?'
+                " WHERE url = ? AND estado = 'arrendado' AND trabajador = ?",
+                (('completado' if exito else 'fallido', error, ahora, url, trabajador)
+                 for url, exito, error in resultados),
+            )
+            return conexion.total_changes - antes
+    
+    def liberar(self, trabajador: str) -> int:
+        with self._transaccion() as conexion:
+            return conexion.execute(
+                "UPDATE cola SET estado = 'pendiente', trabajador = NULL, vence = NULL,"
+                " intentos = MAX(intentos - 1, 0) WHERE estado = 'arrendado' AND trabajador = ?",
+                (trabajador,),
+            ).rowcount
+    
+    def resumen(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conexion.execute('SELECT estado, COUNT(*) FROM cola GROUP BY estado'))
+    
+    def publicar(self, trabajador: str, estadisticas: Dict) -> None:
+        with self._transaccion() as conexion:
+            conexion.execute(
+                'INSERT OR REPLACE INTO nodos (trabajador, estadisticas, actualizado) VALUES (?, ?, ?)',
+                (trabajador, json.dumps(estadisticas, ensure_ascii=False), time.time()),
+            )
+    
+    def estadisticas(self) -> List[Dict]:
+        with self._lock:
+            filas = self._conexion.execute('SELECT estadisticas FROM nodos ORDER BY trabajador').fetchall()
+        return [json.loads(fila[0]) for fila in filas]
+    
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+
+class ColaTrabajosMongo(ColaTrabajos):
+    """
+    Cola de trabajos en MongoDB, para workers repartidos en varias máquinas.
+    
+    Cada URL es un documento (`_id` = url). Un arriendo cuesta tres viajes
+    sea cual sea su tamaño: se eligen los candidatos, un `update_many` los
+    marca con un token de arriendo (repitiendo la condición de
+    disponibilidad, así que es atómico por documento y dos workers nunca se
+    llevan la misma URL) y un `find` recoge los que se marcaron.
+    """
+    
+    def __init__(self, uri: str, base_datos: str, coleccion: str):
+        """
+        Conecta con la cola.
+        
+        Args:
+            uri: URI de conexión (mongodb://...)
+            base_datos: Base de datos de la cola
+            coleccion: Colección de URLs (las estadísticas van en `<coleccion>_nodos`)
+        """
+        if pymongo is None:
+            raise RuntimeError("La cola en MongoDB requiere pymongo (pip install pymongo)")
+        self._cliente = pymongo.MongoClient(uri)
+        base = self._cliente[base_datos]
+        self._cola = base[coleccion]
+        self._nodos = base[f"{coleccion}_nodos"]
+        self._contadores = base[f"{coleccion}_contadores"]
+        self._cola.create_index([('estado', pymongo.ASCENDING), ('indice', pymongo.ASCENDING)])
+        self._cola.create_index([('trabajador', pymongo.ASCENDING), ('estado', pymongo.ASCENDING)])
+        self._cola.create_index([('arriendo', pymongo.ASCENDING)], sparse=True)
+    
+    def _insertar(self, urls: List[str]) -> int:
+        # Solo las URLs nuevas reservan índice; sin transacción, dos workers que
+        # encolen la misma URL a la vez aún pueden dejar algún hueco
+        existentes = {documento['_id'] for documento in self._cola.find({'_id': {'$in': urls}}, {'_id': 1})}
+        urls = [url for url in dict.fromkeys(urls) if url not in existentes]
+        if not urls:
+            return 0
+        # Reservar un bloque de índices de una vez
+        contador = self._contadores.find_one_and_update(
+            {'_id': 'indice'}, {'$inc': {'valor': len(urls)}},
+            upsert=True, return_document=pymongo.ReturnDocument.AFTER,
+        )
+        siguiente = contador['valor'] - len(urls) + 1
+        ahora = time.time()
+        documentos = [
+            {'_id': url, 'indice': siguiente + i, 'estado': 'pendiente', 'trabajador': None,
+             'vence': None, 'intentos': 0, 'error': None, 'actualizado': ahora}
+            for i, url in enumerate(urls)
+        ]
+        try:
+            return len(self._cola.insert_many(documentos, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            # Las URLs ya encoladas fallan por clave duplicada y se ignoran
+            return e.details.get('nInserted', 0)
+    
+    def arrendar(self, trabajador: str, cantidad: int, visibilidad_s: float,
+                 max_intentos: int) -> List[Tuple[int, str]]:
+        ahora = time.time()
+        self._cola.update_many(
+            {'estado': 'arrendado', 'vence': {'$lt': ahora}, 'intentos': {'$gte': max_intentos}},
+            {'$set': {'estado': 'fallido', 'error': 'arriendo_vencido', 'actualizado': ahora}},
+        )
+        disponible = {'$or': [{'estado': 'pendiente'},
+                              {'estado': 'arrendado', 'vence': {'$lt': ahora}}]}
+        candidatas = [
+            documento['_id']
+            for documento in self._cola.find(disponible, {'_id': True},
+                                             sort=[('indice', pymongo.ASCENDING)], limit=cantidad)
+        ]
+        if not candidatas:
+            return []
+        # Las que otro worker arrendó entre medias ya no cumplen `disponible`
+        token = uuid.uuid4().hex
+        self._cola.update_many(
+            {'_id': {'$in': candidatas}, **disponible},
+            {'$set': {'estado': 'arrendado', 'trabajador': trabajador, 'arriendo': token,
+                      'vence': ahora + visibilidad_s, 'actualizado': ahora},
+             '$inc': {'intentos': 1}},
+        )
+        return [
+            (documento['indice'], documento['_id'])
+            for documento in self._cola.find({'arriendo': token}, {'indice': True},
+                                             sort=[('indice', pymongo.ASCENDING)])
+        ]
+    
+    def renovar(self, trabajador: str, visibilidad_s: float) -> int:
+        return self._cola.update_many(
+            {'estado': 'arrendado', 'trabajador': trabajador},
+            {'$set': {'vence': time.time() + visibilidad_s}},
+        ).modified_count
+    
+    def confirmar(self, trabajador: str, resultados: List[Tuple[str, bool, Optional[str]]]) -> int:
+        if not resultados:
+            return 0
+        ahora = time.time()
+        operaciones = [
+            pymongo.UpdateOne(
+                {'_id': url, 'estado': 'arrendado', 'trabajador': trabajador},
+                {'$set': {'estado': 'completado' if exito else 'fallido', 'error': error,
+                          'vence': None, 'actualizado': ahora}},
+            )
+            for url, exito, error in resultados
+        ]
+        return self._cola.bulk_write(operaciones, ordered=False).modified_count
+    
+    def liberar(self, trabajador: str) -> int:
+        return self._cola.update_many(
+            {'estado': 'arrendado', 'trabajador': trabajador},
+            {'$set': {'estado': 'pendiente', 'trabajador': None, 'vence': None},
+             '$inc': {'intentos': -1}},
+        ).modified_count
+    
+    def resumen(self) -> Dict[str, int]:
+        return {
+            grupo['_id']: grupo['total']
+            for grupo in self._cola.aggregate([{'$group': {'_id': '$estado', 'total': {'$sum': 1}}}])
+        }
+    
+    def publicar(self, trabajador: str, estadisticas: Dict) -> None:
+        self._nodos.replace_one(
+            {'_id': trabajador},
+            {'_id': trabajador, 'estadisticas': estadisticas, 'actualizado': time.time()},
+            upsert=True,
+        )
+    
+    def estadisticas(self) -> List[Dict]:
+        return [nodo['estadisticas'] for nodo in self._nodos.find({}, sort=[('_id', pymongo.ASCENDING)])]
+    
+    def cerrar(self) -> None:
+        self._cliente.close()
+
+
+def abrir_cola_trabajos(destino: str, config_cola: Dict) -> ColaTrabajos:
+    """
+    Abre la cola de trabajos indicada por `options.queue.url`.
+    
+    Args:
+        destino: URI mongodb:// (o mongodb+srv://) o ruta de un archivo SQLite
+        config_cola: Sección `options.queue` de la configuración
+        
+    Returns:
+        Cola de trabajos abierta
+    """
+    if destino.startswith(('mongodb://', 'mongodb+srv://')):
+        return ColaTrabajosMongo(destino, config_cola.get('mongo_database', 'scraper'),
+                                 config_cola.get('mongo_collection', 'cola_trabajos'))
+    if destino.startswith('sqlite://'):
+        destino = destino[len('sqlite://'):]
+    return ColaTrabajosSQLite(Path(destino))
+
+
+class ConjuntoHuellas:
+    """
+    Conjunto de URLs vistas que guarda solo una huella de 64 bits por URL.
+    
+    Las huellas (blake2b de 8 bytes) se guardan en una tabla hash de
+    direccionamiento abierto sobre un `array('Q')` que se duplica al superar
+    el 50 % de ocupación: entre 16 y 32 bytes por URL, frente a los ~70 de
+    un `set` de enteros de Python. Dos URLs distintas solo se confunden si
+    comparten huella, con probabilidad del orden de n²/2⁶⁵ (despreciable
+    incluso con cientos de millones de URLs).
+    """
+    
+    def __init__(self, capacidad_inicial: int = 1024):
+        """
+        Crea la tabla vacía.
+        
+        Args:
+            capacidad_inicial: Casillas iniciales (se redondea a potencia de 2)
+        """
+        casillas = 1 << max(3, (capacidad_inicial - 1).bit_length())
+        self._tabla = array('Q', bytes(8 * casillas))
+        self._mascara = casillas - 1
+        self._elementos = 0
+    
+    @staticmethod
+    def _huella(clave: str) -> int:
+        huella = int.from_bytes(hashlib.blake2b(clave.encode('utf-8'), digest_size=8).digest(), 'big')
+        return huella or 1  # 0 marca una casilla libre
+    
+    def _casilla(self, huella: int) -> int:
+        """Retorna la casilla que ocupa la huella o la casilla libre donde iría."""
+        tabla, mascara = self._tabla, self._mascara
+        i = huella & mascara
+        while tabla[i] and tabla[i] != huella:
+            i = (i + 1) & mascara
+        return i
+    
+    def _ampliar(self) -> None:
+        anterior = self._tabla
+        self._tabla = array('Q', bytes(16 * len(anterior)))
+        self._mascara = len(self._tabla) - 1
+        for huella in anterior:
+            if huella:
+                self._tabla[self._casilla(huella)] = huella
+    
+    def __contains__(self, clave: str) -> bool:
+        return bool(self._tabla[self._casilla(self._huella(clave))])
+    
+    def add(self, clave: str) -> None:
+        huella = self._huella(clave)
+        i = self._casilla(huella)
+        if self._tabla[i]:
+            return
+        self._tabla[i] = huella
+        self._elementos += 1
+        if self._elementos * 2 > len(self._tabla):
+            self._ampliar()
+    
+    def __len__(self) -> int:
+        return self._elementos
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom para deduplicar rastreos muy grandes con memoria fija.
+    
+    Puede dar falsos positivos (una URL nueva tomada por vista) con la
+    probabilidad configurada, nunca falsos negativos.
+    """
+    
+    def __init__(self, capacidad: int, tasa_error: float = 0.001):
+        """
+        Dimensiona el filtro.
+        
+        Args:
+            capacidad: Número de URLs esperado
+            tasa_error: Probabilidad aceptada de falso positivo
+        """
+        capacidad = max(1, capacidad)
+        tasa_error = min(0.5, max(1e-9, tasa_error))
+        self._bits_totales = max(8, int(-capacidad * math.log(tasa_error) / (math.log(2) ** 2)))
+        self._funciones = max(1, round(self._bits_totales / capacidad * math.log(2)))
+        self._bits = bytearray((self._bits_totales + 7) // 8)
+        self._elementos = 0
+    
+    def _posiciones(self, clave: str) -> Iterator[int]:
+        # Doble hashing: k posiciones a partir de dos hashes de 64 bits
+        digest = hashlib.blake2b(clave.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        for i in range(self._funciones):
+            yield (h1 + i * h2) % self._bits_totales
+    
+    def __contains__(self, clave: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._posiciones(clave))
+    
+    def add(self, clave: str) -> None:
+        for p in self._posiciones(clave):
+            self._bits[p >> 3] |= 1 << (p & 7)
+        self._elementos += 1
+    
+    def __len__(self) -> int:
+        return self._elementos
+
+
+class FronteraRastreo:
+    """
+    Frontera del modo rastreo: URLs por visitar con deduplicación y prioridad.
+    
+    Las URLs se normalizan antes de deduplicar y se entregan por menor
+    profundidad y, a igual profundidad, por mayor prioridad (p. ej. la
+    `<priority>` del sitemap), respetando el orden de descubrimiento.
+    """
+    
+    def __init__(self, vistos, max_profundidad: int, max_paginas: Optional[int],
+                 en_alcance: Callable[[str], bool], conservar_rutas_hash: bool = True,
+                 al_admitir: Optional[Callable[[str, int], None]] = None):
+        """
+        Inicializa la frontera.
+        
+        Args:
+            vistos: Estructura de deduplicación (`ConjuntoHuellas` o `FiltroBloom`)
+            max_profundidad: Profundidad máxima de enlaces desde las semillas
+            max_paginas: Máximo de URLs admitidas (None = sin límite)
+            en_alcance: Función que decide si una URL normalizada se rastrea
+            conservar_rutas_hash: Si las rutas `#/...` cuentan como páginas distintas
+            al_admitir: Función llamada con (url normalizada, profundidad) por
+                cada URL admitida (p. ej. para anotarla en el diario)
+        """
+        self._vistos = vistos
+        self._al_admitir = al_admitir
+        self._heap: List[Tuple[int, float, int, str]] = []
+        self._secuencia = 0
+        self.max_profundidad = max_profundidad
+        self.max_paginas = max_paginas
+        self._en_alcance = en_alcance
+        self._conservar_rutas_hash = conservar_rutas_hash
+        self.admitidas = 0
+        self.duplicadas = 0
+        self.descartadas = 0
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+    
+    def agregar(self, url: str, profundidad: int = 0, prioridad: float = 0.5) -> bool:
+        """
+        Añade una URL si es nueva, está en alcance y no supera los límites.
+        
+        Args:
+            url: URL absoluta
+            profundidad: Saltos desde una semilla
+            prioridad: Prioridad entre 0 y 1 (mayor primero)
+            
+        Returns:
+            True si la URL se admitió
+        """
+        if self.max_paginas is not None and self.admitidas >= self.max_paginas:
+            return False
+        if profundidad > self.max_profundidad:
+            self.descartadas += 1
+            return False
+        
+        url = normalizar_url(url, self._conservar_rutas_hash)
+        if url in self._vistos:
+            self.duplicadas += 1
+            return False
+        if not self._en_alcance(url):
+            self.descartadas += 1
+            return False
+        
+        self._vistos.add(url)
+        self._secuencia += 1
+        heapq.heappush(self._heap, (profundidad, -prioridad, self._secuencia, url))
+        self.admitidas += 1
+        if self._al_admitir is not None:
+            self._al_admitir(url, profundidad)
+        return True
+    
+    def extraer(self) -> Tuple[str, int]:
+        """Retorna la siguiente URL y su profundidad."""
+        profundidad, _, _, url = heapq.heappop(self._heap)
+        return url, profundidad
+
+
+class PlanificadorHosts:
+    """
+    Planificador de cortesía por host para la etapa de descarga.
+    
+    Mantiene una cola por host y entrega el trabajo en turno rotatorio entre
+    los hosts que pueden atender una petición: con token disponible en su
+    token bucket y por debajo de su límite de peticiones simultáneas. Así un
+    host lento o limitado no bloquea a los workers mientras otros hosts
+    tienen trabajo listo.
+    """
+    
+    def __init__(self, politica: Callable[[str], Tuple[float, int, int]], capacidad: int):
+        """
+        Inicializa el planificador.
+        
+        Args:
+            politica: Función host -> (peticiones por segundo, ráfaga,
+                máximo simultáneo); 0 peticiones por segundo significa sin límite
+            capacidad: Máximo de elementos pendientes antes de frenar a `put()`
+        """
+        self._politica = politica
+        self._capacidad = max(1, capacidad)
+        self._colas: Dict[str, deque] = {}
+        self._turno: deque = deque()
+        self._tokens: Dict[str, Tuple[float, float]] = {}
+        self._en_curso: Dict[str, int] = {}
+        self._retrasados: List[Tuple[float, int, str, object]] = []
+        self._secuencia = 0
+        self._pendientes = 0
+        self._cerrado = False
+        self._cambio = asyncio.Condition()
+    
+    def qsize(self) -> int:
+        """Retorna el número de elementos pendientes, incluidos los reintentos en espera."""
+        return self._pendientes + len(self._retrasados)
+    
+    def _encolar(self, elemento, host: str) -> None:
+        """Añade un elemento a la cola de su host (requiere el lock)."""
+        if host not in self._colas:
+            self._colas[host] = deque()
+            self._turno.append(host)
+        self._colas[host].append(elemento)
+        self._pendientes += 1
+    
+    def _liberar_retrasados(self, ahora: float) -> Optional[float]:
+        """
+        Mueve a las colas los reintentos cuyo plazo ya venció.
+        
+        Returns:
+            Segundos hasta el siguiente reintento pendiente, o None si no hay
+        """
+        while self._retrasados and self._retrasados[0][0] <= ahora:
+            _, _, host, elemento = heapq.heappop(self._retrasados)
+            self._encolar(elemento, host)
+        return self._retrasados[0][0] - ahora if self._retrasados else None
+    
+    def _intentar_reservar(self, host: str, ahora: float) -> Optional[float]:
+        """
+        Intenta reservar una petición para un host.
+        
+        Returns:
+            0 si se reservó, segundos hasta el próximo token, o None si el
+            host está en su límite de peticiones simultáneas
+        """
+        rps, rafaga, maximo = self._politica(host)
+        if self._en_curso.get(host, 0) >= maximo:
+            return None
+        
+        if rps > 0:
+            tokens, ultimo = self._tokens.get(host, (float(rafaga), ahora))
+            tokens = min(float(rafaga), tokens + (ahora - ultimo) * rps)
+            if tokens < 1:
+                self._tokens[host] = (tokens, ahora)
+                return (1 - tokens) / rps
+            self._tokens[host] = (tokens - 1, ahora)
+        
+        self._en_curso[host] = self._en_curso.get(host, 0) + 1
+        return 0
+    
+    async def _esperar_cambio(self, espera: Optional[float]) -> None:
+        """Espera una notificación o, como mucho, `espera` segundos."""
+        try:
+            await asyncio.wait_for(self._cambio.wait(), espera)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def put(self, elemento, host: str) -> None:
+        """
+        Encola un elemento para un host, esperando si el planificador está lleno.
+        
+        Args:
+            elemento: Trabajo a encolar
+            host: Clave de host (ver `host_key()`)
+        """
+        async with self._cambio:
+            while self._pendientes >= self._capacidad:
+                await self._cambio.wait()
+            self._encolar(elemento, host)
+            self._cambio.notify_all()
+    
+    async def put_later(self, elemento, host: str, retraso: float) -> None:
+        """
+        Programa un elemento para dentro de `retraso` segundos (reintentos).
+        
+        No espera por capacidad, para que un worker nunca quede bloqueado
+        devolviendo trabajo al planificador.
+        
+        Args:
+            elemento: Trabajo a reintentar
+            host: Clave de host (ver `host_key()`)
+            retraso: Segundos antes de que el elemento vuelva a estar disponible
+        """
+        async with self._cambio:
+            self._secuencia += 1
+            heapq.heappush(self._retrasados, (time.monotonic() + retraso, self._secuencia, host, elemento))
+            self._cambio.notify_all()
+    
+    async def get(self):
+        """
+        Entrega el siguiente elemento listo, reservando su host.
+        
+        Returns:
+            Elemento pendiente, o None cuando el planificador está cerrado y ya
+            no queda trabajo pendiente, programado ni en curso
+        """
+        async with self._cambio:
+            while True:
+                ahora = time.monotonic()
+                espera_minima = self._liberar_retrasados(ahora)
+                for _ in range(len(self._turno)):
+                    host = self._turno[0]
+                    self._turno.rotate(-1)
+                    espera = self._intentar_reservar(host, ahora)
+                    if espera == 0:
+                        cola = self._colas[host]
+                        elemento = cola.popleft()
+                        if not cola:
+                            del self._colas[host]
+                            self._turno.remove(host)
+                        self._pendientes -= 1
+                        self._cambio.notify_all()
+                        return elemento
+                    if espera is not None and (espera_minima is None or espera < espera_minima):
+                        espera_minima = espera
+                
+                # Un elemento en curso aún puede devolver un reintento
+                if (self._cerrado and self._pendientes == 0 and not self._retrasados
+                        and not any(self._en_curso.values())):
+                    return None
+                await self._esperar_cambio(espera_minima)
+    
+    async def adquirir(self, host: str) -> None:
+        """
+        Espera turno para hacer una petición a un host sin pasar por las colas.
+        
+        Args:
+            host: Clave de host (ver `host_key()`)
+        """
+        async with self._cambio:
+            while True:
+                espera = self._intentar_reservar(host, time.monotonic())
+                if espera == 0:
+                    return
+                await self._esperar_cambio(espera)
+    
+    async def release(self, host: str) -> None:
+        """
+        Libera la reserva de un host tras completar su petición.
+        
+        Args:
+            host: Clave de host reservada con `get()` o `adquirir()`
+        """
+        async with self._cambio:
+            self._en_curso[host] = max(0, self._en_curso.get(host, 0) - 1)
+            self._cambio.notify_all()
+    
+    async def close(self) -> None:
+        """Indica que no se encolarán más elementos."""
+        async with self._cambio:
+            self._cerrado = True
+            self._cambio.notify_all()
 
 
 @dataclass
-class EstadisticasProcesamiento:
-    """Clase para almacenar estadísticas del procesamiento."""
-    inicio: float = 0
-    fin: float = 0
-    archivos_procesados: int = 0
-    archivos_fallidos: int = 0
-    total_palabras: int = 0
-    total_caracteres: int = 0
-    urls_procesadas: List[str] = None
-    urls_fallidas: List[str] = None
+class TrabajoURL:
+    """Unidad de trabajo que recorre las etapas del pipeline."""
+    index: int
+    url: str
+    html: Optional[str] = None
+    html_hash: Optional[str] = None
+    markdown: Optional[str] = None
+    intentos: int = 0
+    encolado: float = 0.0
+
+
+@dataclass
+class EntradaPool:
+    """Contexto y página del navegador administrados por el pool."""
+    context: BrowserContext
+    page: Page
+    usos: int = 0
+    danada: bool = False
+    documento: Optional[str] = None
+    validadores: Optional[Dict] = None
+    solicitudes_bloqueadas: int = 0
+    bytes_recibidos: int = 0
+
+
+class PoolPaginas:
+    """
+    Pool acotado de contextos y páginas precalentados del navegador.
+    
+    Evita crear y destruir un BrowserContext y una Page por cada URL: las
+    entradas se prestan con `lease()`, se limpian al devolverse y se reciclan
+    tras `max_uses` usos o cuando la página se cierra o falla.
+    
+    En modo de rutas SPA una entrada puede conservar su documento cargado
+    entre préstamos; `acquire(documento)` prefiere la entrada que ya tiene
+    ese documento y limpia las que traen otro distinto.
+    """
+    
+    def __init__(self, crear_contexto: Callable[[], Awaitable[BrowserContext]],
+                 size: int, max_uses: int, stats: EstadisticasProcesamiento,
+                 logger: logging.Logger,
+                 preparar_entrada: Optional[Callable[['EntradaPool'], Awaitable[None]]] = None):
+        """
+        Inicializa el pool.
+        
+        Args:
+            crear_contexto: Corrutina que crea un BrowserContext configurado
+            size: Número máximo de entradas prestadas simultáneamente
+            max_uses: Usos permitidos antes de reciclar una entrada
+            stats: Estadísticas donde registrar aciertos y fallos del pool
+            logger: Logger del scraper
+            preparar_entrada: Corrutina opcional que se ejecuta sobre cada
+                entrada nueva (rutas, listeners) antes de su primer uso
+        """
+        self._crear_contexto = crear_contexto
+        self._preparar_entrada = preparar_entrada
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.stats = stats
+        self.logger = logger
+        self._libres: List[EntradaPool] = []
+        self._semaforo = asyncio.Semaphore(self.size)
+        self.en_uso = 0
+    
+    async def _crear_entrada(self) -> EntradaPool:
+        """Crea un contexto nuevo con su página."""
+        context = await self._crear_contexto()
+        page = await context.new_page()
+        entrada = EntradaPool(context=context, page=page)
+        page.on('crash', lambda _: setattr(entrada, 'danada', True))
+        if self._preparar_entrada is not None:
+            try:
+                await self._preparar_entrada(entrada)
+            except Exception:
+                await self._cerrar_entrada(entrada)
+                raise
+        return entrada
+    
+    def _tomar_libre(self, documento: Optional[str]) -> Optional[EntradaPool]:
+        """Extrae la entrada libre más adecuada, priorizando el mismo documento."""
+        if documento is not None:
+            for i in range(len(self._libres) - 1, -1, -1):
+                if self._libres[i].documento == documento:
+                    return self._libres.pop(i)
+        return self._libres.pop() if self._libres else None
+    
+    async def acquire(self, documento: Optional[str] = None) -> EntradaPool:
+        """
+        Presta una entrada del pool, creando una nueva si no hay libres.
+        
+        Args:
+            documento: Documento (URL sin fragmento) que se va a visitar
+        
+        Returns:
+            Entrada lista para navegar
+        """
+        await self._semaforo.acquire()
+        try:
+            entrada = self._tomar_libre(documento)
+            if entrada is not None and entrada.documento not in (None, documento):
+                try:
+                    await self._limpiar_entrada(entrada)
+                except Exception as e:
+                    self.logger.debug(f"♻️ No se pudo limpiar la página, se recicla: {e}")
+                    await self._cerrar_entrada(entrada)
+                    self.stats.pool_reciclajes += 1
+                    entrada = None
+            
+            if entrada is not None:
+                self.stats.pool_aciertos += 1
+            else:
+                entrada = await self._crear_entrada()
+                self.stats.pool_fallos += 1
+            entrada.usos += 1
+            self.en_uso += 1
+            return entrada
+        except Exception:
+            self._semaforo.release()
+            raise
+    
+    async def release(self, entrada: EntradaPool) -> None:
+        """
+        Devuelve una entrada al pool, limpiando su estado o reciclándola.
+        
+        Las entradas con `documento` asignado se devuelven sin limpiar para
+        poder reutilizar el documento ya cargado.
+        
+        Args:
+            entrada: Entrada previamente obtenida con `acquire()`
+        """
+        try:
+            if entrada.danada or entrada.page.is_closed() or entrada.usos >= self.max_uses:
+                await self._cerrar_entrada(entrada)
+                self.stats.pool_reciclajes += 1
+                return
+            
+            try:
+                if entrada.documento is None:
+                    await self._limpiar_entrada(entrada)
+                self._libres.append(entrada)
+            except Exception as e:
+                self.logger.debug(f"♻️ No se pudo limpiar la página, se recicla: {e}")
+                await self._cerrar_entrada(entrada)
+                self.stats.pool_reciclajes += 1
+        finally:
+            self.en_uso -= 1
+            self._semaforo.release()
+    
+    async def _limpiar_entrada(self, entrada: EntradaPool) -> None:
+        """Elimina almacenamiento, cookies y documento cargado de la entrada."""
+        await entrada.page.evaluate(
+            "() => { try { localStorage.clear(); sessionStorage.clear(); } catch (e) {} }"
+        )
+        await entrada.page.goto('about:blank')
+        await entrada.context.clear_cookies()
+        entrada.documento = None
+    
+    async def _cerrar_entrada(self, entrada: EntradaPool) -> None:
+        """Cierra el contexto de una entrada ignorando errores."""
+        try:
+            await entrada.context.close()
+        except Exception as e:
+            self.logger.debug(f"⚠️ Error cerrando contexto del pool: {e}")
+    
+    @asynccontextmanager
+    async def lease(self, documento: Optional[str] = None) -> AsyncIterator[EntradaPool]:
+        """
+        Presta una entrada durante el bloque `async with`.
+        
+        Si el bloque lanza una excepción la entrada se marca como dañada
+        para que se recicle en lugar de reutilizarse, salvo que sea una
+        respuesta HTTP de error, que no afecta al estado de la página.
+        
+        Args:
+            documento: Documento preferido (ver `acquire()`)
+        """
+        entrada = await self.acquire(documento)
+        try:
+            yield entrada
+        except ErrorDescarga as error:
+            if error.status is None:
+                entrada.danada = True
+            raise
+        except BaseException:
+            entrada.danada = True
+            raise
+        finally:
+            await self.release(entrada)
+    
+    async def close(self) -> None:
+        """Cierra todas las entradas libres del pool."""
+        while self._libres:
+            await self._cerrar_entrada(self._libres.pop())
+
+
+class ServidorMetricas:
+    """
+    Endpoint HTTP de métricas en formato Prometheus/OpenMetrics.
+    
+    Corre en un hilo aparte con `ThreadingHTTPServer` (sin dependencias) y
+    en cada petición a `/metrics` genera el texto con la función recibida,
+    así que las métricas reflejan la ejecución en curso.
+    """
+    
+    def __init__(self, renderizar: Callable[[bool], str], host: str, puerto: int,
+                 logger: logging.Logger):
+        """
+        Inicializa el servidor (no escucha hasta llamar a `iniciar()`).
+        
+        Args:
+            renderizar: Función que recibe si se pide OpenMetrics y retorna el texto
+            host: Interfaz donde escuchar
+            puerto: Puerto donde escuchar (0 = uno libre)
+            logger: Logger del scraper
+        """
+        self.renderizar = renderizar
+        self.host = host
+        self.puerto = puerto
+        self.logger = logger
+        self._servidor: Optional[ThreadingHTTPServer] = None
+    
+    def iniciar(self) -> None:
+        """Empieza a servir `/metrics` en un hilo demonio."""
+        renderizar = self.renderizar
+        logger = self.logger
+        
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+                try:
+                    cuerpo = renderizar(openmetrics).encode('utf-8')
+                except Exception as e:
+                    logger.debug(f"📈 Error generando métricas: {e}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', TIPO_OPENMETRICS if openmetrics else TIPO_PROMETHEUS)
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), Manejador)
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+        threading.Thread(target=self._servidor.serve_forever, name='metricas', daemon=True).start()
+        self.logger.info(f"📈 Métricas disponibles en http://{self.host}:{self.puerto}/metrics")
+    
+    def detener(self) -> None:
+        """Deja de servir y libera el puerto."""
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+class HTMLToMarkdownScraper:
+    """
+    Extractor profesional de contenido HTML a Markdown usando Playwright.
+    
+    Esta clase maneja la extracción de contenido de archivos HTML locales o URLs remotas,
+    convierte el contenido a Markdown y guarda los archivos con configuración flexible.
+    """
+    
+    def __init__(self, config_path: Union[str, Dict] = "config.json"):
+        """
+        Inicializa el scraper con configuración desde archivo.
+        
+        Args:
+            config_path: Ruta al archivo de configuración JSON, o un diccionario
+                de configuración ya cargado
+        """
+        self.config = self._load_config(config_path)
+        self.logger = self._setup_logging()
+        self.stats = EstadisticasProcesamiento()
+        self.browser: Optional[Browser] = None
+        self.playwright = None
+        self.page_pool: Optional[PoolPaginas] = None
+        self.http_client = None
+        self.html_cache: Optional[CacheHTML] = None
+        self.manifest: Optional[ManifiestoSalida] = None
+        self.journal: Optional[DiarioTrabajos] = None
+        self._collect_links = False
+        self._discovered_links: Dict[str, List[str]] = {}
+        self._conversion_executor: Optional[Executor] = None
+        self._conversion_semaphore: Optional[asyncio.Semaphore] = None
+        self._pipeline_queues: Dict[str, asyncio.Queue] = {}
+        self._stats_lock = threading.Lock()
+        self._metricas_en_curso: Dict[str, Dict] = {}
+        self._metrics_stream = None
+        self.metrics_server: Optional[ServidorMetricas] = None
+        self.shard: Optional[Tuple[int, int]] = None  # (índice, total) en un proceso de `run_sharded`
+        self.work_queue: Optional[ColaTrabajos] = None
+        self._queue_results: List[Tuple[str, bool, Optional[str]]] = []
+        self._leased_urls: set = set()
+        self._lease_released: Optional[asyncio.Event] = None
+        
+        self.logger.info("🚀 HTML to Markdown Scraper inicializado")
+        if isinstance(config_path, str):
+            self.logger.info(f"📁 Configuración cargada desde: {config_path}")
+    
+    def _load_config(self, config_path: Union[str, Dict]) -> Dict:
+        """
+        Carga la configuración desde archivo JSON o usa valores por defecto.
+        
+        Args:
+            config_path: Ruta al archivo de configuración o diccionario de configuración
+            
+        Returns:
+            Diccionario con la configuración cargada
+        """
+        default_config = {
+            "urls": [
+                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/introduccion",
+                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/curso/tema1",
+                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/curso/tema2",
+                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/curso/tema3",
+                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/curso/tema4"
+            ],
+            "urls_file": None,
+            "output_dir": "C:/Users/frlpi/OneDrive/Escritorio/scraper",
+            "options": {
+                "headless": True,
+                "wait_until": "networkidle",
+                "timeout": 30000,
+                "parallel": False,
+                "max_concurrent": 3,
+                "delay_between_requests": 1000,
+                "retry_attempts": 2,
+                "retry": {
+                    "base_delay_ms": 1000,
+                    "max_delay_ms": 30000,
+                    "jitter": 0.5,
+                    "retry_on": ["timeout", "dns", "conexion", "http_429", "http_5xx", "contenido_vacio", "otro"]
+                },
+                "spa_hash_routes": False,
+                "incremental": True,
+                "resume": False,
+                "fetch_mode": "browser",
+                "fetch_rules": [],
+                "static_min_text": 200,
+                "browser_extraction": "document",
+                "politeness": {
+                    "requests_per_second": None,
+                    "burst": 1,
+                    "max_per_host": 2,
+                    "max_pending": 100,
+                    "host_overrides": {}
+                },
+                "block_resources": {
+                    "enabled": False,
+                    "resource_types": ["image", "font", "media"],
+                    "block_third_party_scripts": True,
+                    "allow_domains": [],
+                    "deny_domains": []
+                },
+                "page_pool": {
+                    "enabled": True,
+                    "size": None,
+                    "max_uses": 50
+                },
+                "readiness": {
+                    "strategy": "adaptive",
+                    "selector": None,
+                    "quiet_ms": 250,
+                    "text_stable_ms": 250,
+                    "max_wait_ms": 5000,
+                    "poll_ms": 50,
+                    "fixed_wait_ms": 2000
+                },
+                "conversion_executor": {
+                    "mode": "process",
+                    "workers": None
+                },
+                "pipeline": {
+                    "fetch_workers": None,
+                    "convert_workers": None,
+                    "write_workers": 1,
+                    "queue_size": None,
+                    "report_interval_s": 5
+                },
+                "html_cache": {
+                    "enabled": False,
+                    "dir": None,
+                    "ttl_s": None
+                },
+                "journal": {
+                    "enabled": True,
+                    "batch_size": 200,
+                    "flush_interval_s": 2
+                },
+                "metrics": {
+                    "per_url": False,
+                    "jsonl": None,
+                    "browser_memory": True,
+                    "prometheus_port": None,
+                    "prometheus_host": "127.0.0.1"
+                },
+                "sharding": {
+                    "processes": 1,
+                    "key": "host",
+                    "queue_size": 64
+                },
+                "queue": {
+                    "url": None,
+                    "lease_size": None,
+                    "visibility_timeout_s": 300,
+                    "max_attempts": 3,
+                    "poll_interval_s": 2,
+                    "max_poll_interval_s": 30,
+                    "report_interval_s": 10,
+                    "worker_id": None,
+                    "exit_when_empty": True,
+                    "mongo_database": "scraper",
+                    "mongo_collection": "cola_trabajos"
+                },
+                "crawl": {
+                    "enabled": False,
+                    "max_depth": 3,
+                    "max_pages": 1000,
+                    "same_domain": True,
+                    "allowed_domains": [],
+                    "exclude_patterns": [],
+                    "sitemaps": True,
+                    "hash_routes": True,
+                    "dedup": "set",
+                    "bloom_capacity": 1000000,
+                    "bloom_error_rate": 0.001
+                }
+            },
+            "markdown": {
+                "strip_elements": ["script", "style", "nav", "footer", "aside", "header"],
+                "file_extension": ".mdx",
+                "naming_pattern": "contenido_{index}",
+                "smart_naming": True,
+                "clean_excessive_whitespace": True,
+                "content_selector": None,
+                "readability": False,
+                "html_parser": "auto",
+                "cleanup": {
+                    "strip_trailing_spaces": True,
+                    "collapse_spaces": True,
+                    "max_blank_lines": 2,
+                    "protect_code": True,
+                    "protect_tables": True,
+                    "extra_rules": []
+                }
+            },
+            "logging": {
+                "level": "INFO",
+                "console": True,
+                "file": True,
+                "log_dir": "logs"
+            }
+        }
+        
+        if isinstance(config_path, dict):
+            self._deep_merge_config(default_config, copy.deepcopy(config_path))
+            return default_config
+        
+        config_file = Path(config_path)
+        if config_file.exists():
+            try:
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    user_config = json.load(f)
+                    # Fusión profunda de configuraciones
+                    self._deep_merge_config(default_config, user_config)
+                    print(f"✅ Configuración cargada desde: {config_path}")
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Error en formato JSON de {config_path}: {e}")
+                print("Usando configuración por defecto.")
+            except Exception as e:
+                print(f"⚠️ Error cargando configuración: {e}")
+                print("Usando configuración por defecto.")
+        else:
+            print(f"📄 Archivo de configuración no encontrado: {config_path}")
+            print("Usando configuración por defecto.")
+        
+        return default_config
+    
+    def _deep_merge_config(self, default: Dict, user: Dict) -> None:
+        """
+        Fusiona recursivamente la configuración del usuario con la por defecto.
+        
+        Args:
+            default: Configuración por defecto (se modifica in-place)
+            user: Configuración del usuario
+        """
+        for key, value in user.items():
+            if key in default and isinstance(default[key], dict) and isinstance(value, dict):
+                self._deep_merge_config(default[key], value)
+            else:
+                default[key] = value
+    
+    def _setup_logging(self) -> logging.Logger:
+        """
+        Configura el sistema de logging profesional.
+        
+        Returns:
+            Logger configurado para el scraper
+        """
+        log_config = self.config.get('logging', {})
+        
+        # Crear directorio de logs
+        log_dir = Path(log_config.get('log_dir', 'logs'))
+        log_dir.mkdir(exist_ok=True)
+        
+        # Configurar nivel de logging
+        log_level = getattr(logging, log_config.get('level', 'INFO').upper())
+        
+        # Configurar handlers
+        handlers = []
+        
+        if log_config.get('console', True):
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(
+                logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+            )
+            handlers.append(console_handler)
+        
+        if log_config.get('file', True):
+            log_filename = f"scraper_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+            log_path = log_dir / log_filename
+            file_handler = logging.FileHandler(log_path, encoding='utf-8')
+            file_handler.setFormatter(
+                logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s')
+            )
+            handlers.append(file_handler)
+        
+        # Configurar logger
+        logger = logging.getLogger('HTMLScraper')
+        logger.setLevel(log_level)
+        
+        # Remover handlers existentes para evitar duplicados
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+        
+        for handler in handlers:
+            logger.addHandler(handler)
+        
+        return logger
+    
+    def _validate_config(self, requiere_urls: bool = True) -> bool:
+        """
+        Valida la configuración antes de procesar.
+        
+        Args:
+            requiere_urls: Exigir URLs de entrada (los workers las toman de la cola)
+            
+        Returns:
+            True si la configuración es válida, False en caso contrario
+        """
+        errores = []
+        
+        # Validar URLs
+        urls_file = self.config.get('urls_file')
+        if requiere_urls and not self.config.get('urls') and not urls_file:
+            errores.append("No se han especificado URLs para procesar")
+        elif self.config.get('urls') and not isinstance(self.config['urls'], list):
+            errores.append("Las URLs deben estar en formato de lista")
+        if urls_file and urls_file != '-' and not Path(urls_file).is_file():
+            errores.append(f"Archivo de URLs no encontrado: {urls_file}")
+        
+        # Validar directorio de salida
+        if not self.config.get('output_dir'):
+            errores.append("No se ha especificado directorio de salida")
+        
+        # Validar URLs de archivos locales
+        urls_invalidas = []
+        for url in self.config.get('urls', []):
+            if url.startswith('file://'):
+                # Obtener la ruta del archivo decodificando caracteres especiales
+                file_path = file_url_to_path(url)
+                
+                if not file_path.exists():
+                    urls_invalidas.append(f"Archivo no encontrado: {file_path}")
+        
+        if urls_invalidas:
+            errores.extend(urls_invalidas)
+        
+        # Validar las reglas propias de limpieza de Markdown
+        limpieza = self.config.get('markdown', {}).get('cleanup') or {}
+        for regla in limpieza.get('extra_rules') or []:
+            try:
+                re.compile(regla['pattern'])
+            except (KeyError, TypeError, re.error) as e:
+                errores.append(f"Regla de limpieza inválida {regla!r}: {e}")
+        
+        # Validar permisos de escritura
+        try:
+            output_path = Path(self.config['output_dir'])
+            output_path.mkdir(parents=True, exist_ok=True)
+            test_file = output_path / ".test_write_permission"
+            test_file.write_text("test")
+            test_file.unlink()
+        except Exception as e:
+            errores.append(f"Sin permisos de escritura en: {self.config['output_dir']} ({e})")
+        
+        # Mostrar errores si los hay
+        if errores:
+            self.logger.error("❌ Errores de configuración encontrados:")
+            for error in errores:
+                self.logger.error(f"   • {error}")
+            return False
+        
+        self.logger.info("✅ Configuración validada correctamente")
+        return True
+    
+    def _streaming_input(self) -> bool:
+        """Indica si las URLs se leen de un archivo o de stdin (`urls_file`)."""
+        return bool(self.config.get('urls_file'))
+    
+    def _iter_input_urls(self) -> Iterator[str]:
+        """
+        Genera las URLs de entrada de forma perezosa.
+        
+        Primero las de `config['urls']` y después las de `config['urls_file']`
+        ('-' para stdin), una por línea; se ignoran las líneas vacías y las
+        que empiezan por '#'.
+        
+        Yields:
+            URLs sin validar
+        """
+        yield from self.config.get('urls') or []
+        
+        urls_file = self.config.get('urls_file')
+        if not urls_file:
+            return
+        if urls_file == '-':
+            lineas = sys.stdin
+        else:
+            lineas = open(urls_file, encoding='utf-8')
+        with lineas:
+            for linea in lineas:
+                url = linea.strip()
+                if url and not url.startswith('#'):
+                    yield url
+    
+    def _is_valid_url(self, url: str) -> bool:
+        """
+        Valida una URL antes de encolarla.
+        
+        Args:
+            url: URL a validar
+            
+        Returns:
+            True si el archivo local existe o la URL es remota
+        """
+        try:
+            if url.startswith('file://'):
+                # Para archivos locales, verificar que existan
+                file_path = file_url_to_path(url)
+                
+                if file_path.exists():
+                    self.logger.debug(f"✅ URL válida: {url}")
+                    return True
+                self.logger.warning(f"⚠️ Archivo no encontrado: {file_path}")
+                return False
+            
+            # Para URLs remotas, asumir válidas (se verificarán al acceder)
+            self.logger.debug(f"✅ URL remota: {url}")
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Error validando URL {url}: {e}")
+            return False
+    
+    def _iter_valid_urls(self) -> Iterator[str]:
+        """
+        Lee y valida las URLs de entrada a medida que se consumen.
+        
+        La validación es una etapa más del flujo: el procesamiento empieza
+        con la primera URL válida y la memoria no depende del tamaño de la
+        lista de entrada.
+        
+        Yields:
+            URLs válidas, en el orden de entrada
+        """
+        total = validas = 0
+        for url in self._iter_input_urls():
+            total += 1
+            if self._is_valid_url(url):
+                validas += 1
+                yield url
+        
+        self.logger.info(f"📊 URLs válidas encontradas: {validas}/{total}")
+        if not validas:
+            self.logger.error("❌ No hay URLs válidas para procesar")
+    
+    async def _init_playwright(self) -> None:
+        """Inicia el driver de Playwright una sola vez."""
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+    
+    async def _get_http_client(self):
+        """
+        Crea (una sola vez) el cliente HTTP de Playwright, que no lanza Chromium.
+        
+        Returns:
+            APIRequestContext compartido con conexiones reutilizables
+        """
+        if self.http_client is None:
+            await self._init_playwright()
+            self.http_client = await self.playwright.request.new_context(
+                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                timeout=self.config['options'].get('timeout', 30000)
+            )
+        return self.http_client
+    
+    async def _init_browser(self) -> None:
+        """Inicializa el navegador y el pool de páginas una sola vez para reutilización."""
+        if self.browser is None:
+            await self._init_playwright()
+            self.browser = await self.playwright.chromium.launch(
+                headless=self.config['options']['headless']
+            )
+            self.page_pool = self._create_page_pool()
+            self.logger.info("🌐 Navegador inicializado")
+    
+    def _create_page_pool(self) -> PoolPaginas:
+        """
+        Crea el pool de páginas según `options.page_pool`.
+        
+        Con el pool deshabilitado cada entrada se recicla tras un solo uso,
+        lo que equivale a crear un contexto nuevo por URL.
+        
+        Returns:
+            Pool de páginas configurado
+        """
+        options = self.config['options']
+        pool_config = options.get('page_pool', {})
+        size = pool_config.get('size') or options.get('max_concurrent', 3)
+        max_uses = pool_config.get('max_uses', 50) if pool_config.get('enabled', True) else 1
+        
+        self.logger.debug(f"♻️ Pool de páginas: tamaño {size}, máximo {max_uses} usos por página")
+        return PoolPaginas(self._new_browser_context, size, max_uses, self.stats, self.logger,
+                           preparar_entrada=self._prepare_pool_entry)
+    
+    async def _new_browser_context(self) -> BrowserContext:
+        """
+        Crea un contexto de navegador con la configuración del scraper.
+        
+        Returns:
+            Contexto de navegador nuevo
+        """
+        return await self.browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        )
+    
+    async def _prepare_pool_entry(self, entrada: EntradaPool) -> None:
+        """
+        Registra en una entrada nueva el contador de bytes y, si está
+        habilitado, el bloqueo de recursos de `options.block_resources`.
+        
+        Los bytes se estiman con la cabecera Content-Length de cada respuesta,
+        por lo que las respuestas sin ella no se contabilizan.
+        
+        Args:
+            entrada: Entrada recién creada por el pool
+        """
+        def contar_respuesta(response) -> None:
+            try:
+                entrada.bytes_recibidos += int(response.headers.get('content-length', 0))
+            except ValueError:
+                pass
+        
+        entrada.page.on('response', contar_respuesta)
+        
+        if not self.config['options'].get('block_resources', {}).get('enabled', False):
+            return
+        
+        async def manejar_solicitud(route) -> None:
+            request = route.request
+            if self._should_block_request(request.resource_type, request.url, entrada.page.url,
+                                          request.is_navigation_request()):
+                entrada.solicitudes_bloqueadas += 1
+                await route.abort('blockedbyclient')
+            else:
+                await route.continue_()
+        
+        await entrada.context.route('**/*', manejar_solicitud)
+    
+    def _should_block_request(self, resource_type: str, request_url: str,
+                              page_url: str, is_navigation: bool = False) -> bool:
+        """
+        Aplica la política de bloqueo de recursos a una solicitud.
+        
+        Las navegaciones nunca se bloquean. Los dominios de `allow_domains`
+        siempre se permiten y los de `deny_domains` siempre se bloquean; en
+        el resto se bloquean los tipos de `resource_types` y, si
+        `block_third_party_scripts` está activo, los scripts de otro host.
+        
+        Args:
+            resource_type: Tipo de recurso según Playwright (image, font, script...)
+            request_url: URL solicitada
+            page_url: URL de la página que hace la solicitud
+            is_navigation: Si la solicitud es una navegación de documento
+            
+        Returns:
+            True si la solicitud debe abortarse
+        """
+        if is_navigation:
+            return False
+        
+        politica = self.config['options'].get('block_resources', {})
+        host = (urlparse(request_url).hostname or '').lower()
+        
+        def coincide(dominios: List[str]) -> bool:
+            return any(host == d or host.endswith('.' + d) for d in (d.lower() for d in dominios))
+        
+        if host and coincide(politica.get('allow_domains', [])):
+            return False
+        if host and coincide(politica.get('deny_domains', [])):
+            return True
+        if resource_type in politica.get('resource_types', ['image', 'font', 'media']):
+            return True
+        if resource_type == 'script' and politica.get('block_third_party_scripts', True):
+            host_pagina = (urlparse(page_url).hostname or '').lower()
+            return bool(host) and host != host_pagina
+        return False
+    
+    async def _close_browser(self) -> None:
+        """Cierra el cliente HTTP, el pool de páginas, el navegador y limpia recursos."""
+        if self.http_client:
+            await self.http_client.dispose()
+            self.http_client = None
+        if self.browser:
+            if self.page_pool:
+                await self.page_pool.close()
+                self.page_pool = None
+            await self.browser.close()
+            self.browser = None
+            self.logger.info("🔒 Navegador cerrado")
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+    
+    def _cache_fingerprint(self) -> str:
+        """
+        Serializa la parte de la configuración que cambia el HTML renderizado.
+        
+        Returns:
+            Cadena JSON estable usada como parte de la clave de la caché
+        """
+        options = self.config['options']
+        relevante = {
+            'wait_until': options.get('wait_until'),
+            'readiness': options.get('readiness'),
+            'spa_hash_routes': options.get('spa_hash_routes'),
+            'fetch_mode': options.get('fetch_mode'),
+            'fetch_rules': options.get('fetch_rules'),
+            'block_resources': options.get('block_resources'),
+            'browser_extraction': options.get('browser_extraction', 'document'),
+        }
+        if relevante['browser_extraction'] == 'pruned':
+            relevante['poda'] = self._in_browser_prune_args()
+        return json.dumps(relevante, sort_keys=True)
+    
+    def _get_html_cache(self) -> Optional[CacheHTML]:
+        """
+        Crea (una sola vez) la caché HTML si está habilitada en `options.html_cache`.
+        
+        Returns:
+            Caché HTML o None si está deshabilitada
+        """
+        cache_config = self.config['options'].get('html_cache', {})
+        if not cache_config.get('enabled', False):
+            return None
+        if self.html_cache is None:
+            directorio = cache_config.get('dir') or Path(self.config['output_dir']) / '.cache_html'
+            self.html_cache = CacheHTML(Path(directorio), self._cache_fingerprint())
+            self.logger.info(f"🗄️ Caché HTML en: {directorio}")
+        return self.html_cache
+    
+    async def _lookup_html_cache(self, url: str) -> Optional[str]:
+        """
+        Busca una URL en la caché HTML y la revalida.
+        
+        En modo rastreo una entrada podada solo sirve si guardó los enlaces
+        del documento completo; en otro caso los enlaces saldrían del HTML
+        podado y se perderían los de la navegación, así que se vuelve a
+        renderizar.
+        
+        Args:
+            url: URL a buscar
+            
+        Returns:
+            HTML en caché si sigue vigente, None en caso contrario
+        """
+        cache = self._get_html_cache()
+        if cache is None:
+            return None
+        
+        entrada = await asyncio.to_thread(cache.leer, url)
+        if entrada is not None:
+            html, metadatos = entrada
+            sin_enlaces = self._collect_links and metadatos.get('podado') and 'enlaces' not in metadatos
+            if not sin_enlaces and await self._cache_entry_is_fresh(url, metadatos):
+                if self._collect_links and 'enlaces' in metadatos:
+                    self._discovered_links[url] = metadatos['enlaces']
+                self.stats.cache_aciertos += 1
+                self.stats.cache_bytes_ahorrados += len(html.encode('utf-8'))
+                self.logger.info(f"🗄️ Contenido obtenido de la caché: {url}")
+                return html
+        
+        self.stats.cache_fallos += 1
+        return None
+    
+    async def _cache_entry_is_fresh(self, url: str, metadatos: Dict) -> bool:
+        """
+        Revalida una entrada de la caché.
+        
+        Las URLs file:// se comparan por mtime y tamaño del documento; las
+        http(s) con una petición condicional (If-None-Match/If-Modified-Since)
+        que debe responder 304. Si `ttl_s` está configurado, las entradas más
+        recientes que ese tiempo se aceptan sin revalidar.
+        
+        Args:
+            url: URL de la entrada
+            metadatos: Metadatos guardados con la entrada
+            
+        Returns:
+            True si el HTML en caché sigue siendo válido
+        """
+        ttl = self.config['options'].get('html_cache', {}).get('ttl_s')
+        if ttl and time.time() - metadatos.get('guardado', 0) < ttl:
+            return True
+        
+        validadores = metadatos.get('validadores') or {}
+        if url.startswith('file://'):
+            return bool(validadores) and CacheHTML.validadores_archivo(url) == validadores
+        
+        headers = {}
+        if validadores.get('etag'):
+            headers['If-None-Match'] = validadores['etag']
+        if validadores.get('last-modified'):
+            headers['If-Modified-Since'] = validadores['last-modified']
+        if not headers:
+            return False
+        
+        try:
+            client = await self._get_http_client()
+            response = await client.get(split_document_url(url)[0], headers=headers,
+                                        fail_on_status_code=False)
+            fresca = response.status == 304
+            await response.dispose()
+            return fresca
+        except Exception as e:
+            self.logger.debug(f"🗄️ No se pudo revalidar {url}: {e}")
+            return False
+    
+    async def _extract_content_safe(self, url: str, retry_count: int = 0) -> Optional[str]:
+        """
+        Extrae contenido HTML de forma segura con manejo de errores y reintentos.
+        
+        Los reintentos se hacen en línea, con backoff exponencial y jitter,
+        y solo para las categorías de error reintentables. El pipeline usa
+        `_fetch_attempt()` y reprograma los reintentos sin ocupar un worker.
+        
+        Args:
+            url: URL a procesar
+            retry_count: Número de intento actual
+            
+        Returns:
+            Contenido HTML extraído o None si falla
+        """
+        intento = retry_count
+        while True:
+            content, categoria = await self._fetch_attempt(url, use_cache=intento == 0)
+            if content is not None:
+                return content
+            if not self._should_retry(categoria, intento):
+                return None
+            
+            espera = self._schedule_retry(url, categoria, intento)
+            await asyncio.sleep(espera)
+            intento += 1
+    
+    def _should_retry(self, categoria: str, intento: int) -> bool:
+        """
+        Decide si un intento fallido debe reintentarse.
+        
+        Args:
+            categoria: Categoría del error (ver `clasificar_error()`)
+            intento: Número de intentos ya realizados menos uno
+            
+        Returns:
+            True si quedan reintentos y la categoría es reintentable
+        """
+        if intento >= self.config['options'].get('retry_attempts', 2):
+            return False
+        reintentables = self.config['options'].get('retry', {}).get(
+            'retry_on', ['timeout', 'dns', 'conexion', 'http_429', 'http_5xx', 'contenido_vacio', 'otro']
+        )
+        return categoria in reintentables
+    
+    def _schedule_retry(self, url: str, categoria: str, intento: int) -> float:
+        """
+        Registra un reintento y calcula su espera con backoff exponencial y jitter.
+        
+        La espera base es `base_delay_ms * 2^intento`, limitada a `max_delay_ms`;
+        una fracción `jitter` de ella se elige al azar para repartir los
+        reintentos en el tiempo.
+        
+        Args:
+            url: URL que se reintentará
+            categoria: Categoría del error
+            intento: Número de intentos ya realizados menos uno
+            
+        Returns:
+            Segundos a esperar antes del reintento
+        """
+        retry_config = self.config['options'].get('retry', {})
+        base = retry_config.get('base_delay_ms', 1000) / 1000.0
+        maximo = retry_config.get('max_delay_ms', 30000) / 1000.0
+        jitter = min(1.0, max(0.0, retry_config.get('jitter', 0.5)))
+        
+        espera = min(maximo, base * (2 ** intento))
+        espera = espera * (1 - jitter) + random.uniform(0, espera * jitter)
+        
+        max_retries = self.config['options'].get('retry_attempts', 2)
+        self.stats.reintentos += 1
+        self.logger.info(f"🔄 Reintentando ({intento + 1}/{max_retries}) en {espera:.1f}s [{categoria}]: {url}")
+        return espera
+    
+    async def _fetch_attempt(self, url: str, use_cache: bool = True) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Realiza un único intento de obtener el HTML de una URL.
+        
+        Args:
+            url: URL a procesar
+            use_cache: Si se consulta la caché HTML antes de descargar
+            
+        Returns:
+            Tupla (html, None) si tuvo éxito o (None, categoría del error)
+        """
+        inicio = time.perf_counter()
+        self._url_metrics(url)
+        if use_cache:
+            cached = await self._lookup_html_cache(url)
+            if cached is not None:
+                self._record_fetched(url, cached, inicio)
+                return cached, None
+        
+        try:
+            # Los validadores de archivos locales se toman antes de leer o renderizar
+            validadores = CacheHTML.validadores_archivo(url) if url.startswith('file://') else None
+            content = None
+            
+            modo = self._fetch_mode_for(url)
+            if modo != 'browser':
+                inicio_estatica = time.perf_counter()
+                content, validadores_http = await self._fetch_static(url)
+                self._record_stage(url, 'descarga_estatica', time.perf_counter() - inicio_estatica)
+                if modo == 'auto' and self._needs_javascript(url, content):
+                    self.logger.debug(f"⚡ La página requiere JavaScript, se usa el navegador: {url}")
+                    self.stats.recurrencias_navegador += 1
+                    content = None
+                else:
+                    self.stats.descargas_estaticas += 1
+                    validadores = validadores or validadores_http
+            
+            podado = False
+            if content is None:
+                content, validadores_http = await self._render_in_browser(url)
+                validadores = validadores or validadores_http
+                podado = self.config['options'].get('browser_extraction', 'document') == 'pruned'
+            
+            if content and len(content) > 100:  # Verificar que el contenido no esté vacío
+                self.logger.info(f"✅ Contenido extraído: {len(content):,} caracteres")
+                cache = self._get_html_cache()
+                ttl = self.config['options'].get('html_cache', {}).get('ttl_s')
+                if cache is not None and (validadores or ttl):
+                    await asyncio.to_thread(cache.guardar, url, content, validadores or {}, podado,
+                                            self._discovered_links.get(url))
+                self._record_fetched(url, content, inicio)
+                return content, None
+            else:
+                self.logger.warning(f"⚠️ Contenido sospechosamente corto: {len(content) if content else 0} caracteres")
+                categoria = 'contenido_vacio'
+                
+        except Exception as e:
+            categoria = clasificar_error(e)
+            self.logger.error(f"❌ Error extrayendo contenido de {url} [{categoria}]: {type(e).__name__}: {e}")
+        
+        self.stats.errores_por_categoria[categoria] = self.stats.errores_por_categoria.get(categoria, 0) + 1
+        self._record_stage(url, 'descarga', time.perf_counter() - inicio)
+        return None, categoria
     
-    def __post_init__(self):
-        if self.urls_procesadas is None:
-            self.urls_procesadas = []
-        if self.urls_fallidas is None:
-            self.urls_fallidas = []
+    def _fetch_mode_for(self, url: str) -> str:
+        """
+        Decide cómo obtener una URL: `browser`, `static` o `auto`.
+        
+        Se aplica la primera regla de `options.fetch_rules` cuyo patrón
+        (estilo glob) coincide con la URL; si ninguna coincide se usa
+        `options.fetch_mode`.
+        
+        Args:
+            url: URL a procesar
+            
+        Returns:
+            Modo de obtención para la URL
+        """
+        options = self.config['options']
+        for regla in options.get('fetch_rules', []):
+            if fnmatch.fnmatchcase(url, regla.get('pattern', '')):
+                return regla.get('mode', 'browser')
+        return options.get('fetch_mode', 'browser')
+    
+    async def _fetch_static(self, url: str) -> Tuple[str, Dict]:
+        """
+        Obtiene el HTML sin navegador: lectura directa de archivos locales o
+        petición con el cliente HTTP compartido para URLs remotas.
+        
+        Args:
+            url: URL a obtener (el fragmento se ignora)
+            
+        Returns:
+            Tupla (html, validadores http para la caché)
+            
+        Raises:
+            ErrorDescarga: Si el servidor responde con un código de error
+        """
+        documento, _ = split_document_url(url)
+        
+        if url.startswith('file://'):
+            self.logger.info(f"📂 Leyendo archivo: {url}")
+            datos = await asyncio.to_thread(file_url_to_path(documento).read_bytes)
+            return datos.decode('utf-8', errors='replace'), {}
+        
+        self.logger.info(f"⚡ Descargando sin navegador: {url}")
+        client = await self._get_http_client()
+        response = await client.get(documento, fail_on_status_code=False)
+        try:
+            if response.status >= 400:
+                raise error_http(response.status, documento)
+            return await response.text(), CacheHTML.validadores_http(response.headers)
+        finally:
+            await response.dispose()
+    
+    def _needs_javascript(self, url: str, html: str) -> bool:
+        """
+        Detecta si una página obtenida sin navegador necesita JavaScript.
+        
+        Se considera que sí cuando la URL usa rutas hash de SPA (`#/...`),
+        cuando el HTML tiene un punto de montaje SPA vacío o cuando, habiendo
+        scripts, el texto visible es menor que `options.static_min_text`.
+        
+        Args:
+            url: URL obtenida
+            html: HTML obtenido sin ejecutar JavaScript
+            
+        Returns:
+            True si hay que renderizar la página en el navegador
+        """
+        _, fragmento = split_document_url(url)
+        if fragmento.startswith(('/', '!')):
+            return True
+        if not html or RE_MONTAJE_SPA_VACIO.search(html):
+            return True
+        
+        if RE_SCRIPT.search(html):
+            texto = RE_ETIQUETAS.sub(' ', RE_SCRIPTS_Y_ESTILOS.sub(' ', html))
+            if len(''.join(texto.split())) < self.config['options'].get('static_min_text', 200):
+                return True
+        return False
+    
+    async def _render_in_browser(self, url: str) -> Tuple[str, Dict]:
+        """
+        Renderiza una URL en una página del pool y retorna su HTML.
+        
+        En modo SPA, si la página prestada ya tiene cargado el documento,
+        solo se cambia el hash en lugar de navegar de nuevo.
+        
+        Args:
+            url: URL a renderizar
+            
+        Returns:
+            Tupla (html, validadores http del documento para la caché)
+            
+        Raises:
+            ErrorDescarga: Si el documento responde con un código de error HTTP
+        """
+        spa_mode = self.config['options'].get('spa_hash_routes', False)
+        documento, fragmento = split_document_url(url)
+        
+        await self._init_browser()
+        
+        async with self.page_pool.lease(documento if spa_mode else None) as entrada:
+            page = entrada.page
+            entrada.solicitudes_bloqueadas = 0
+            entrada.bytes_recibidos = 0
+            
+            # Configurar timeouts
+            timeout = self.config['options'].get('timeout', 30000)
+            wait_until = self.config['options'].get('wait_until', 'networkidle')
+            
+            inicio = time.perf_counter()
+            if spa_mode and fragmento and entrada.documento == documento:
+                # El documento ya está cargado: solo cambiar la ruta
+                self.logger.info(f"🧭 Navegando en la SPA a: #{fragmento}")
+                await page.evaluate(JS_NAVEGAR_HASH, fragmento)
+                await page.wait_for_load_state(wait_until, timeout=timeout)
+                self.stats.navegaciones_hash += 1
+            else:
+                self.logger.info(f"🌐 Accediendo a: {url}")
+                response = await page.goto(url, wait_until=wait_until, timeout=timeout)
+                self.stats.cargas_completas += 1
+                entrada.validadores = CacheHTML.validadores_http(response.headers) if response else {}
+                if response is not None and response.status >= 400 and url.startswith('http'):
+                    entrada.documento = None
+                    raise error_http(response.status, url)
+                if spa_mode:
+                    entrada.documento = documento
+            
+            self._record_stage(url, 'navegacion', time.perf_counter() - inicio)
+            
+            # Esperar a que el contenido dinámico se estabilice
+            espera = await self._wait_for_content_ready(page)
+            if self._per_url_metrics:
+                self.stats.esperas_contenido_ms[url] = round(espera * 1000, 1)
+            self.stats.tiempo_espera_contenido += espera
+            self._record_stage(url, 'espera_contenido', espera)
+            
+            inicio = time.perf_counter()
+            if self.config['options'].get('browser_extraction', 'document') == 'pruned':
+                # Solo la región de contenido cruza la frontera con el navegador
+                argumentos = dict(self._in_browser_prune_args(), links=self._collect_links)
+                extraido = await page.evaluate(JS_EXTRAER_CONTENIDO, argumentos)
+                content = extraido['html']
+                if extraido.get('links') is not None:
+                    self._discovered_links[url] = extraido['links']
+            else:
+                content = await page.content()
+            self._record_stage(url, 'extraccion', time.perf_counter() - inicio)
+            self.stats.bytes_html_navegador += len(content)
+            
+            if self.config['options'].get('metrics', {}).get('browser_memory', True):
+                await self._sample_page_memory(page, url)
+            
+            self.stats.solicitudes_bloqueadas += entrada.solicitudes_bloqueadas
+            self.stats.bytes_red += entrada.bytes_recibidos
+            red = {'bloqueadas': entrada.solicitudes_bloqueadas, 'bytes': entrada.bytes_recibidos}
+            self._url_metrics(url)['red'] = red
+            if self._per_url_metrics:
+                self.stats.red_por_url[url] = red
+            if entrada.solicitudes_bloqueadas:
+                self.logger.debug(f"🚫 {entrada.solicitudes_bloqueadas} solicitudes bloqueadas en {url}")
+            
+            return content, entrada.validadores or {}
+    
+    def _in_browser_prune_args(self) -> Dict:
+        """
+        Argumentos de `JS_EXTRAER_CONTENIDO` tomados de la sección `markdown`.
+        
+        Returns:
+            Diccionario con selectors, strip y readability
+        """
+        markdown_config = self.config['markdown']
+        selectores = markdown_config.get('content_selector') or []
+        if isinstance(selectores, str):
+            selectores = [selectores]
+        return {
+            'selectors': selectores,
+            'strip': markdown_config.get('strip_elements', ['script', 'style']),
+            'readability': bool(markdown_config.get('readability', False)),
+        }
+    
+    async def _wait_for_content_ready(self, page: Page) -> float:
+        """
+        Espera a que el contenido dinámico de la página esté listo.
+        
+        Con la estrategia `adaptive` retorna en cuanto el selector configurado
+        existe, el DOM lleva `quiet_ms` sin mutaciones y la longitud del texto
+        lleva `text_stable_ms` sin cambiar, con `max_wait_ms` como límite. Una
+        página sin texto se da por lista cuando el DOM lleva `text_stable_ms`
+        sin mutaciones, en lugar de agotar la espera máxima. La estrategia `fixed` espera siempre `fixed_wait_ms`.
+        
+        Args:
+            page: Página ya navegada
+            
+        Returns:
+            Segundos esperados
+        """
+        readiness = self.config['options'].get('readiness', {})
+        inicio = time.perf_counter()
+        
+        if readiness.get('strategy', 'adaptive') == 'fixed':
+            await page.wait_for_timeout(readiness.get('fixed_wait_ms', 2000))
+            return time.perf_counter() - inicio
+        
+        max_wait_ms = readiness.get('max_wait_ms', 5000)
+        parametros = {
+            'selector': readiness.get('selector'),
+            'quietMs': readiness.get('quiet_ms', 250),
+            'textStableMs': readiness.get('text_stable_ms', 250),
+            'maxWaitMs': max_wait_ms,
+            'pollMs': readiness.get('poll_ms', 50),
+        }
+        
+        for _ in range(2):
+            try:
+                resultado = await page.evaluate(JS_ESPERAR_CONTENIDO, parametros)
+                if not resultado.get('estable'):
+                    self.logger.debug(f"⏳ Contenido no estabilizado tras {max_wait_ms} ms")
+                break
+            except Exception as e:
+                # Una navegación del router puede destruir el contexto de ejecución
+                self.logger.debug(f"⏳ Reintentando detección de contenido listo: {e}")
+                restante = max_wait_ms - (time.perf_counter() - inicio) * 1000
+                if restante <= 0:
+                    break
+                parametros['maxWaitMs'] = restante
+        
+        return time.perf_counter() - inicio
+    
+    def _requires_page_load(self, url_anterior: str, url: str) -> bool:
+        """
+        Indica si visitar `url` tras `url_anterior` implica una carga completa.
+        
+        En modo SPA dos rutas del mismo documento se navegan en la misma
+        página, por lo que no generan peticiones nuevas.
+        """
+        if not self.config['options'].get('spa_hash_routes', False):
+            return True
+        return split_document_url(url_anterior)[0] != split_document_url(url)[0]
+    
+    def _group_by_document(self, urls: List[str]) -> List[List[Tuple[int, str]]]:
+        """
+        Agrupa las URLs por documento conservando su índice original.
+        
+        Los grupos siguen el orden de la primera aparición de cada documento
+        y, dentro de cada grupo, el orden original de las rutas.
+        
+        Args:
+            urls: URLs a agrupar
+            
+        Returns:
+            Lista de grupos de tuplas (índice, url)
+        """
+        grupos: Dict[str, List[Tuple[int, str]]] = {}
+        for i, url in enumerate(urls, 1):
+            documento, _ = split_document_url(url)
+            grupos.setdefault(documento, []).append((i, url))
+        return list(grupos.values())
+    
+    def _generate_smart_filename(self, url: str, index: int) -> str:
+        """
+        Genera nombres de archivo inteligentes basados en el contenido de la URL.
+        
+        Args:
+            url: URL a procesar
+            index: Índice secuencial
+            
+        Returns:
+            Nombre de archivo generado
+        """
+        pattern = self.config['markdown']['naming_pattern']
+        extension = self.config['markdown']['file_extension']
+        smart_naming = self.config['markdown'].get('smart_naming', True)
+        
+        if smart_naming and '#' in url:
+            # Extraer el fragmento de la URL
+            fragment = url.split('#')[-1]
+            # Limpiar caracteres especiales
+            fragment = fragment.replace('/', '_').replace('\\', '_')
+            fragment = ''.join(c for c in fragment if c.isalnum() or c in '_-')
+            filename = f"{fragment}_{index:02d}"
+        else:
+            filename = pattern.format(index=index)
+        
+        return f"{filename}{extension}"
+    
+    def _convert_to_markdown(self, html_content: str) -> str:
+        """
+        Convierte HTML a Markdown con opciones configurables.
+        
+        Args:
+            html_content: Contenido HTML a convertir
+            
+        Returns:
+            Contenido convertido a Markdown
+        """
+        if not html_content:
+            return ""
+        
+        try:
+            return convertir_html_a_markdown(html_content, self.config['markdown'])
+            
+        except Exception as e:
+            self.logger.error(f"❌ Error convirtiendo a Markdown: {e}")
+            return ""
+    
+    async def _convert_to_markdown_async(self, html_content: str) -> str:
+        """
+        Convierte HTML a Markdown sin bloquear el event loop.
+        
+        La conversión se ejecuta en el executor configurado en
+        `options.conversion_executor`; el número de conversiones pendientes
+        se limita a `max_concurrent` para aplicar contrapresión.
+        
+        Args:
+            html_content: Contenido HTML a convertir
+            
+        Returns:
+            Contenido convertido a Markdown
+        """
+        if not html_content:
+            return ""
+        
+        executor = self._get_conversion_executor()
+        if executor is None:
+            return self._convert_to_markdown(html_content)
+        
+        if self._conversion_semaphore is None:
+            self._conversion_semaphore = asyncio.Semaphore(
+                self.config['options'].get('max_concurrent', 3)
+            )
+        
+        async with self._conversion_semaphore:
+            return await self._convert_in_executor(executor, html_content)
+    
+    async def _convert_in_executor(self, executor: Executor, html_content: str) -> str:
+        """
+        Ejecuta la conversión en el executor indicado, sin límite propio.
+        
+        Args:
+            executor: Executor donde convertir
+            html_content: Contenido HTML a convertir
+            
+        Returns:
+            Contenido convertido a Markdown o cadena vacía si falla
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                executor, convertir_html_a_markdown, html_content, self.config['markdown']
+            )
+        except Exception as e:
+            self.logger.error(f"❌ Error convirtiendo a Markdown: {type(e).__name__}: {e}")
+            return ""
+    
+    def _get_conversion_executor(self) -> Optional[Executor]:
+        """
+        Crea (una sola vez) el executor de conversión configurado.
+        
+        Returns:
+            Executor de procesos o hilos, o None para conversión en línea
+        """
+        if self._conversion_executor is not None:
+            return self._conversion_executor
+        
+        executor_config = self.config['options'].get('conversion_executor', {})
+        mode = executor_config.get('mode', 'process')
+        workers = executor_config.get('workers') or os.cpu_count() or 1
+        
+        if mode == 'process':
+            # spawn: un hijo creado con fork heredaría las tuberías del driver de
+            # Playwright y su cierre quedaría esperando a que el hijo terminara
+            self._conversion_executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        elif mode == 'thread':
+            self._conversion_executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='markdown'
+            )
+        else:
+            return None
+        
+        self.logger.info(f"⚙️ Conversión a Markdown en pool de {mode} ({workers} workers)")
+        return self._conversion_executor
+    
+    async def _shutdown_conversion_executor(self) -> None:
+        """
+        Detiene el executor de conversión si fue creado.
+        
+        La espera a que terminen sus hilos o procesos se hace fuera del bucle
+        de eventos, que sigue atendiendo otras tareas (p. ej. el apagado del
+        servicio) mientras tanto.
+        """
+        executor = self._conversion_executor
+        if executor is not None:
+            self._conversion_executor = None
+            self._conversion_semaphore = None
+            await asyncio.to_thread(executor.shutdown, True)
+    
+    def _clean_markdown(self, markdown: str) -> str:
+        """
+        Limpia y optimiza el contenido Markdown.
+        
+        Args:
+            markdown: Contenido Markdown a limpiar
+            
+        Returns:
+            Contenido Markdown limpio
+        """
+        return limpiar_markdown(markdown, self.config['markdown'].get('cleanup'))
+    
+    def _get_manifest(self) -> Optional[ManifiestoSalida]:
+        """
+        Carga (una sola vez) el manifiesto de salida si `options.incremental` está activo.
+        
+        Returns:
+            Manifiesto de salida o None si las ejecuciones incrementales están deshabilitadas
+        """
+        if not self.config['options'].get('incremental', True):
+            return None
+        if self.manifest is None:
+            huella = json.dumps(self.config['markdown'], sort_keys=True)
+            output_dir = Path(self.config['output_dir'])
+            destino = ManifiestoSalida.ruta_fragmento(output_dir, self.shard[0]) if self.shard else None
+            self.manifest = ManifiestoSalida(output_dir, huella, destino)
+        return self.manifest
+    
+    def _save_manifest(self) -> None:
+        """Persiste el manifiesto de salida si está en uso."""
+        if self.manifest is None:
+            return
+        try:
+            # Los workers de una cola compartida pueden compartir directorio de salida
+            self.manifest.guardar(fusionar=self.work_queue is not None)
+        except Exception as e:
+            self.logger.error(f"❌ Error guardando manifiesto: {e}")
+    
+    def _open_journal(self) -> None:
+        """
+        Abre el diario de trabajos si `options.journal.enabled` está activo.
+        
+        Sin `options.resume` el diario se reinicia; con él se conserva para
+        omitir las URLs ya completadas. Los procesos de `run_sharded`
+        comparten el diario del coordinador y nunca lo reinician.
+        """
+        journal_config = self.config['options'].get('journal', {})
+        if not journal_config.get('enabled', True) or self.journal is not None:
+            return
+        try:
+            self.journal = DiarioTrabajos(
+                Path(self.config['output_dir']),
+                lote=journal_config.get('batch_size', 200),
+                intervalo_s=journal_config.get('flush_interval_s', 2),
+            )
+            if self.shard is not None:
+                return  # El coordinador de `run_sharded` ya reinició o conservó el diario
+            if self.config['options'].get('resume', False):
+                estados = ", ".join(f"{estado}: {total}" for estado, total in self.journal.resumen().items())
+                self.logger.info(f"⏯️ Reanudando desde {self.journal.ruta} ({estados or 'vacío'})")
+            else:
+                self.journal.reiniciar()
+        except sqlite3.Error as e:
+            self.logger.error(f"❌ No se pudo abrir el diario de trabajos: {e}")
+            self.journal = None
+    
+    def _journal(self, url: str, estado: str, index: Optional[int] = None,
+                 error: Optional[str] = None, depth: Optional[int] = None) -> None:
+        """Anota el estado de una URL en el diario de trabajos, si está en uso."""
+        if self.journal is not None:
+            self.journal.registrar(url, estado, index, error, depth)
+    
+    def _journal_discovered(self, url: str, depth: int) -> None:
+        """
+        Anota en el diario una URL admitida en la frontera del rastreo.
+        
+        Con su profundidad, `--resume` puede devolver a la frontera las URLs
+        descubiertas que no llegaron a completarse; las ya completadas no se
+        tocan para que sigan omitiéndose.
+        """
+        if self.journal is None:
+            return
+        if self.config['options'].get('resume', False) and self.journal.completada(url):
+            return
+        self.journal.registrar(url, 'pendiente', profundidad=depth)
+    
+    def _already_completed(self, url: str) -> bool:
+        """
+        Indica si una URL debe omitirse por estar completada al reanudar.
+        
+        Args:
+            url: URL a comprobar
+            
+        Returns:
+            True si `options.resume` está activo y el diario la registra como completada
+        """
+        if self.journal is None or not self.config['options'].get('resume', False):
+            return False
+        if not self.journal.completada(url):
+            return False
+        with self._stats_lock:
+            self.stats.trabajos_reanudados += 1
+        return True
+    
+    async def _flush_journal_periodically(self) -> None:
+        """Vuelca el diario en segundo plano cuando se llena un lote o vence el intervalo."""
+        while True:
+            await asyncio.sleep(0.25)
+            if self.journal is not None and self.journal.debe_volcar():
+                try:
+                    await asyncio.to_thread(self.journal.volcar)
+                except sqlite3.Error as e:
+                    self.logger.error(f"❌ Error escribiendo el diario de trabajos: {e}")
+    
+    def _close_journal(self) -> None:
+        """Vuelca los últimos cambios y cierra el diario de trabajos."""
+        if self.journal is None:
+            return
+        try:
+            self.journal.cerrar()
+        except sqlite3.Error as e:
+            self.logger.error(f"❌ Error cerrando el diario de trabajos: {e}")
+        self.journal = None
+    
+    def _output_unchanged(self, url: str, html_hash: str, filename: str) -> bool:
+        """
+        Comprueba en el manifiesto si la salida de una URL no ha cambiado.
+        
+        Si el HTML y la configuración coinciden con la ejecución anterior y
+        el archivo sigue existiendo, se omiten la conversión y la escritura y
+        se contabilizan las métricas guardadas.
+        
+        Args:
+            url: URL procesada
+            html_hash: Hash del HTML obtenido
+            filename: Archivo de salida esperado
+            
+        Returns:
+            True si la salida se reutiliza sin cambios
+        """
+        manifest = self._get_manifest()
+        entrada = manifest.sin_cambios(url, html_hash, filename) if manifest else None
+        if entrada is None:
+            return False
+        
+        with self._stats_lock:
+            self.stats.total_palabras += entrada.get('palabras', 0)
+            self.stats.total_caracteres += entrada.get('caracteres', 0)
+            self.stats.salidas_omitidas += 1
+        self.logger.info(f"⏭️ Sin cambios, se conserva: {filename}")
+        return True
+    
+    def _save_markdown_file(self, content: str, filename: str,
+                            url: Optional[str] = None, html_hash: Optional[str] = None) -> bool:
+        """
+        Guarda contenido Markdown en archivo.
+        
+        La escritura es atómica (archivo temporal + rename) y, si la URL ya
+        generó exactamente este contenido en una ejecución anterior, el
+        archivo existente se deja intacto.
+        
+        Args:
+            content: Contenido a guardar
+            filename: Nombre del archivo
+            url: URL de origen, para actualizar el manifiesto de salida
+            html_hash: Hash del HTML de origen, para el manifiesto
+            
+        Returns:
+            True si se guardó exitosamente, False en caso contrario
+        """
+        if not content or not content.strip():
+            self.logger.warning(f"⚠️ Contenido vacío para {filename}")
+            return False
+        
+        try:
+            output_path = Path(self.config['output_dir']) / filename
+            manifest = self._get_manifest() if url else None
+            markdown_hash = content_hash(content)
+            
+            # Calcular métricas
+            word_count = len(content.split())
+            char_count = len(content)
+            
+            if manifest and manifest.markdown_sin_cambios(url, markdown_hash, filename):
+                self.logger.info(f"⏭️ Sin cambios, se conserva: {filename}")
+                omitida = True
+            else:
+                # Verificar si archivo existe
+                if output_path.exists():
+                    self.logger.info(f"📝 Sobrescribiendo archivo existente: {filename}")
+                
+                # Guardar archivo
+                atomic_write_text(output_path, content)
+                omitida = False
+            
+            if manifest:
+                manifest.actualizar(url, html_hash=html_hash, markdown_hash=markdown_hash,
+                                    archivo=filename, palabras=word_count, caracteres=char_count)
+            
+            # Actualizar estadísticas (puede ejecutarse desde hilos de escritura)
+            with self._stats_lock:
+                self.stats.total_palabras += word_count
+                self.stats.total_caracteres += char_count
+                if omitida:
+                    self.stats.salidas_omitidas += 1
+                else:
+                    self.stats.salidas_reescritas += 1
+            
+            if not omitida:
+                self.logger.info(f"✅ Archivo guardado: {filename} ({word_count:,} palabras, {char_count:,} caracteres)")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"❌ Error guardando archivo {filename}: {e}")
+            return False
     
-    @property
-    def duracion(self) -> float:
-        """Calcula la duración total del procesamiento."""
-        return self.fin - self.inicio if self.fin > self.inicio else 0
+    async def _save_markdown_file_async(self, content: str, filename: str,
+                                        url: Optional[str] = None, html_hash: Optional[str] = None) -> bool:
+        """
+        Guarda contenido Markdown en un hilo para no bloquear el event loop.
+        
+        Args:
+            content: Contenido a guardar
+            filename: Nombre del archivo
+            url: URL de origen, para actualizar el manifiesto de salida
+            html_hash: Hash del HTML de origen, para el manifiesto
+            
+        Returns:
+            True si se guardó exitosamente, False en caso contrario
+        """
+        return await asyncio.to_thread(self._save_markdown_file, content, filename, url, html_hash)
     
-    @property
-    def total_archivos(self) -> int:
-        """Retorna el total de archivos procesados."""
-        return self.archivos_procesados + self.archivos_fallidos
+    def _record_result(self, url: str, success: bool, error: Optional[str] = None) -> None:
+        """
+        Registra el resultado final de una URL en las estadísticas y el diario.
+        
+        Args:
+            url: URL procesada
+            success: Si la URL terminó guardada correctamente
+            error: Etapa o categoría del fallo, si lo hubo
+        """
+        if success:
+            self.stats.archivos_procesados += 1
+            self.stats.urls_procesadas.append(url)
+            self._journal(url, 'completado')
+        else:
+            self.stats.archivos_fallidos += 1
+            self.stats.urls_fallidas.append(url)
+            self._journal(url, 'fallido', error=error)
+        
+        if self.work_queue is not None:
+            with self._stats_lock:
+                self._queue_results.append((url, success, error))
+                self._leased_urls.discard(url)
+            if self._lease_released is not None:
+                self._lease_released.set()
+        
+        metricas = self._metricas_en_curso.pop(url, None)
+        if metricas is not None:
+            self._finish_url_metrics(url, metricas, success, error)
     
     @property
-    def tasa_exito(self) -> float:
-        """Calcula la tasa de éxito en porcentaje."""
-        if self.total_archivos == 0:
-            return 0
-        return (self.archivos_procesados / self.total_archivos) * 100
+    def _per_url_metrics(self) -> bool:
+        """
+        Indica si las estadísticas guardan entradas por URL (`metrics.per_url`).
+        
+        Desactivado por defecto: esos diccionarios crecen con cada URL durante
+        toda la ejecución. Para seguir cada URL sin ocupar memoria está
+        `metrics.jsonl`, que escribe su fila al terminarla.
+        """
+        return bool(self.config['options'].get('metrics', {}).get('per_url', False))
     
-    def imprimir_resumen(self):
-        """Imprime un resumen detallado de las estadísticas."""
-        print("\n" + "="*60)
-        print("📊 ESTADÍSTICAS FINALES DEL PROCESAMIENTO")
-        print("="*60)
-        print(f"📄 Total de archivos procesados: {self.total_archivos}")
-        print(f"✅ Exitosos: {self.archivos_procesados}")
-        print(f"❌ Fallidos: {self.archivos_fallidos}")
-        print(f"📈 Tasa de éxito: {self.tasa_exito:.1f}%")
-        print(f"📝 Total de palabras extraídas: {self.total_palabras:,}")
-        print(f"📏 Total de caracteres: {self.total_caracteres:,}")
-        print(f"⏱️ Tiempo total: {self.duracion:.2f} segundos")
+    def _url_metrics(self, url: str) -> Dict:
+        """
+        Retorna las métricas en curso de una URL, creándolas si no existen.
         
-        if self.archivos_procesados > 0:
-            tiempo_promedio = self.duracion / self.archivos_procesados
-            palabras_promedio = self.total_palabras // self.archivos_procesados
-            print(f"⚡ Tiempo promedio por archivo: {tiempo_promedio:.2f}s")
-            print(f"📊 Palabras promedio por archivo: {palabras_promedio:,}")
+        Se crean al poner la URL en cola, de modo que la latencia `total`
+        incluye las esperas en las colas.
         
-        if self.urls_fallidas:
-            print(f"\n❌ URLs que fallaron:")
-            for url in self.urls_fallidas:
-                print(f"   • {url}")
+        Args:
+            url: URL en proceso
+            
+        Returns:
+            Diccionario con el instante de inicio y los tiempos por etapa (ms)
+        """
+        metricas = self._metricas_en_curso.get(url)
+        if metricas is None:
+            metricas = self._metricas_en_curso[url] = {'inicio': time.perf_counter(), 'ms': {}}
+        return metricas
+    
+    def _record_stage(self, url: str, etapa: str, segundos: float) -> None:
+        """
+        Registra la duración de una etapa en el histograma global y en la URL.
         
-        print("="*60)
-
-
-class HTMLToMarkdownScraper:
-    """
-    Extractor profesional de contenido HTML a Markdown usando Playwright.
+        Args:
+            url: URL en proceso
+            etapa: Nombre de la etapa
+            segundos: Duración medida (se acumula si la etapa se repite)
+        """
+        self.stats.registrar_etapa(etapa, segundos)
+        tiempos = self._url_metrics(url)['ms']
+        tiempos[etapa] = round(tiempos.get(etapa, 0) + segundos * 1000, 1)
     
-    Esta clase maneja la extracción de contenido de archivos HTML locales o URLs remotas,
-    convierte el contenido a Markdown y guarda los archivos con configuración flexible.
-    """
+    def _record_fetched(self, url: str, html_content: str, inicio: float) -> None:
+        """Registra la duración de una descarga correcta y el tamaño del HTML."""
+        self._record_stage(url, 'descarga', time.perf_counter() - inicio)
+        self._url_metrics(url)['html'] = len(html_content)
+        self.stats.paginas_descargadas += 1
+        self.stats.bytes_html += len(html_content)
+    
+    def _record_converted(self, url: str, markdown: str, inicio: float) -> None:
+        """Registra la duración de una conversión y el tamaño del Markdown."""
+        self._record_stage(url, 'conversion', time.perf_counter() - inicio)
+        if markdown:
+            self._url_metrics(url)['markdown'] = len(markdown)
+            self.stats.paginas_convertidas += 1
+            self.stats.bytes_markdown += len(markdown)
     
-    def __init__(self, config_path: str = "config.json"):
+    async def _sample_page_memory(self, page: Page, url: str) -> None:
         """
-        Inicializa el scraper con configuración desde archivo.
+        Mide el heap de JavaScript de la página tras extraer su contenido.
         
         Args:
-            config_path: Ruta al archivo de configuración JSON
+            page: Página del pool
+            url: URL renderizada
         """
-        self.config = self._load_config(config_path)
-        self.logger = self._setup_logging()
-        self.stats = EstadisticasProcesamiento()
-        self.browser: Optional[Browser] = None
+        try:
+            usado = await page.evaluate(JS_MEMORIA_PAGINA)
+        except Exception:
+            return
+        if usado:
+            megas = round(usado / (1024 * 1024), 1)
+            self._url_metrics(url)['memoria_mb'] = megas
+            self.stats.memoria_navegador_max_mb = max(self.stats.memoria_navegador_max_mb, megas)
+    
+    def _finish_url_metrics(self, url: str, metricas: Dict, success: bool, error: Optional[str]) -> None:
+        """
+        Cierra las métricas de una URL terminada.
         
-        self.logger.info("🚀 HTML to Markdown Scraper inicializado")
-        self.logger.info(f"📁 Configuración cargada desde: {config_path}")
+        Registra la latencia `total`, la memoria máxima del proceso, guarda la
+        fila de la URL en memoria (solo con `metrics.per_url`) y la emite como
+        línea JSON (con `metrics.jsonl`).
+        
+        Args:
+            url: URL terminada
+            metricas: Métricas en curso de la URL
+            success: Si la URL terminó guardada correctamente
+            error: Etapa o categoría del fallo, si lo hubo
+        """
+        config_metricas = self.config['options'].get('metrics', {})
+        total = time.perf_counter() - metricas.pop('inicio')
+        self.stats.registrar_etapa('total', total)
+        metricas['ms']['total'] = round(total * 1000, 1)
+        
+        if resource is not None:
+            maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux informa en KiB y macOS en bytes
+            megas = maximo / (1024 * 1024) if sys.platform == 'darwin' else maximo / 1024
+            self.stats.memoria_proceso_max_mb = round(max(self.stats.memoria_proceso_max_mb, megas), 1)
+        
+        if self._per_url_metrics:
+            self.stats.metricas_por_url[url] = metricas
+        if config_metricas.get('jsonl'):
+            registro = {'url': url, 'ok': success, 'error': error, 'fecha': round(time.time(), 3)}
+            registro.update(metricas)
+            self._stream_metrics(registro)
     
-    def _load_config(self, config_path: str) -> Dict:
+    def _stream_metrics(self, registro: Dict) -> None:
         """
-        Carga la configuración desde archivo JSON o usa valores por defecto.
+        Añade un registro al archivo JSON Lines de `metrics.jsonl`.
+        
+        Las rutas relativas se resuelven dentro del directorio de salida; el
+        archivo se abre al primer registro y se escribe línea a línea para
+        poder seguirlo (`tail -f`) durante la ejecución.
+        
+        Args:
+            registro: Métricas de una URL terminada
+        """
+        if self._metrics_stream is None:
+            ruta = Path(self.config['options']['metrics']['jsonl'])
+            if not ruta.is_absolute():
+                ruta = Path(self.config['output_dir']) / ruta
+            try:
+                ruta.parent.mkdir(parents=True, exist_ok=True)
+                self._metrics_stream = open(ruta, 'a', encoding='utf-8', buffering=1)
+            except OSError as e:
+                self.logger.warning(f"⚠️ No se pudo abrir el archivo de métricas {ruta}: {e}")
+                self.config['options']['metrics']['jsonl'] = None
+                return
+        self._metrics_stream.write(json.dumps(registro, ensure_ascii=False) + '\n')
+    
+    def _close_metrics_stream(self) -> None:
+        """Cierra el archivo JSON Lines de métricas, si se abrió."""
+        if self._metrics_stream is not None:
+            self._metrics_stream.close()
+            self._metrics_stream = None
+    
+    async def _process_single_url(self, url: str, index: int,
+                                  on_html: Optional[Callable[[str, str], None]] = None) -> bool:
+        """
+        Procesa una URL individual completamente.
         
         Args:
-            config_path: Ruta al archivo de configuración
+            url: URL a procesar
+            index: Índice secuencial
+            on_html: Función opcional que recibe (url, html) tras la extracción;
+                el modo rastreo la usa para descubrir enlaces
             
         Returns:
-            Diccionario con la configuración cargada
+            True si se procesó exitosamente, False en caso contrario
         """
-        default_config = {
-            "urls": [
-                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/introduccion",
-                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/curso/tema1",
-                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/curso/tema2",
-                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/curso/tema3",
-                "file:///C:/Users/frlpi/OneDrive/Documentos/ADSO/Fase%201%20-%20Analisis/Actividad%20de%20proyecto%201/1.%20Caracterizaci%C3%B3n%20de%20procesos/index.html#/curso/tema4"
-            ],
-            "output_dir": "C:/Users/frlpi/OneDrive/Escritorio/scraper",
-            "options": {
-                "headless": True,
-                "wait_until": "networkidle",
-                "timeout": 30000,
-                "parallel": False,
-                "max_concurrent": 3,
-                "delay_between_requests": 1000,
-                "retry_attempts": 2
-            },
-            "markdown": {
-                "strip_elements": ["script", "style", "nav", "footer", "aside", "header"],
-                "file_extension": ".mdx",
-                "naming_pattern": "contenido_{index}",
-                "smart_naming": True,
-                "clean_excessive_whitespace": True
-            },
-            "logging": {
-                "level": "INFO",
-                "console": True,
-                "file": True,
-                "log_dir": "logs"
-            }
+        try:
+            self.logger.info(f"📄 Procesando [{index}]: {url}")
+            
+            # Extraer contenido HTML
+            html_content = await self._extract_content_safe(url)
+            if not html_content:
+                self._record_result(url, False, 'descarga')
+                return False
+            self._journal(url, 'descargado')
+            if on_html is not None:
+                on_html(url, html_content)
+            
+            # Omitir conversión y escritura si nada cambió desde la última ejecución
+            filename = self._generate_smart_filename(url, index)
+            html_hash = content_hash(html_content)
+            if self._output_unchanged(url, html_hash, filename):
+                self._record_result(url, True)
+                return True
+            
+            # Convertir a Markdown
+            inicio = time.perf_counter()
+            markdown_content = await self._convert_to_markdown_async(html_content)
+            self._record_converted(url, markdown_content, inicio)
+            if not markdown_content:
+                self.logger.error(f"❌ Fallo en conversión a Markdown para: {url}")
+                self._record_result(url, False, 'conversion')
+                return False
+            self._journal(url, 'convertido')
+            
+            # Guardar archivo
+            inicio = time.perf_counter()
+            success = await self._save_markdown_file_async(markdown_content, filename, url, html_hash)
+            self._record_stage(url, 'escritura', time.perf_counter() - inicio)
+            self._record_result(url, success, None if success else 'escritura')
+            return success
+                
+        except Exception as e:
+            self.logger.error(f"❌ Error procesando {url}: {e}")
+            self._record_result(url, False, type(e).__name__)
+            return False
+    
+    def _politeness_for(self, host: str) -> Tuple[float, int, int]:
+        """
+        Calcula la política de cortesía de un host desde `options.politeness`.
+        
+        Los archivos locales (host '') no tienen límites. Si no se indica
+        `requests_per_second`, se deriva de `delay_between_requests`.
+        
+        Args:
+            host: Clave de host
+            
+        Returns:
+            Tupla (peticiones por segundo, ráfaga, máximo simultáneo)
+        """
+        if not host:
+            return 0.0, 1, 1 << 30
+        
+        options = self.config['options']
+        politica = dict(options.get('politeness', {}))
+        politica.update(politica.get('host_overrides', {}).get(host, {}))
+        
+        rps = politica.get('requests_per_second')
+        if rps is None:
+            delay = options.get('delay_between_requests', 1000)
+            rps = 1000.0 / delay if delay > 0 else 0.0
+        
+        return float(rps), max(1, int(politica.get('burst', 1))), max(1, int(politica.get('max_per_host', 2)))
+    
+    def _create_host_scheduler(self) -> PlanificadorHosts:
+        """
+        Crea el planificador de cortesía por host.
+        
+        Returns:
+            Planificador configurado con `options.politeness`
+        """
+        capacidad = self.config['options'].get('politeness', {}).get('max_pending', 100)
+        return PlanificadorHosts(self._politeness_for, capacidad)
+    
+    def _pipeline_settings(self) -> Dict[str, int]:
+        """
+        Calcula workers y tamaño de colas del pipeline desde `options.pipeline`.
+        
+        Returns:
+            Diccionario con fetch_workers, convert_workers, write_workers y queue_size
+        """
+        options = self.config['options']
+        pipeline = options.get('pipeline', {})
+        max_concurrent = options.get('max_concurrent', 3)
+        
+        return {
+            'fetch_workers': pipeline.get('fetch_workers') or max_concurrent,
+            'convert_workers': pipeline.get('convert_workers') or max_concurrent,
+            'write_workers': pipeline.get('write_workers') or 1,
+            'queue_size': pipeline.get('queue_size') or max_concurrent * 2,
         }
+    
+    def pipeline_metrics(self) -> Dict[str, int]:
+        """
+        Retorna la profundidad actual de cada cola del pipeline en ejecución.
         
-        config_file = Path(config_path)
-        if config_file.exists():
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    user_config = json.load(f)
-                    # Fusión profunda de configuraciones
-                    self._deep_merge_config(default_config, user_config)
-                    print(f"✅ Configuración cargada desde: {config_path}")
-            except json.JSONDecodeError as e:
-                print(f"⚠️ Error en formato JSON de {config_path}: {e}")
-                print("Usando configuración por defecto.")
-            except Exception as e:
-                print(f"⚠️ Error cargando configuración: {e}")
-                print("Usando configuración por defecto.")
+        Returns:
+            Diccionario nombre de cola -> elementos en espera
+        """
+        return {nombre: cola.qsize() for nombre, cola in list(self._pipeline_queues.items())}
+    
+    def prometheus_metrics(self, openmetrics: bool = False) -> str:
+        """
+        Genera las métricas de la ejecución en curso en formato de texto.
+        
+        Se llama desde el hilo del servidor de métricas (o desde otra
+        aplicación que exponga el scraper), por eso solo lee y copia las
+        colecciones antes de recorrerlas.
+        
+        Args:
+            openmetrics: Formato OpenMetrics 1.0 en lugar del de Prometheus 0.0.4
+            
+        Returns:
+            Texto de la exposición, listo para servir
+        """
+        stats = self.stats
+        lineas: List[str] = []
+        
+        def familia(nombre: str, tipo: str, ayuda: str, muestras: List[Tuple[Dict[str, str], float]]) -> None:
+            # OpenMetrics declara los contadores sin el sufijo _total
+            declarado = nombre[:-len('_total')] if openmetrics and tipo == 'counter' else nombre
+            lineas.append(f"# HELP {declarado} {ayuda}")
+            lineas.append(f"# TYPE {declarado} {tipo}")
+            for etiquetas, valor in muestras:
+                lineas.append(f"{nombre}{etiquetas_prometheus(etiquetas)} {valor}")
+        
+        def contador(nombre: str, ayuda: str, valor: float) -> None:
+            familia(nombre, 'counter', ayuda, [({}, valor)])
+        
+        def indicador(nombre: str, ayuda: str, valor: float) -> None:
+            familia(nombre, 'gauge', ayuda, [({}, valor)])
+        
+        contador('scraper_pages_fetched_total', 'Páginas descargadas o renderizadas', stats.paginas_descargadas)
+        contador('scraper_pages_converted_total', 'Páginas convertidas a Markdown', stats.paginas_convertidas)
+        contador('scraper_pages_completed_total', 'URLs terminadas correctamente', stats.archivos_procesados)
+        contador('scraper_pages_failed_total', 'URLs fallidas', stats.archivos_fallidos)
+        contador('scraper_retries_total', 'Reintentos programados', stats.reintentos)
+        familia('scraper_fetch_errors_total', 'counter', 'Intentos de descarga fallidos por categoría',
+                [({'category': categoria}, total) for categoria, total in list(stats.errores_por_categoria.items())])
+        contador('scraper_html_cache_hits_total', 'Aciertos de la caché HTML', stats.cache_aciertos)
+        contador('scraper_html_cache_misses_total', 'Fallos de la caché HTML', stats.cache_fallos)
+        consultas_cache = stats.cache_aciertos + stats.cache_fallos
+        indicador('scraper_html_cache_hit_ratio', 'Fracción de aciertos de la caché HTML',
+                  stats.cache_aciertos / consultas_cache if consultas_cache else 0)
+        contador('scraper_html_characters_total', 'Caracteres de HTML obtenidos', stats.bytes_html)
+        contador('scraper_markdown_characters_total', 'Caracteres de Markdown generados', stats.bytes_markdown)
+        
+        indicador('scraper_in_flight_urls', 'URLs en proceso (en cola o en alguna etapa)',
+                  len(self._metricas_en_curso))
+        familia('scraper_queue_depth', 'gauge', 'Elementos en espera en cada cola del pipeline',
+                [({'queue': nombre}, profundidad) for nombre, profundidad in self.pipeline_metrics().items()])
+        pool = self.page_pool
+        if pool is not None:
+            indicador('scraper_page_pool_size', 'Páginas del pool de navegador', pool.size)
+            indicador('scraper_page_pool_in_use', 'Páginas del pool prestadas', pool.en_uso)
+            indicador('scraper_page_pool_utilization', 'Fracción del pool prestada', pool.en_uso / pool.size)
+        contador('scraper_page_pool_reuses_total', 'Páginas del pool reutilizadas', stats.pool_aciertos)
+        indicador('scraper_browser_js_heap_max_bytes', 'Mayor heap JS medido en una página',
+                  int(stats.memoria_navegador_max_mb * 1024 * 1024))
+        indicador('scraper_process_max_rss_bytes', 'Memoria máxima residente del proceso',
+                  int(stats.memoria_proceso_max_mb * 1024 * 1024))
+        indicador('scraper_start_time_seconds', 'Inicio de la ejecución (epoch)', stats.inicio)
+        
+        nombre = 'scraper_stage_duration_seconds'
+        lineas.append(f"# HELP {nombre} Duración de cada etapa por URL")
+        lineas.append(f"# TYPE {nombre} histogram")
+        for etapa, histograma in list(stats.latencias.items()):
+            conteos, total, suma = list(histograma.conteos), histograma.total, histograma.suma
+            acumulado = 0
+            for limite, conteo in zip(list(histograma.limites) + ['+Inf'], conteos):
+                acumulado += conteo
+                etiquetas = etiquetas_prometheus({'stage': etapa, 'le': str(limite)})
+                lineas.append(f"{nombre}_bucket{etiquetas} {acumulado}")
+            etiquetas = etiquetas_prometheus({'stage': etapa})
+            lineas.append(f"{nombre}_sum{etiquetas} {suma}")
+            lineas.append(f"{nombre}_count{etiquetas} {total}")
+        
+        if openmetrics:
+            lineas.append('# EOF')
+        return '\n'.join(lineas) + '\n'
+    
+    def _start_metrics_server(self) -> None:
+        """Arranca el endpoint de métricas si `metrics.prometheus_port` está configurado."""
+        metricas = self.config['options'].get('metrics', {})
+        puerto = metricas.get('prometheus_port')
+        if puerto is None or self.metrics_server is not None:
+            return
+        servidor = ServidorMetricas(self.prometheus_metrics, metricas.get('prometheus_host', '127.0.0.1'),
+                                    int(puerto), self.logger)
+        try:
+            servidor.iniciar()
+        except OSError as e:
+            self.logger.warning(f"⚠️ No se pudo abrir el endpoint de métricas en el puerto {puerto}: {e}")
+            return
+        self.metrics_server = servidor
+    
+    def _stop_metrics_server(self) -> None:
+        """Detiene el endpoint de métricas, si está activo."""
+        if self.metrics_server is not None:
+            self.metrics_server.detener()
+            self.metrics_server = None
+    
+    async def start(self) -> None:
+        """
+        Prepara por adelantado el navegador (o el cliente HTTP en modo estático).
+        
+        Pensado para servicios de larga duración (ver `backend/server.py`): las
+        llamadas a `convert_url` encuentran el navegador y el pool ya abiertos.
+        Desactiva `metrics.per_url`, cuyas entradas crecerían con cada URL
+        atendida mientras el servicio siga en marcha.
+        """
+        metricas = self.config['options'].setdefault('metrics', {})
+        if metricas.get('per_url'):
+            self.logger.warning("⚠️ metrics.per_url se ignora en modo servicio")
+            metricas['per_url'] = False
+        if self.config['options'].get('fetch_mode', 'browser') == 'static':
+            await self._get_http_client()
         else:
-            print(f"📄 Archivo de configuración no encontrado: {config_path}")
-            print("Usando configuración por defecto.")
+            await self._init_browser()
+    
+    async def convert_url(self, url: str) -> Dict:
+        """
+        Descarga y convierte una URL sin escribir archivos.
         
-        return default_config
+        Reutiliza el navegador, el pool de páginas y el executor de conversión
+        entre llamadas, con los mismos reintentos que el procesamiento por
+        lotes. Las latencias se acumulan en los histogramas de `stats` y las
+        métricas en curso de la URL se descartan al terminar. Tras `start`,
+        que desactiva `metrics.per_url`, tampoco quedan esperas, red ni filas
+        por URL en `stats`, de modo que un servicio puede llamarla
+        indefinidamente. Los contadores de URLs completadas y fallidas sí se
+        actualizan (una llamada cancelada no cuenta como fallo).
+        
+        Args:
+            url: URL a convertir
+            
+        Returns:
+            Diccionario con url, ok, markdown, error, palabras y ms
+        """
+        inicio = time.perf_counter()
+        resultado = {'url': url, 'ok': False, 'markdown': None, 'error': None, 'palabras': 0}
+        cancelada = False
+        try:
+            if not self._is_valid_url(url):
+                resultado['error'] = 'url_invalida'
+                return resultado
+            intento = 0
+            while True:
+                html_content, categoria = await self._fetch_attempt(url, use_cache=intento == 0)
+                if html_content is not None or not self._should_retry(categoria, intento):
+                    break
+                await asyncio.sleep(self._schedule_retry(url, categoria, intento))
+                intento += 1
+            if html_content is None:
+                resultado['error'] = categoria
+                return resultado
+            
+            inicio_conversion = time.perf_counter()
+            markdown_content = await self._convert_to_markdown_async(html_content)
+            self._record_converted(url, markdown_content, inicio_conversion)
+            if not markdown_content:
+                resultado['error'] = 'conversion'
+                return resultado
+            resultado.update(ok=True, markdown=markdown_content, palabras=len(markdown_content.split()))
+            return resultado
+        except asyncio.CancelledError:
+            cancelada = True
+            raise
+        finally:
+            self._metricas_en_curso.pop(url, None)
+            resultado['ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+            self.stats.registrar_etapa('total', resultado['ms'] / 1000)
+            # Solo los contadores: las listas de URLs crecerían sin límite
+            if resultado['ok']:
+                self.stats.archivos_procesados += 1
+            elif not cancelada:
+                self.stats.archivos_fallidos += 1
     
-    def _deep_merge_config(self, default: Dict, user: Dict) -> None:
+    async def close(self) -> None:
+        """Cierra el navegador y el executor abiertos por `start`/`convert_url`."""
+        await self._close_browser()
+        await self._shutdown_conversion_executor()
+    
+    def _iter_work_groups(self, urls: Iterable[str]) -> Iterator[List[Tuple[int, str]]]:
         """
-        Fusiona recursivamente la configuración del usuario con la por defecto.
+        Genera los grupos de trabajo para la etapa de descarga.
+        
+        En modo SPA cada grupo contiene las rutas de un documento; en otro
+        caso cada grupo es una sola URL. Con entrada en streaming solo se
+        agrupan las rutas consecutivas del mismo documento, para no tener
+        que leer toda la entrada antes de empezar.
+        
+        Las URLs ya completadas se omiten al reanudar, conservando sus
+        índices originales para que los nombres de archivo no cambien.
         
         Args:
-            default: Configuración por defecto (se modifica in-place)
-            user: Configuración del usuario
+            urls: URLs válidas a procesar (lista o generador)
+            
+        Yields:
+            Listas de tuplas (índice, url)
         """
-        for key, value in user.items():
-            if key in default and isinstance(default[key], dict) and isinstance(value, dict):
-                self._deep_merge_config(default[key], value)
-            else:
-                default[key] = value
+        if self.config['options'].get('spa_hash_routes', False) and self._streaming_input():
+            grupos = (
+                list(grupo) for _, grupo in
+                groupby(enumerate(urls, 1), key=lambda item: split_document_url(item[1])[0])
+            )
+        elif self.config['options'].get('spa_hash_routes', False):
+            grupos = self._group_by_document(list(urls))
+        else:
+            grupos = ([(i, url)] for i, url in enumerate(urls, 1))
+        
+        for grupo in grupos:
+            grupo = [(i, url) for i, url in grupo if not self._already_completed(url)]
+            if grupo:
+                yield grupo
     
-    def _setup_logging(self) -> logging.Logger:
+    async def _run_pipeline(self, grupos: Union[Iterable[List[Tuple[int, str]]],
+                                               AsyncIterator[List[Tuple[int, str]]]]) -> None:
         """
-        Configura el sistema de logging profesional.
+        Procesa los grupos de URLs en un pipeline de tres etapas.
         
-        Returns:
-            Logger configurado para el scraper
-        """
-        log_config = self.config.get('logging', {})
+        Descarga, conversión y escritura se conectan con colas acotadas y
+        cada etapa tiene su propio número de workers, de modo que la etapa
+        más lenta marca el ritmo sin dejar ociosas a las demás y la memoria
+        queda limitada por el tamaño de las colas.
         
-        # Crear directorio de logs
-        log_dir = Path(log_config.get('log_dir', 'logs'))
-        log_dir.mkdir(exist_ok=True)
+        Args:
+            grupos: Grupos de tuplas (índice, url) a descargar, síncronos
+                (se leen en un hilo) o asíncronos
+        """
+        ajustes = self._pipeline_settings()
+        cola_descarga = self._create_host_scheduler()
+        cola_conversion: asyncio.Queue = asyncio.Queue(maxsize=ajustes['queue_size'])
+        cola_escritura: asyncio.Queue = asyncio.Queue(maxsize=ajustes['queue_size'])
+        self._pipeline_queues = {
+            'descarga': cola_descarga,
+            'conversion': cola_conversion,
+            'escritura': cola_escritura,
+        }
+        executor = self._get_conversion_executor()
         
-        # Configurar nivel de logging
-        log_level = getattr(logging, log_config.get('level', 'INFO').upper())
+        async def descargar(grupo: List[TrabajoURL]) -> None:
+            host = host_key(grupo[0].url)
+            reintentos: List[TrabajoURL] = []
+            espera_reintento = 0.0
+            ahora = time.perf_counter()
+            for trabajo in grupo:
+                self._record_stage(trabajo.url, 'cola_descarga', max(0.0, ahora - trabajo.encolado))
+            try:
+                for trabajo in grupo:
+                    self.logger.info(f"📄 Procesando [{trabajo.index}]: {trabajo.url}")
+                    trabajo.html, categoria = await self._fetch_attempt(
+                        trabajo.url, use_cache=trabajo.intentos == 0
+                    )
+                    if not trabajo.html:
+                        if self._should_retry(categoria, trabajo.intentos):
+                            # El reintento vuelve al planificador en lugar de ocupar este worker
+                            espera = self._schedule_retry(trabajo.url, categoria, trabajo.intentos)
+                            espera_reintento = max(espera_reintento, espera)
+                            trabajo.intentos += 1
+                            reintentos.append(trabajo)
+                        else:
+                            self._record_result(trabajo.url, False, categoria)
+                        continue
+                    self._journal(trabajo.url, 'descargado')
+                    trabajo.html_hash = content_hash(trabajo.html)
+                    filename = self._generate_smart_filename(trabajo.url, trabajo.index)
+                    if self._output_unchanged(trabajo.url, trabajo.html_hash, filename):
+                        self._record_result(trabajo.url, True)
+                        continue
+                    trabajo.encolado = time.perf_counter()
+                    await cola_conversion.put(trabajo)
+                if reintentos:
+                    # La espera del backoff no cuenta como espera en cola
+                    for trabajo in reintentos:
+                        trabajo.encolado = time.perf_counter() + espera_reintento
+                    await cola_descarga.put_later(reintentos, host, espera_reintento)
+            finally:
+                # El planificador reservó el host del grupo al entregarlo
+                await cola_descarga.release(host)
         
-        # Configurar handlers
-        handlers = []
+        async def convertir(trabajo: TrabajoURL) -> None:
+            inicio = time.perf_counter()
+            self._record_stage(trabajo.url, 'cola_conversion', inicio - trabajo.encolado)
+            if executor is None:
+                trabajo.markdown = self._convert_to_markdown(trabajo.html)
+            else:
+                trabajo.markdown = await self._convert_in_executor(executor, trabajo.html)
+            self._record_converted(trabajo.url, trabajo.markdown, inicio)
+            trabajo.html = None  # Liberar el HTML en cuanto deja de necesitarse
+            if not trabajo.markdown:
+                self.logger.error(f"❌ Fallo en conversión a Markdown para: {trabajo.url}")
+                self._record_result(trabajo.url, False, 'conversion')
+                return
+            self._journal(trabajo.url, 'convertido')
+            trabajo.encolado = time.perf_counter()
+            await cola_escritura.put(trabajo)
         
-        if log_config.get('console', True):
-            console_handler = logging.StreamHandler()
-            console_handler.setFormatter(
-                logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        async def escribir(trabajo: TrabajoURL) -> None:
+            inicio = time.perf_counter()
+            self._record_stage(trabajo.url, 'cola_escritura', inicio - trabajo.encolado)
+            filename = self._generate_smart_filename(trabajo.url, trabajo.index)
+            success = await self._save_markdown_file_async(
+                trabajo.markdown, filename, trabajo.url, trabajo.html_hash
             )
-            handlers.append(console_handler)
+            self._record_stage(trabajo.url, 'escritura', time.perf_counter() - inicio)
+            self._record_result(trabajo.url, success, None if success else 'escritura')
         
-        if log_config.get('file', True):
-            log_filename = f"scraper_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-            log_path = log_dir / log_filename
-            file_handler = logging.FileHandler(log_path, encoding='utf-8')
-            file_handler.setFormatter(
-                logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s')
+        async def worker(cola: asyncio.Queue, procesar: Callable) -> None:
+            while True:
+                elemento = await cola.get()
+                if elemento is None:
+                    return
+                try:
+                    await procesar(elemento)
+                except Exception as e:
+                    self.logger.error(f"❌ Error en etapa del pipeline: {type(e).__name__}: {e}")
+        
+        async def etapa(cola: asyncio.Queue, procesar: Callable, workers: int,
+                        siguiente: Optional[asyncio.Queue], workers_siguiente: int) -> None:
+            await asyncio.gather(*(worker(cola, procesar) for _ in range(workers)))
+            # Al terminar la etapa se avisa a cada worker de la siguiente
+            if siguiente is not None:
+                for _ in range(workers_siguiente):
+                    await siguiente.put(None)
+        
+        async def productor() -> None:
+            # La entrada se lee en un hilo: stdin o un archivo grande no bloquean el loop
+            fuente = grupos if hasattr(grupos, '__aiter__') else iterar_en_hilo(grupos)
+            async for grupo in fuente:
+                trabajos = [TrabajoURL(index, url, encolado=time.perf_counter()) for index, url in grupo]
+                for trabajo in trabajos:
+                    self._journal(trabajo.url, 'pendiente', trabajo.index)
+                    self._url_metrics(trabajo.url)
+                await cola_descarga.put(trabajos, host_key(trabajos[0].url))
+            await cola_descarga.close()
+        
+        monitor = asyncio.create_task(self._monitor_pipeline())
+        try:
+            await asyncio.gather(
+                productor(),
+                etapa(cola_descarga, descargar, ajustes['fetch_workers'],
+                      cola_conversion, ajustes['convert_workers']),
+                etapa(cola_conversion, convertir, ajustes['convert_workers'],
+                      cola_escritura, ajustes['write_workers']),
+                etapa(cola_escritura, escribir, ajustes['write_workers'], None, 0),
             )
-            handlers.append(file_handler)
+        finally:
+            monitor.cancel()
+            self._pipeline_queues = {}
+    
+    async def _monitor_pipeline(self) -> None:
+        """Muestrea periódicamente las colas y registra su profundidad."""
+        intervalo_reporte = self.config['options'].get('pipeline', {}).get('report_interval_s', 5)
+        ultimo_reporte = time.monotonic()
         
-        # Configurar logger
-        logger = logging.getLogger('HTMLScraper')
-        logger.setLevel(log_level)
+        while True:
+            await asyncio.sleep(0.25)
+            metricas = self.pipeline_metrics()
+            for nombre, profundidad in metricas.items():
+                maximo = self.stats.profundidad_max_colas.get(nombre, 0)
+                self.stats.profundidad_max_colas[nombre] = max(maximo, profundidad)
+            
+            if intervalo_reporte and time.monotonic() - ultimo_reporte >= intervalo_reporte:
+                ultimo_reporte = time.monotonic()
+                colas = ", ".join(f"{nombre}: {valor}" for nombre, valor in metricas.items())
+                self.logger.info(f"📦 Colas del pipeline — {colas}")
+    
+    async def run_sequential(self) -> None:
+        """Ejecuta procesamiento secuencial (recomendado para archivos locales)."""
+        self.logger.info("🚀 Iniciando procesamiento secuencial")
         
-        # Remover handlers existentes para evitar duplicados
-        for handler in logger.handlers[:]:
-            logger.removeHandler(handler)
+        # Validar configuración
+        if not self._validate_config():
+            self.logger.error("❌ Configuración inválida. Abortando procesamiento.")
+            return
         
-        for handler in handlers:
-            logger.addHandler(handler)
+        # Las URLs se leen y validan a medida que se procesan
+        valid_urls = self._iter_valid_urls()
         
-        return logger
+        self.logger.info("📊 Iniciando procesamiento de las URLs de entrada")
+        self.stats.inicio = time.time()
+        
+        self._open_journal()
+        self._start_metrics_server()
+        
+        # En modo SPA las rutas de un mismo documento se procesan juntas
+        items = (item for grupo in self._iter_work_groups(valid_urls) for item in grupo)
+        
+        # Cortesía por host: token bucket por host y sin pausas para archivos locales
+        planificador = self._create_host_scheduler()
+        volcado_diario = asyncio.create_task(self._flush_journal_periodically())
+        
+        try:
+            url_anterior = None
+            async for i, url in iterar_en_hilo(items):
+                self._journal(url, 'pendiente', i)
+                self._url_metrics(url)
+                # Las rutas SPA del documento ya cargado no generan peticiones
+                if url_anterior is not None and not self._requires_page_load(url_anterior, url):
+                    await self._process_single_url(url, i)
+                else:
+                    host = host_key(url)
+                    inicio = time.perf_counter()
+                    await planificador.adquirir(host)
+                    self._record_stage(url, 'cola_descarga', time.perf_counter() - inicio)
+                    try:
+                        await self._process_single_url(url, i)
+                    finally:
+                        await planificador.release(host)
+                url_anterior = url
+        
+        except KeyboardInterrupt:
+            self.logger.warning("⏹️ Procesamiento interrumpido por el usuario")
+        except Exception as e:
+            self.logger.error(f"❌ Error fatal durante procesamiento: {e}")
+        finally:
+            volcado_diario.cancel()
+            await self._close_browser()
+            await self._shutdown_conversion_executor()
+            self._save_manifest()
+            self._close_journal()
+            self._close_metrics_stream()
+            self._stop_metrics_server()
+            self.stats.fin = time.time()
+            self._print_final_stats()
     
-    def _validate_config(self) -> bool:
+    async def run_parallel(self, max_concurrent: Optional[int] = None) -> None:
         """
-        Valida la configuración antes de procesar.
+        Ejecuta procesamiento paralelo (recomendado para URLs remotas).
         
-        Returns:
-            True si la configuración es válida, False en caso contrario
+        Usa un pipeline de descarga, conversión y escritura con colas
+        acotadas configurado en `options.pipeline`.
+        
+        Args:
+            max_concurrent: Número máximo de tareas concurrentes
         """
-        errores = []
+        self.logger.info("🚀 Iniciando procesamiento paralelo")
         
-        # Validar URLs
-        if not self.config.get('urls'):
-            errores.append("No se han especificado URLs para procesar")
-        elif not isinstance(self.config['urls'], list):
-            errores.append("Las URLs deben estar en formato de lista")
+        # Validar configuración
+        if not self._validate_config():
+            self.logger.error("❌ Configuración inválida. Abortando procesamiento.")
+            return
         
-        # Validar directorio de salida
-        if not self.config.get('output_dir'):
-            errores.append("No se ha especificado directorio de salida")
+        # Las URLs se leen y validan a medida que se procesan
+        valid_urls = self._iter_valid_urls()
         
-        # Validar URLs de archivos locales
-        urls_invalidas = []
-        for url in self.config.get('urls', []):
-            if url.startswith('file://'):
-                # Limpiar la URL para obtener la ruta del archivo
-                file_path = url.replace('file:///', '').split('#')[0]
-                # Decodificar caracteres especiales en la URL
-                file_path = file_path.replace('%20', ' ').replace('%C3%B3', 'ó')
-                
-                if not Path(file_path).exists():
-                    urls_invalidas.append(f"Archivo no encontrado: {file_path}")
+        # Configurar concurrencia (el pool de páginas y el pipeline la comparten)
+        if max_concurrent is None:
+            max_concurrent = self.config['options'].get('max_concurrent', 3)
+        else:
+            self.config['options']['max_concurrent'] = max_concurrent
         
-        if urls_invalidas:
-            errores.extend(urls_invalidas)
+        ajustes = self._pipeline_settings()
+        self.logger.info(
+            f"📊 Iniciando procesamiento paralelo de las URLs de entrada "
+            f"(descarga: {ajustes['fetch_workers']}, conversión: {ajustes['convert_workers']}, "
+            f"escritura: {ajustes['write_workers']} workers)"
+        )
+        self.stats.inicio = time.time()
+        self._open_journal()
+        self._start_metrics_server()
+        volcado_diario = asyncio.create_task(self._flush_journal_periodically())
         
-        # Validar permisos de escritura
         try:
-            output_path = Path(self.config['output_dir'])
-            output_path.mkdir(parents=True, exist_ok=True)
-            test_file = output_path / ".test_write_permission"
-            test_file.write_text("test")
-            test_file.unlink()
+            # Las rutas de un documento SPA viajan juntas y se navegan en orden
+            await self._run_pipeline(self._iter_work_groups(valid_urls))
+                
+        except KeyboardInterrupt:
+            self.logger.warning("⏹️ Procesamiento interrumpido por el usuario")
         except Exception as e:
-            errores.append(f"Sin permisos de escritura en: {self.config['output_dir']} ({e})")
+            self.logger.error(f"❌ Error fatal durante procesamiento paralelo: {e}")
+        finally:
+            volcado_diario.cancel()
+            await self._close_browser()
+            await self._shutdown_conversion_executor()
+            self._save_manifest()
+            self._close_journal()
+            self._close_metrics_stream()
+            self._stop_metrics_server()
+            self.stats.fin = time.time()
+            self._print_final_stats()
+    
+    def _shard_config(self, indice: int, total: int, parallel: bool) -> Dict:
+        """
+        Prepara la configuración de un proceso de `run_sharded`.
         
-        # Mostrar errores si los hay
-        if errores:
-            self.logger.error("❌ Errores de configuración encontrados:")
-            for error in errores:
-                self.logger.error(f"   • {error}")
-            return False
+        Las URLs llegan del coordinador, el pool de conversión se reparte
+        entre los procesos y cada uno expone sus métricas en su propio
+        puerto (`prometheus_port` + índice).
         
-        self.logger.info("✅ Configuración validada correctamente")
-        return True
+        Args:
+            indice: Índice del proceso
+            total: Número de procesos
+            parallel: Si cada proceso usa el pipeline paralelo completo
+            
+        Returns:
+            Copia de la configuración para ese proceso
+        """
+        config = copy.deepcopy(self.config)
+        config['urls'] = []
+        config['urls_file'] = None
+        opciones = config['options']
+        if not parallel:
+            # Secuencial dentro de cada proceso: una descarga y una conversión a la vez
+            opciones['max_concurrent'] = 1
+            opciones['pipeline']['fetch_workers'] = 1
+            opciones['pipeline']['convert_workers'] = 1
+        if not opciones['conversion_executor'].get('workers'):
+            opciones['conversion_executor']['workers'] = max(1, (os.cpu_count() or 1) // total)
+        puerto = opciones['metrics'].get('prometheus_port')
+        if puerto:
+            opciones['metrics']['prometheus_port'] = int(puerto) + indice
+        return config
     
-    def _validate_urls(self) -> List[str]:
+    def _deal_work_groups(self, grupos: Iterable[List[Tuple[int, str]]], colas: List,
+                          procesos: List, por_host: bool, loop: asyncio.AbstractEventLoop) -> List[int]:
         """
-        Valida y filtra las URLs que sean accesibles.
+        Reparte los grupos de trabajo entre las colas de los procesos.
+        
+        Se ejecuta en un hilo: las colas están acotadas, así que la entrada
+        se lee al ritmo al que los procesos la consumen. Si un proceso muere,
+        sus URLs pendientes se registran como fallidas en lugar de bloquear
+        el reparto; el registro se hace en el event loop, que es el único
+        que modifica `stats`.
         
+        Args:
+            grupos: Grupos de tuplas (índice, url) a repartir
+            colas: Cola de entrada de cada proceso
+            procesos: Procesos de fragmento, en el mismo orden que las colas
+            por_host: Repartir por host (ver `indice_fragmento`)
+            loop: Event loop del coordinador
+            
         Returns:
-            Lista de URLs válidas
+            Número de URLs entregadas a cada proceso
         """
-        valid_urls = []
+        def entregar(destino: int, elemento) -> bool:
+            while True:
+                try:
+                    colas[destino].put(elemento, timeout=1)
+                    return True
+                except queue.Full:
+                    if not procesos[destino].is_alive():
+                        return False
         
-        for url in self.config['urls']:
-            try:
-                if url.startswith('file://'):
-                    # Para archivos locales, verificar que existan
-                    file_path = url.replace('file:///', '').split('#')[0]
-                    file_path = file_path.replace('%20', ' ').replace('%C3%B3', 'ó')
-                    
-                    if Path(file_path).exists():
-                        valid_urls.append(url)
-                        self.logger.debug(f"✅ URL válida: {url}")
-                    else:
-                        self.logger.warning(f"⚠️ Archivo no encontrado: {file_path}")
-                else:
-                    # Para URLs remotas, asumir válidas (se verificarán al acceder)
-                    valid_urls.append(url)
-                    self.logger.debug(f"✅ URL remota: {url}")
-            except Exception as e:
-                self.logger.error(f"❌ Error validando URL {url}: {e}")
+        repartidas = [0] * len(colas)
+        for grupo in grupos:
+            destino = indice_fragmento(grupo[0][1], len(colas), por_host)
+            if entregar(destino, grupo):
+                repartidas[destino] += len(grupo)
+            else:
+                for _, url in grupo:
+                    loop.call_soon_threadsafe(self._record_result, url, False, 'proceso')
         
-        self.logger.info(f"📊 URLs válidas encontradas: {len(valid_urls)}/{len(self.config['urls'])}")
-        return valid_urls
-    
-    async def _init_browser(self) -> None:
-        """Inicializa el navegador una sola vez para reutilización."""
-        if self.browser is None:
-            self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=self.config['options']['headless']
-            )
-            self.logger.info("🌐 Navegador inicializado")
-    
-    async def _close_browser(self) -> None:
-        """Cierra el navegador y limpia recursos."""
-        if self.browser:
-            await self.browser.close()
-            await self.playwright.stop()
-            self.browser = None
-            self.logger.info("🔒 Navegador cerrado")
+        for destino in range(len(colas)):
+            entregar(destino, None)
+        return repartidas
     
-    async def _extract_content_safe(self, url: str, retry_count: int = 0) -> Optional[str]:
+    def _collect_shard_stats(self, resultados, procesos: List) -> List[EstadisticasProcesamiento]:
         """
-        Extrae contenido HTML de forma segura con manejo de errores y reintentos.
+        Espera las estadísticas de todos los procesos de fragmento.
         
         Args:
-            url: URL a procesar
-            retry_count: Número de intento actual
+            resultados: Cola donde cada proceso deja (índice, estadísticas)
+            procesos: Procesos de fragmento
             
         Returns:
-            Contenido HTML extraído o None si falla
+            Estadísticas de los procesos que terminaron correctamente
         """
-        context = None
-        page = None
-        max_retries = self.config['options'].get('retry_attempts', 2)
+        pendientes = set(range(len(procesos)))
+        recogidas = []
+        while pendientes:
+            muertos = {i for i in pendientes if not procesos[i].is_alive()}
+            try:
+                indice, estadisticas = resultados.get(timeout=1)
+            except queue.Empty:
+                # Un proceso que ya había terminado y no dejó nada en un segundo no lo hará
+                for i in muertos:
+                    self.logger.error(
+                        f"❌ El proceso {i + 1} terminó sin estadísticas (código {procesos[i].exitcode}); "
+                        f"sus URLs pendientes pueden reintentarse con --resume"
+                    )
+                pendientes -= muertos
+                continue
+            pendientes.discard(indice)
+            if estadisticas is not None:
+                recogidas.append(estadisticas)
+        return recogidas
+    
+    def _merge_shard_manifests(self, total: int) -> None:
+        """Une al manifiesto de salida las entradas guardadas por cada proceso."""
+        manifiesto = self._get_manifest()
+        if manifiesto is None:
+            return
+        output_dir = Path(self.config['output_dir'])
+        for indice in range(total):
+            manifiesto.incorporar(ManifiestoSalida.ruta_fragmento(output_dir, indice))
+        self._save_manifest()
+    
+    async def run_shard(self, grupos: Iterable[List[Tuple[int, str]]]) -> None:
+        """
+        Procesa los grupos que el coordinador de `run_sharded` entrega a este proceso.
+        
+        Usa el mismo pipeline que `run_parallel`, con su propio navegador; las
+        estadísticas no se imprimen aquí sino que se devuelven al coordinador.
+        
+        Args:
+            grupos: Grupos de tuplas (índice, url) con los índices globales
+        """
+        indice, total = self.shard
+        self.logger.info(f"🧩 Proceso {indice + 1}/{total} iniciado (PID {os.getpid()})")
+        self.stats.inicio = time.time()
+        self._open_journal()
+        self._start_metrics_server()
+        volcado_diario = asyncio.create_task(self._flush_journal_periodically())
         
         try:
-            await self._init_browser()
-            
-            context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            await self._run_pipeline(grupos)
+        except Exception as e:
+            self.logger.error(f"❌ Error fatal en el proceso {indice + 1}/{total}: {e}")
+        finally:
+            volcado_diario.cancel()
+            await self._close_browser()
+            await self._shutdown_conversion_executor()
+            self._save_manifest()
+            self._close_journal()
+            self._close_metrics_stream()
+            self._stop_metrics_server()
+            self.stats.fin = time.time()
+    
+    async def run_sharded(self, procesos: Optional[int] = None, parallel: bool = False) -> None:
+        """
+        Reparte las URLs entre varios procesos, cada uno con su propio navegador.
+        
+        El coordinador lee y valida la entrada, asigna los índices globales
+        (los nombres de archivo no dependen del número de procesos) y reparte
+        los grupos de trabajo por host o por documento (`options.sharding.key`).
+        Cada proceso ejecuta su propio Chromium y pipeline; al terminar, el
+        coordinador une sus estadísticas y sus entradas del manifiesto.
+        
+        Args:
+            procesos: Número de procesos (0 o None: uno por núcleo)
+            parallel: Si cada proceso usa el pipeline paralelo o procesa de una en una
+        """
+        sharding = self.config['options'].get('sharding', {})
+        if procesos is None:
+            procesos = sharding.get('processes')
+        procesos = procesos or os.cpu_count() or 1
+        self.config['options']['sharding']['processes'] = procesos
+        self.logger.info(f"🚀 Iniciando procesamiento en {procesos} procesos")
+        
+        # Validar configuración
+        if not self._validate_config():
+            self.logger.error("❌ Configuración inválida. Abortando procesamiento.")
+            return
+        
+        valid_urls = self._iter_valid_urls()
+        por_host = sharding.get('key', 'host') != 'document'
+        self.stats.inicio = time.time()
+        self.stats.procesos = procesos
+        self._open_journal()
+        
+        # spawn: cada proceso arranca limpio, sin heredar el estado de Playwright ni del loop
+        contexto = multiprocessing.get_context('spawn')
+        colas = [contexto.Queue(maxsize=sharding.get('queue_size') or 64) for _ in range(procesos)]
+        resultados = contexto.Queue()
+        workers = [
+            contexto.Process(
+                target=_ejecutar_fragmento,
+                args=(self._shard_config(i, procesos, parallel), i, procesos, colas[i], resultados),
+                name=f"fragmento-{i + 1}",
             )
-            page = await context.new_page()
-            
-            self.logger.info(f"🌐 Accediendo a: {url}")
-            
-            # Configurar timeouts
-            timeout = self.config['options'].get('timeout', 30000)
-            wait_until = self.config['options'].get('wait_until', 'networkidle')
-            
-            await page.goto(url, wait_until=wait_until, timeout=timeout)
-            
-            # Esperar un poco más para contenido dinámico
-            await page.wait_for_timeout(2000)
-            
-            content = await page.content()
+            for i in range(procesos)
+        ]
+        
+        try:
+            for worker in workers:
+                worker.start()
+            # Con --resume el coordinador omite las URLs completadas antes de repartir
+            repartidas = await asyncio.to_thread(
+                self._deal_work_groups, self._iter_work_groups(valid_urls), colas, workers, por_host,
+                asyncio.get_running_loop(),
+            )
+            reparto = ", ".join(f"{i + 1}: {total}" for i, total in enumerate(repartidas))
+            self.logger.info(f"🧩 URLs repartidas por proceso — {reparto}")
             
-            if content and len(content) > 100:  # Verificar que el contenido no esté vacío
-                self.logger.info(f"✅ Contenido extraído: {len(content):,} caracteres")
-                return content
-            else:
-                self.logger.warning(f"⚠️ Contenido sospechosamente corto: {len(content) if content else 0} caracteres")
-                return None
-                
+            for estadisticas in await asyncio.to_thread(self._collect_shard_stats, resultados, workers):
+                self.stats.combinar(estadisticas)
+        
+        except KeyboardInterrupt:
+            self.logger.warning("⏹️ Procesamiento interrumpido por el usuario")
         except Exception as e:
-            self.logger.error(f"❌ Error extrayendo contenido de {url}: {type(e).__name__}: {e}")
-            
-            # Reintentar si no se ha alcanzado el máximo
-            if retry_count < max_retries:
-                self.logger.info(f"🔄 Reintentando ({retry_count + 1}/{max_retries})...")
-                await asyncio.sleep(2)  # Esperar antes de reintentar
-                return await self._extract_content_safe(url, retry_count + 1)
-            
-            return None
-            
+            self.logger.error(f"❌ Error fatal durante procesamiento en varios procesos: {e}")
         finally:
-            if page:
-                await page.close()
-            if context:
-                await context.close()
+            for worker, cola in zip(workers, colas):
+                if worker.is_alive():
+                    await asyncio.to_thread(worker.join, 30)
+                if worker.is_alive():
+                    worker.terminate()
+                # Lo que quede en la cola de un proceso caído no debe bloquear la salida
+                cola.cancel_join_thread()
+            self._merge_shard_manifests(procesos)
+            self._close_journal()
+            self.stats.fin = time.time()
+            self._print_final_stats()
     
-    def _generate_smart_filename(self, url: str, index: int) -> str:
+    def _open_work_queue(self) -> Optional[ColaTrabajos]:
+        """
+        Abre (una sola vez) la cola de trabajos de `options.queue.url`.
+        
+        Returns:
+            Cola abierta, o None si no está configurada o no se pudo abrir
+        """
+        if self.work_queue is not None:
+            return self.work_queue
+        config_cola = self.config['options'].get('queue', {})
+        destino = config_cola.get('url')
+        if not destino:
+            self.logger.error("❌ No se ha configurado una cola de trabajos (--queue u options.queue.url)")
+            return None
+        try:
+            self.work_queue = abrir_cola_trabajos(destino, config_cola)
+        except Exception as e:
+            self.logger.error(f"❌ No se pudo abrir la cola de trabajos {destino}: {e}")
+            return None
+        return self.work_queue
+    
+    def _close_work_queue(self) -> None:
+        """Cierra la cola de trabajos, si está abierta."""
+        if self.work_queue is not None:
+            self.work_queue.cerrar()
+            self.work_queue = None
+    
+    def _worker_id(self) -> str:
+        """Identificador de este worker en la cola (`options.queue.worker_id` o host-PID)."""
+        return self.config['options'].get('queue', {}).get('worker_id') or f"{socket.gethostname()}-{os.getpid()}"
+    
+    async def enqueue_urls(self) -> int:
+        """
+        Añade las URLs de entrada a la cola de trabajos compartida.
+        
+        Returns:
+            Número de URLs nuevas en la cola
+        """
+        if not self._validate_config():
+            self.logger.error("❌ Configuración inválida. Abortando procesamiento.")
+            return 0
+        cola = self._open_work_queue()
+        if cola is None:
+            return 0
+        nuevas = await asyncio.to_thread(cola.encolar, self._iter_valid_urls())
+        estados = ", ".join(f"{estado}: {total}" for estado, total in cola.resumen().items())
+        self.logger.info(f"📬 {nuevas} URLs nuevas en la cola ({estados})")
+        return nuevas
+    
+    async def _iter_leased_groups(self, cola: ColaTrabajos, trabajador: str) -> AsyncIterator[List[Tuple[int, str]]]:
         """
-        Genera nombres de archivo inteligentes basados en el contenido de la URL.
+        Genera grupos de trabajo arrendados a la cola compartida.
+        
+        Solo se arrienda más cuando las URLs en curso bajan de dos lotes,
+        para no acaparar trabajo que otros workers podrían estar haciendo
+        (la espera termina al registrarse un resultado, sin sondeos). Con la
+        cola vacía se vuelve a consultar con backoff exponencial y jitter,
+        de `poll_interval_s` hasta `max_poll_interval_s`. Termina cuando la
+        cola no tiene URLs pendientes ni arrendadas (con `exit_when_empty`);
+        mientras otro worker tenga arriendos, se sigue esperando por si vencen.
         
         Args:
-            url: URL a procesar
-            index: Índice secuencial
+            cola: Cola de trabajos
+            trabajador: Identificador de este worker
             
-        Returns:
-            Nombre de archivo generado
+        Yields:
+            Listas de tuplas (índice, url); las rutas SPA consecutivas de un documento van juntas
         """
-        pattern = self.config['markdown']['naming_pattern']
-        extension = self.config['markdown']['file_extension']
-        smart_naming = self.config['markdown'].get('smart_naming', True)
+        config_cola = self.config['options'].get('queue', {})
+        lote = config_cola.get('lease_size') or self._pipeline_settings()['fetch_workers']
+        visibilidad = config_cola.get('visibility_timeout_s', 300)
+        max_intentos = config_cola.get('max_attempts', 3)
+        espera_minima = config_cola.get('poll_interval_s', 2)
+        espera_maxima = max(espera_minima, config_cola.get('max_poll_interval_s', 30))
+        consultas_vacias = 0
+        self._lease_released = asyncio.Event()
         
-        if smart_naming and '#' in url:
-            # Extraer el fragmento de la URL
-            fragment = url.split('#')[-1]
-            # Limpiar caracteres especiales
-            fragment = fragment.replace('/', '_').replace('\\', '_')
-            fragment = ''.join(c for c in fragment if c.isalnum() or c in '_-')
-            filename = f"{fragment}_{index:02d}"
-        else:
-            filename = pattern.format(index=index)
+        while True:
+            while len(self._leased_urls) >= lote * 2:
+                self._lease_released.clear()
+                await self._lease_released.wait()
+            arrendadas = await asyncio.to_thread(cola.arrendar, trabajador, lote, visibilidad, max_intentos)
+            if not arrendadas:
+                if not self._leased_urls and config_cola.get('exit_when_empty', True):
+                    await self._flush_work_queue()
+                    if not await asyncio.to_thread(cola.abierta):
+                        return
+                espera = min(espera_maxima, espera_minima * 2 ** consultas_vacias)
+                consultas_vacias = min(consultas_vacias + 1, 32)
+                # Jitter: los workers que encontraron la cola vacía a la vez no vuelven a la vez
+                await asyncio.sleep(espera / 2 + random.uniform(0, espera / 2))
+                continue
+            consultas_vacias = 0
+            with self._stats_lock:
+                self._leased_urls.update(url for _, url in arrendadas)
+            for _, grupo in groupby(arrendadas, key=lambda item: split_document_url(item[1])[0]):
+                yield list(grupo)
+    
+    async def _flush_work_queue(self) -> None:
+        """Confirma en la cola los resultados acumulados desde el último volcado."""
+        if self.work_queue is None:
+            return
+        with self._stats_lock:
+            resultados, self._queue_results = self._queue_results, []
+        if not resultados:
+            return
+        try:
+            await asyncio.to_thread(self.work_queue.confirmar, self._worker_id(), resultados)
+        except Exception as e:
+            self.logger.error(f"❌ Error confirmando resultados en la cola: {e}")
+            with self._stats_lock:
+                self._queue_results[:0] = resultados
+    
+    async def _publish_worker_stats(self) -> None:
+        """Publica en la cola una instantánea de las estadísticas de este worker."""
+        self.stats.fin = time.time()
+        estadisticas = self.stats.exportar(por_url=False)
+        try:
+            await asyncio.to_thread(self.work_queue.publicar, self._worker_id(), estadisticas)
+        except Exception as e:
+            self.logger.error(f"❌ Error publicando estadísticas en la cola: {e}")
+    
+    async def _sync_work_queue_periodically(self) -> None:
+        """Confirma resultados, renueva arriendos y publica el progreso en segundo plano."""
+        config_cola = self.config['options'].get('queue', {})
+        visibilidad = config_cola.get('visibility_timeout_s', 300)
+        intervalo_reporte = config_cola.get('report_interval_s', 10)
+        ultima_renovacion = ultimo_reporte = time.monotonic()
         
-        return f"{filename}{extension}"
+        while True:
+            await asyncio.sleep(1)
+            await self._flush_work_queue()
+            ahora = time.monotonic()
+            if ahora - ultima_renovacion >= visibilidad / 3:
+                ultima_renovacion = ahora
+                try:
+                    await asyncio.to_thread(self.work_queue.renovar, self._worker_id(), visibilidad)
+                except Exception as e:
+                    self.logger.error(f"❌ Error renovando arriendos en la cola: {e}")
+            if intervalo_reporte and ahora - ultimo_reporte >= intervalo_reporte:
+                ultimo_reporte = ahora
+                await self._publish_worker_stats()
     
-    def _convert_to_markdown(self, html_content: str) -> str:
+    def aggregated_queue_stats(self) -> Optional[EstadisticasProcesamiento]:
         """
-        Convierte HTML a Markdown con opciones configurables.
+        Suma las estadísticas publicadas por todos los workers de la cola.
         
-        Args:
-            html_content: Contenido HTML a convertir
-            
         Returns:
-            Contenido convertido a Markdown
+            Estadísticas agregadas (`procesos` = número de workers), o None sin cola
         """
-        if not html_content:
-            return ""
+        cola = self._open_work_queue()
+        if cola is None:
+            return None
+        total = EstadisticasProcesamiento()
+        nodos = [EstadisticasProcesamiento.importar(datos) for datos in cola.estadisticas()]
+        for nodo in nodos:
+            total.combinar(nodo)
+        if nodos:
+            total.inicio = min(nodo.inicio for nodo in nodos)
+            total.fin = max(nodo.fin for nodo in nodos)
+        total.procesos = max(1, len(nodos))
+        return total
+    
+    async def print_queue_status(self) -> None:
+        """Muestra el estado de la cola y guarda las estadísticas agregadas de todos los workers."""
+        estadisticas = await asyncio.to_thread(self.aggregated_queue_stats)
+        if estadisticas is None:
+            return
+        estados = ", ".join(f"{estado}: {total}" for estado, total in self.work_queue.resumen().items())
+        self.logger.info(f"📬 Cola de trabajos — {estados or 'vacía'}")
+        self._close_work_queue()
+        self.stats = estadisticas
+        self._print_final_stats()
+    
+    async def run_worker(self, parallel: bool = False) -> None:
+        """
+        Procesa URLs tomadas de la cola de trabajos compartida (`--worker`).
+        
+        Se pueden lanzar tantos workers como se quiera, en una o varias
+        máquinas, contra la misma cola. Cada URL arrendada se confirma al
+        terminar; si el worker cae, su arriendo vence y otro worker la
+        retoma. El progreso y las estadísticas de cada worker se publican
+        en la cola (`--queue-status` las agrega).
+        
+        Args:
+            parallel: Usar el pipeline paralelo completo o una URL a la vez
+        """
+        trabajador = self._worker_id()
+        self.logger.info(f"🚀 Iniciando worker {trabajador} sobre la cola de trabajos")
+        
+        if not self._validate_config(requiere_urls=False):
+            self.logger.error("❌ Configuración inválida. Abortando procesamiento.")
+            return
+        cola = self._open_work_queue()
+        if cola is None:
+            return
+        
+        if not parallel:
+            self.config['options']['max_concurrent'] = 1
+            self.config['options']['pipeline']['fetch_workers'] = 1
+            self.config['options']['pipeline']['convert_workers'] = 1
+        # La cola ya registra el estado de cada URL: el diario local sobra
+        self.config['options']['journal']['enabled'] = False
+        
+        self.stats.inicio = time.time()
+        self._start_metrics_server()
+        sincronizacion = asyncio.create_task(self._sync_work_queue_periodically())
         
         try:
-            markdown_config = self.config['markdown']
-            
-            markdown_content = md(
-                html_content,
-                strip=markdown_config.get('strip_elements', ['script', 'style']),
-                convert=['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 
-                        'a', 'strong', 'em', 'code', 'pre', 'blockquote', 
-                        'table', 'tr', 'td', 'th', 'img'],
-                heading_style='ATX'
-            )
-            
-            # Limpiar contenido si está habilitado
-            if markdown_config.get('clean_excessive_whitespace', True):
-                markdown_content = self._clean_markdown(markdown_content)
-            
-            return markdown_content
-            
+            await self._run_pipeline(self._iter_leased_groups(cola, trabajador))
+        
+        except KeyboardInterrupt:
+            self.logger.warning("⏹️ Procesamiento interrumpido por el usuario")
         except Exception as e:
-            self.logger.error(f"❌ Error convirtiendo a Markdown: {e}")
-            return ""
+            self.logger.error(f"❌ Error fatal en el worker: {e}")
+        finally:
+            sincronizacion.cancel()
+            await self._close_browser()
+            await self._shutdown_conversion_executor()
+            self._save_manifest()
+            await self._flush_work_queue()
+            # Lo que quedó arrendado sin terminar vuelve a la cola para otros workers
+            liberadas = await asyncio.to_thread(cola.liberar, trabajador)
+            if liberadas:
+                self.logger.warning(f"↩️ {liberadas} URLs devueltas a la cola sin procesar")
+            await self._publish_worker_stats()
+            total = await asyncio.to_thread(self.aggregated_queue_stats)
+            if total is not None:
+                self.logger.info(
+                    f"🌐 Todos los workers ({total.procesos}): {total.archivos_procesados} URLs correctas, "
+                    f"{total.archivos_fallidos} fallidas"
+                )
+            self._close_work_queue()
+            self._close_metrics_stream()
+            self._stop_metrics_server()
+            self.stats.fin = time.time()
+            nombre = re.sub(r'[^\w.-]', '_', trabajador)
+            self._print_final_stats(f"estadisticas_{nombre}.json")
     
-    def _clean_markdown(self, markdown: str) -> str:
+    def _crawl_scope(self, semillas: List[str]) -> Callable[[str], bool]:
         """
-        Limpia y optimiza el contenido Markdown.
+        Construye la regla de alcance del rastreo desde `options.crawl`.
+        
+        Con `same_domain` solo se siguen los hosts de las semillas (y sus
+        subdominios) más `allowed_domains`; los archivos locales deben estar
+        bajo el directorio de alguna semilla local.
         
         Args:
-            markdown: Contenido Markdown a limpiar
+            semillas: URLs iniciales del rastreo
             
         Returns:
-            Contenido Markdown limpio
+            Función que indica si una URL normalizada está en alcance
         """
-        if not markdown:
-            return ""
-        
-        # Separar en líneas
-        lines = markdown.split('\n')
-        cleaned_lines = []
-        empty_count = 0
+        crawl = self.config['options'].get('crawl', {})
+        dominios = {host_key(url) for url in semillas if not url.startswith('file://')}
+        dominios.update(dominio.lower() for dominio in crawl.get('allowed_domains', []))
+        directorios = [
+            str(file_url_to_path(url).parent) for url in semillas if url.startswith('file://')
+        ]
+        excluir = crawl.get('exclude_patterns', [])
+        mismo_dominio = crawl.get('same_domain', True)
         
-        for line in lines:
-            line = line.rstrip()  # Quitar espacios al final
-            
-            if line.strip():
-                cleaned_lines.append(line)
-                empty_count = 0
-            else:
-                empty_count += 1
-                # Máximo 2 líneas vacías consecutivas
-                if empty_count <= 2:
-                    cleaned_lines.append('')
-        
-        # Unir líneas y limpiar el inicio y final
-        result = '\n'.join(cleaned_lines).strip()
-        
-        # Reemplazar múltiples espacios por uno solo
-        import re
-        result = re.sub(r' +', ' ', result)
+        def en_alcance(url: str) -> bool:
+            partes = urlsplit(url)
+            if partes.path.lower().endswith(EXTENSIONES_NO_HTML):
+                return False
+            if any(fnmatch.fnmatch(url, patron) for patron in excluir):
+                return False
+            if partes.scheme == 'file':
+                ruta = str(file_url_to_path(url))
+                return any(ruta.startswith(directorio.rstrip(os.sep) + os.sep) for directorio in directorios)
+            if partes.scheme not in ('http', 'https'):
+                return False
+            if not mismo_dominio:
+                return True
+            host = (partes.hostname or '').lower()
+            return any(host == dominio or host.endswith('.' + dominio) for dominio in dominios)
         
-        return result
+        return en_alcance
     
-    def _save_markdown_file(self, content: str, filename: str) -> bool:
+    def _create_frontier(self, semillas: List[str]) -> FronteraRastreo:
         """
-        Guarda contenido Markdown en archivo.
+        Crea la frontera del rastreo con la deduplicación configurada.
         
         Args:
-            content: Contenido a guardar
-            filename: Nombre del archivo
+            semillas: URLs iniciales del rastreo
             
         Returns:
-            True si se guardó exitosamente, False en caso contrario
+            Frontera configurada con `options.crawl`
         """
-        if not content or not content.strip():
-            self.logger.warning(f"⚠️ Contenido vacío para {filename}")
-            return False
+        crawl = self.config['options'].get('crawl', {})
+        if crawl.get('dedup', 'set') == 'bloom':
+            vistos = FiltroBloom(crawl.get('bloom_capacity', 1_000_000), crawl.get('bloom_error_rate', 0.001))
+        else:
+            vistos = ConjuntoHuellas()
         
-        try:
-            output_path = Path(self.config['output_dir']) / filename
-            
-            # Verificar si archivo existe
-            if output_path.exists():
-                self.logger.info(f"📝 Sobrescribiendo archivo existente: {filename}")
-            
-            # Guardar archivo
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            # Calcular métricas
-            word_count = len(content.split())
-            char_count = len(content)
-            
-            # Actualizar estadísticas
-            self.stats.total_palabras += word_count
-            self.stats.total_caracteres += char_count
-            
-            self.logger.info(f"✅ Archivo guardado: {filename} ({word_count:,} palabras, {char_count:,} caracteres)")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error guardando archivo {filename}: {e}")
-            return False
+        return FronteraRastreo(
+            vistos,
+            max_profundidad=crawl.get('max_depth', 3),
+            max_paginas=crawl.get('max_pages'),
+            en_alcance=self._crawl_scope(semillas),
+            conservar_rutas_hash=crawl.get('hash_routes', True),
+            # El diario guarda cada URL descubierta para que `--resume` retome la frontera
+            al_admitir=self._journal_discovered,
+        )
     
-    async def _process_single_url(self, url: str, index: int) -> bool:
+    async def _read_sitemap(self, url: str, nivel: int = 0) -> List[Tuple[str, float]]:
         """
-        Procesa una URL individual completamente.
+        Lee un sitemap (o índice de sitemaps) y retorna sus URLs.
         
         Args:
-            url: URL a procesar
-            index: Índice secuencial
+            url: URL del sitemap (http(s) o file://, opcionalmente comprimido con gzip)
+            nivel: Profundidad dentro de índices de sitemaps anidados
             
         Returns:
-            True si se procesó exitosamente, False en caso contrario
+            Lista de tuplas (url, prioridad); vacía si el sitemap no existe o no es válido
         """
         try:
-            self.logger.info(f"📄 Procesando [{index}]: {url}")
-            
-            # Extraer contenido HTML
-            html_content = await self._extract_content_safe(url)
-            if not html_content:
-                self.stats.archivos_fallidos += 1
-                self.stats.urls_fallidas.append(url)
-                return False
-            
-            # Convertir a Markdown
-            markdown_content = self._convert_to_markdown(html_content)
-            if not markdown_content:
-                self.logger.error(f"❌ Fallo en conversión a Markdown para: {url}")
-                self.stats.archivos_fallidos += 1
-                self.stats.urls_fallidas.append(url)
-                return False
-            
-            # Generar nombre de archivo y guardar
-            filename = self._generate_smart_filename(url, index)
-            success = self._save_markdown_file(markdown_content, filename)
-            
-            if success:
-                self.stats.archivos_procesados += 1
-                self.stats.urls_procesadas.append(url)
-                return True
+            if url.startswith('file://'):
+                datos = await asyncio.to_thread(file_url_to_path(url).read_bytes)
             else:
-                self.stats.archivos_fallidos += 1
-                self.stats.urls_fallidas.append(url)
-                return False
-                
+                client = await self._get_http_client()
+                response = await client.get(url, fail_on_status_code=False)
+                try:
+                    if response.status >= 400:
+                        self.logger.debug(f"🗺️ Sitemap no disponible ({response.status}): {url}")
+                        return []
+                    datos = await response.body()
+                finally:
+                    await response.dispose()
+            if datos[:2] == b'\x1f\x8b':
+                datos = gzip.decompress(datos)
+            raiz = ElementTree.fromstring(datos)
         except Exception as e:
-            self.logger.error(f"❌ Error procesando {url}: {e}")
-            self.stats.archivos_fallidos += 1
-            self.stats.urls_fallidas.append(url)
-            return False
-    
-    async def run_sequential(self) -> None:
-        """Ejecuta procesamiento secuencial (recomendado para archivos locales)."""
-        self.logger.info("🚀 Iniciando procesamiento secuencial")
+            self.logger.warning(f"⚠️ No se pudo leer el sitemap {url}: {e}")
+            return []
         
-        # Validar configuración
-        if not self._validate_config():
-            self.logger.error("❌ Configuración inválida. Abortando procesamiento.")
-            return
+        entradas = []
+        for elemento in raiz:
+            hijos = {hijo.tag.rsplit('}', 1)[-1]: (hijo.text or '').strip() for hijo in elemento}
+            loc = hijos.get('loc')
+            if not loc:
+                continue
+            if elemento.tag.endswith('sitemap') and nivel < 2:
+                entradas.extend(await self._read_sitemap(loc, nivel + 1))
+            elif elemento.tag.endswith('url'):
+                try:
+                    prioridad = float(hijos.get('priority') or 0.5)
+                except ValueError:
+                    prioridad = 0.5
+                entradas.append((loc, prioridad))
         
-        # Obtener URLs válidas
-        valid_urls = self._validate_urls()
-        if not valid_urls:
-            self.logger.error("❌ No hay URLs válidas para procesar")
-            return
+        self.logger.info(f"🗺️ Sitemap {url}: {len(entradas)} URLs")
+        return entradas
+    
+    async def _seed_frontier(self, frontera: FronteraRastreo, semillas: List[str]) -> None:
+        """
+        Carga las semillas en la frontera, expandiendo los sitemaps.
         
-        self.logger.info(f"📊 Iniciando procesamiento de {len(valid_urls)} URLs")
-        self.stats.inicio = time.time()
+        Las semillas terminadas en .xml/.xml.gz se leen como sitemaps; con
+        `crawl.sitemaps` también se prueba /sitemap.xml de cada host remoto.
         
-        try:
-            for i, url in enumerate(valid_urls, 1):
-                await self._process_single_url(url, i)
-                
-                # Pausa entre requests si está configurada
-                delay = self.config['options'].get('delay_between_requests', 1000)
-                if delay > 0 and i < len(valid_urls):  # No pausar después del último
-                    await asyncio.sleep(delay / 1000.0)  # Convertir ms a segundos
-                    
-        except KeyboardInterrupt:
-            self.logger.warning("⏹️ Procesamiento interrumpido por el usuario")
-        except Exception as e:
-            self.logger.error(f"❌ Error fatal durante procesamiento: {e}")
-        finally:
-            await self._close_browser()
-            self.stats.fin = time.time()
-            self._print_final_stats()
+        Args:
+            frontera: Frontera del rastreo
+            semillas: URLs iniciales
+        """
+        buscar_sitemaps = self.config['options'].get('crawl', {}).get('sitemaps', True)
+        hosts_probados = set()
+        
+        for semilla in semillas:
+            ruta = urlsplit(semilla).path.lower()
+            if ruta.endswith(('.xml', '.xml.gz')):
+                for url, prioridad in await self._read_sitemap(semilla):
+                    frontera.agregar(url, 0, prioridad)
+                continue
+            
+            frontera.agregar(semilla, 0, 1.0)
+            partes = urlsplit(semilla)
+            if buscar_sitemaps and partes.scheme in ('http', 'https') and partes.netloc not in hosts_probados:
+                hosts_probados.add(partes.netloc)
+                sitemap = urlunsplit((partes.scheme, partes.netloc, '/sitemap.xml', '', ''))
+                for url, prioridad in await self._read_sitemap(sitemap):
+                    frontera.agregar(url, 1, prioridad)
     
-    async def run_parallel(self, max_concurrent: Optional[int] = None) -> None:
+    async def run_crawl(self, parallel: bool = False) -> None:
         """
-        Ejecuta procesamiento paralelo (recomendado para URLs remotas).
+        Ejecuta el modo rastreo (descubre URLs desde las semillas).
+        
+        Las URLs de entrada son semillas: se leen sus sitemaps y los enlaces
+        de cada página procesada (incluidas rutas hash de SPA) alimentan una
+        frontera deduplicada. Cada URL descubierta sigue el camino normal de
+        `_process_single_url()`.
+        
+        Con `--resume` las URLs completadas se omiten y las que el rastreo
+        anterior descubrió sin completar vuelven a la frontera con su
+        profundidad, así que el rastreo sigue donde se quedó.
         
         Args:
-            max_concurrent: Número máximo de tareas concurrentes
+            parallel: Si se procesan varias URLs a la vez (`max_concurrent`)
         """
-        self.logger.info("🚀 Iniciando procesamiento paralelo")
+        self.logger.info("🕸️ Iniciando modo rastreo")
         
         # Validar configuración
         if not self._validate_config():
             self.logger.error("❌ Configuración inválida. Abortando procesamiento.")
             return
         
-        # Obtener URLs válidas
-        valid_urls = self._validate_urls()
-        if not valid_urls:
-            self.logger.error("❌ No hay URLs válidas para procesar")
+        semillas = list(self._iter_valid_urls())
+        if not semillas:
             return
         
-        # Configurar concurrencia
-        if max_concurrent is None:
-            max_concurrent = self.config['options'].get('max_concurrent', 3)
-        
-        self.logger.info(f"📊 Iniciando procesamiento paralelo de {len(valid_urls)} URLs (max {max_concurrent} concurrentes)")
+        frontera = self._create_frontier(semillas)
+        workers = self.config['options'].get('max_concurrent', 3) if parallel else 1
+        self._collect_links = True
         self.stats.inicio = time.time()
         
-        # Semáforo para controlar concurrencia
-        semaphore = asyncio.Semaphore(max_concurrent)
+        self._open_journal()
+        self._start_metrics_server()
+        planificador = self._create_host_scheduler()
+        volcado_diario = asyncio.create_task(self._flush_journal_periodically())
+        cambio = asyncio.Condition()
+        estado = {'en_curso': 0, 'indice': 0}
         
-        async def process_with_semaphore(url: str, index: int) -> bool:
-            async with semaphore:
-                return await self._process_single_url(url, index)
+        def descubrir(profundidad: int) -> Callable[[str, str], None]:
+            def on_html(url: str, html: str) -> None:
+                # Con extracción podada los enlaces vienen del DOM completo, no del HTML recibido
+                enlaces = self._discovered_links.pop(url, None)
+                if profundidad >= frontera.max_profundidad:
+                    return
+                if enlaces is None:
+                    enlaces = extraer_enlaces(html, url)
+                nuevas = sum(frontera.agregar(enlace, profundidad + 1) for enlace in enlaces)
+                if nuevas:
+                    self.logger.debug(f"🕸️ {nuevas} URLs nuevas desde {url}")
+            return on_html
         
-        try:
-            # Crear tareas para todas las URLs
-            tasks = [
-                process_with_semaphore(url, i) 
-                for i, url in enumerate(valid_urls, 1)
-            ]
-            
-            # Ejecutar todas las tareas
-            await asyncio.gather(*tasks, return_exceptions=True)
+        async def worker() -> None:
+            while True:
+                async with cambio:
+                    # Una página en curso todavía puede descubrir enlaces nuevos
+                    while not frontera and estado['en_curso']:
+                        await cambio.wait()
+                    if not frontera:
+                        cambio.notify_all()
+                        return
+                    url, profundidad = frontera.extraer()
+                    if self._already_completed(url):
+                        continue
+                    estado['en_curso'] += 1
+                    estado['indice'] += 1
+                    indice = estado['indice']
                 
+                host = host_key(url)
+                try:
+                    self._journal(url, 'pendiente', indice)
+                    inicio = time.perf_counter()
+                    await planificador.adquirir(host)
+                    self._record_stage(url, 'cola_descarga', time.perf_counter() - inicio)
+                    try:
+                        await self._process_single_url(url, indice, descubrir(profundidad))
+                    finally:
+                        await planificador.release(host)
+                finally:
+                    async with cambio:
+                        estado['en_curso'] -= 1
+                        cambio.notify_all()
+        
+        try:
+            await self._seed_frontier(frontera, semillas)
+            if self.journal is not None and self.config['options'].get('resume', False):
+                retomadas = sum(frontera.agregar(url, profundidad)
+                                for url, profundidad in self.journal.pendientes_rastreo())
+                if retomadas:
+                    self.logger.info(f"⏯️ {retomadas} URLs descubiertas sin completar vuelven a la frontera")
+            self.logger.info(
+                f"📊 Rastreo desde {len(semillas)} semillas ({len(frontera)} URLs iniciales, {workers} workers)"
+            )
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        
         except KeyboardInterrupt:
             self.logger.warning("⏹️ Procesamiento interrumpido por el usuario")
         except Exception as e:
-            self.logger.error(f"❌ Error fatal durante procesamiento paralelo: {e}")
+            self.logger.error(f"❌ Error fatal durante el rastreo: {e}")
         finally:
+            volcado_diario.cancel()
+            self._collect_links = False
+            self._discovered_links.clear()
+            self.stats.urls_descubiertas = frontera.admitidas
+            self.stats.urls_duplicadas = frontera.duplicadas
             await self._close_browser()
+            await self._shutdown_conversion_executor()
+            self._save_manifest()
+            self._close_journal()
+            self._close_metrics_stream()
+            self._stop_metrics_server()
             self.stats.fin = time.time()
             self._print_final_stats()
     
-    def _print_final_stats(self) -> None:
-        """Imprime estadísticas finales del procesamiento."""
+    def _print_final_stats(self, nombre_archivo: str = "estadisticas_procesamiento.json") -> None:
+        """
+        Imprime estadísticas finales del procesamiento.
+        
+        Args:
+            nombre_archivo: Archivo JSON del directorio de salida donde guardarlas
+        """
         self.stats.imprimir_resumen()
         self.logger.info("🏁 Procesamiento completado")
         
         # Guardar estadísticas en archivo JSON
         try:
-            stats_file = Path(self.config['output_dir']) / "estadisticas_procesamiento.json"
+            stats_file = Path(self.config['output_dir']) / nombre_archivo
             with open(stats_file, 'w', encoding='utf-8') as f:
                 # Convertir dataclass a dict, excluyendo campos que no son serializables
                 stats_dict = asdict(self.stats)
+                stats_dict['limites_histograma_ms'] = [limite * 1000 for limite in LIMITES_HISTOGRAMA_S]
+                stats_dict['latencias'] = {
+                    etapa: histograma.resumen() for etapa, histograma in self.stats.latencias.items()
+                }
                 stats_dict['fecha_procesamiento'] = datetime.now().isoformat()
                 stats_dict['configuracion_utilizada'] = self.config
-                json.dump(stats_dict, f, indent=2, ensure_ascii=False)
+                f.write(json_compacto(stats_dict, ('latencias', 'metricas_por_url', 'red_por_url')))
             
             self.logger.info(f"📊 Estadísticas guardadas en: {stats_file}")
         except Exception as e:
             self.logger.error(f"❌ Error guardando estadísticas: {e}")
 
 
+def _ejecutar_fragmento(config: Dict, indice: int, total: int, cola, resultados) -> None:
+    """
+    Punto de entrada de cada proceso de `run_sharded`.
+    
+    Crea su propio scraper (y con él su propio navegador), procesa los
+    grupos que llegan por `cola` hasta recibir None y deja sus estadísticas
+    en `resultados`, también si algo falla.
+    
+    Args:
+        config: Configuración preparada por `_shard_config`
+        indice: Índice del proceso
+        total: Número de procesos
+        cola: Cola de grupos de trabajo de este proceso
+        resultados: Cola compartida de estadísticas
+    """
+    estadisticas = None
+    try:
+        scraper = HTMLToMarkdownScraper(config)
+        scraper.shard = (indice, total)
+        estadisticas = scraper.stats
+        asyncio.run(scraper.run_shard(iter(cola.get, None)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        resultados.put((indice, estadisticas))
+
+
 def create_sample_config(config_path: str = "config_ejemplo.json") -> None:
     """
     Crea un archivo de configuración de ejemplo.
@@ -720,6 +5726,7 @@ def create_sample_config(config_path: str = "config_ejemplo.json") -> None:
             "https://ejemplo.com/pagina1",
             "https://ejemplo.com/pagina2"
         ],
+        "urls_file": None,
         "output_dir": "salida_markdown",
         "options": {
             "headless": True,
@@ -728,14 +5735,125 @@ def create_sample_config(config_path: str = "config_ejemplo.json") -> None:
             "parallel": False,
             "max_concurrent": 3,
             "delay_between_requests": 1000,
-            "retry_attempts": 2
+            "retry_attempts": 2,
+            "retry": {
+                "base_delay_ms": 1000,
+                "max_delay_ms": 30000,
+                "jitter": 0.5,
+                "retry_on": ["timeout", "dns", "conexion", "http_429", "http_5xx", "contenido_vacio", "otro"]
+            },
+            "spa_hash_routes": False,
+            "incremental": True,
+            "resume": False,
+            "fetch_mode": "browser",
+            "fetch_rules": [],
+            "static_min_text": 200,
+            "browser_extraction": "document",
+            "politeness": {
+                "requests_per_second": None,
+                "burst": 1,
+                "max_per_host": 2,
+                "max_pending": 100,
+                "host_overrides": {}
+            },
+            "block_resources": {
+                "enabled": False,
+                "resource_types": ["image", "font", "media"],
+                "block_third_party_scripts": True,
+                "allow_domains": [],
+                "deny_domains": []
+            },
+            "page_pool": {
+                "enabled": True,
+                "size": None,
+                "max_uses": 50
+            },
+            "readiness": {
+                "strategy": "adaptive",
+                "selector": None,
+                "quiet_ms": 250,
+                "text_stable_ms": 250,
+                "max_wait_ms": 5000,
+                "poll_ms": 50,
+                "fixed_wait_ms": 2000
+            },
+            "conversion_executor": {
+                "mode": "process",
+                "workers": None
+            },
+            "pipeline": {
+                "fetch_workers": None,
+                "convert_workers": None,
+                "write_workers": 1,
+                "queue_size": None,
+                "report_interval_s": 5
+            },
+            "html_cache": {
+                "enabled": False,
+                "dir": None,
+                "ttl_s": None
+            },
+            "journal": {
+                "enabled": True,
+                "batch_size": 200,
+                "flush_interval_s": 2
+            },
+            "metrics": {
+                "per_url": False,
+                "jsonl": None,
+                "browser_memory": True,
+                "prometheus_port": None,
+                "prometheus_host": "127.0.0.1"
+            },
+            "sharding": {
+                "processes": 1,
+                "key": "host",
+                "queue_size": 64
+            },
+            "queue": {
+                "url": None,
+                "lease_size": None,
+                "visibility_timeout_s": 300,
+                "max_attempts": 3,
+                "poll_interval_s": 2,
+                "max_poll_interval_s": 30,
+                "report_interval_s": 10,
+                "worker_id": None,
+                "exit_when_empty": True,
+                "mongo_database": "scraper",
+                "mongo_collection": "cola_trabajos"
+            },
+            "crawl": {
+                "enabled": False,
+                "max_depth": 3,
+                "max_pages": 1000,
+                "same_domain": True,
+                "allowed_domains": [],
+                "exclude_patterns": [],
+                "sitemaps": True,
+                "hash_routes": True,
+                "dedup": "set",
+                "bloom_capacity": 1000000,
+                "bloom_error_rate": 0.001
+            }
         },
         "markdown": {
             "strip_elements": ["script", "style", "nav", "footer", "aside", "header"],
             "file_extension": ".md",
             "naming_pattern": "contenido_{index}",
             "smart_naming": True,
-            "clean_excessive_whitespace": True
+            "clean_excessive_whitespace": True,
+            "content_selector": None,
+            "readability": False,
+            "html_parser": "auto",
+            "cleanup": {
+                "strip_trailing_spaces": True,
+                "collapse_spaces": True,
+                "max_blank_lines": 2,
+                "protect_code": True,
+                "protect_tables": True,
+                "extra_rules": []
+            }
         },
         "logging": {
             "level": "INFO",
@@ -772,6 +5890,11 @@ Ejemplos de uso:
   %(prog)s --config mi_config.json
   %(prog)s --config config.json --parallel
   %(prog)s --urls "file:///archivo1.html" "file:///archivo2.html" --output "salida"
+  cat urls.txt | %(prog)s --urls-file - --parallel
+  %(prog)s --urls "https://sitio.com/" --crawl --parallel
+  %(prog)s --config config.json --parallel --processes 4
+  %(prog)s --config config.json --queue cola.sqlite --enqueue
+  %(prog)s --config config.json --queue cola.sqlite --worker --parallel
         """
     )
     
@@ -793,12 +5916,81 @@ Ejemplos de uso:
         help='Usar procesamiento paralelo'
     )
     
+    parser.add_argument(
+        '--spa-hash-routes', 
+        action='store_true',
+        help='Cargar cada documento una vez y navegar sus rutas #/ en la misma página'
+    )
+    
+    parser.add_argument(
+        '--fetch-mode', 
+        choices=['browser', 'static', 'auto'],
+        help='Cómo obtener el HTML: navegador, lectura directa/HTTP o detección automática'
+    )
+    
+    parser.add_argument(
+        '--crawl', 
+        action='store_true',
+        help='Modo rastreo: usar las URLs como semillas y seguir sitemaps y enlaces'
+    )
+    
+    parser.add_argument(
+        '--resume', 
+        action='store_true',
+        help='Reanudar la ejecución anterior omitiendo las URLs ya completadas'
+    )
+    
+    parser.add_argument(
+        '--processes',
+        type=int,
+        help='Repartir las URLs entre N procesos, cada uno con su propio navegador (0 = uno por núcleo)'
+    )
+    
+    parser.add_argument(
+        '--queue',
+        help='Cola de trabajos compartida: archivo SQLite o URI mongodb://'
+    )
+    
+    parser.add_argument(
+        '--enqueue',
+        action='store_true',
+        help='Añadir las URLs de entrada a la cola de trabajos (--queue)'
+    )
+    
+    parser.add_argument(
+        '--worker',
+        action='store_true',
+        help='Procesar URLs tomadas de la cola de trabajos en lugar de la configuración'
+    )
+    
+    parser.add_argument(
+        '--queue-status',
+        action='store_true',
+        help='Mostrar el estado de la cola y las estadísticas agregadas de todos los workers'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        help='Exponer métricas Prometheus/OpenMetrics en este puerto durante la ejecución'
+    )
+    
+    parser.add_argument(
+        '--metrics-jsonl',
+        help='Emitir las métricas de cada URL como JSON Lines en este archivo durante la ejecución'
+    )
+    
     parser.add_argument(
         '--urls', 
         nargs='+',
         help='Lista de URLs a procesar (sobrescribe configuración)'
     )
     
+    parser.add_argument(
+        '--urls-file', 
+        help="Archivo con una URL por línea, leído en streaming ('-' para stdin)"
+    )
+    
     parser.add_argument(
         '--output', 
         help='Directorio de salida (sobrescribe configuración)'
@@ -837,6 +6029,13 @@ async def main() -> None:
             scraper.config['urls'] = args.urls
             scraper.logger.info(f"📝 URLs sobrescritas desde línea de comandos: {len(args.urls)} URLs")
         
+        if args.urls_file:
+            scraper.config['urls_file'] = args.urls_file
+            if not args.urls:
+                scraper.config['urls'] = []
+            origen = 'stdin' if args.urls_file == '-' else args.urls_file
+            scraper.logger.info(f"📝 URLs leídas en streaming desde: {origen}")
+        
         if args.output:
             scraper.config['output_dir'] = args.output
             scraper.logger.info(f"📁 Directorio de salida sobrescrito: {args.output}")
@@ -844,13 +6043,52 @@ async def main() -> None:
         if args.headless:
             scraper.config['options']['headless'] = True
         
+        if args.spa_hash_routes:
+            scraper.config['options']['spa_hash_routes'] = True
+        
+        if args.fetch_mode:
+            scraper.config['options']['fetch_mode'] = args.fetch_mode
+        
+        if args.resume:
+            scraper.config['options']['resume'] = True
+        
+        if args.queue:
+            scraper.config['options']['queue']['url'] = args.queue
+        
+        if args.metrics_port is not None:
+            scraper.config['options']['metrics']['prometheus_port'] = args.metrics_port
+        
+        if args.metrics_jsonl:
+            scraper.config['options']['metrics']['jsonl'] = args.metrics_jsonl
+        
         if args.verbose:
             scraper.config['logging']['level'] = 'DEBUG'
             scraper.logger.setLevel(logging.DEBUG)
             scraper.logger.debug("🔍 Modo verbose activado")
         
+        # Operaciones sobre la cola de trabajos compartida
+        if args.queue_status:
+            await scraper.print_queue_status()
+            return
+        if args.enqueue:
+            await scraper.enqueue_urls()
+            if not args.worker:
+                return
+        
         # Ejecutar procesamiento
-        if args.parallel or scraper.config['options'].get('parallel', False):
+        parallel = args.parallel or scraper.config['options'].get('parallel', False)
+        procesos = args.processes
+        if procesos is None:
+            procesos = scraper.config['options'].get('sharding', {}).get('processes', 1)
+        if args.worker:
+            await scraper.run_worker(parallel)
+        elif args.crawl or scraper.config['options'].get('crawl', {}).get('enabled', False):
+            if procesos != 1:
+                scraper.logger.warning("⚠️ El rastreo usa una sola frontera: se ignora --processes")
+            await scraper.run_crawl(parallel)
+        elif procesos != 1:
+            await scraper.run_sharded(procesos, parallel)
+        elif parallel:
             await scraper.run_parallel()
         else:
             await scraper.run_sequential()
@@ -867,10 +6105,11 @@ if __name__ == "__main__":
     try:
         import playwright
         import markdownify
+        import bs4
     except ImportError as e:
         print(f"❌ Dependencia faltante: {e}")
         print("📦 Instala las dependencias con:")
-        print("   pip install playwright markdownify")
+        print("   pip install playwright markdownify beautifulsoup4")
         print("   playwright install")
         exit(1)
     
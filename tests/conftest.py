@@ -0,0 +1,16 @@
+import pytest
+
+from html_scraper_mejorado import HTMLToMarkdownScraper
+
+
+@pytest.fixture
+def crear_scraper(tmp_path):
+    """Crea scrapers con salida y logs en un directorio temporal, sin URLs de ejemplo."""
+    def crear(**opciones) -> HTMLToMarkdownScraper:
+        return HTMLToMarkdownScraper({
+            'urls': [],
+            'output_dir': str(tmp_path / 'salida'),
+            'options': opciones,
+            'logging': {'console': False, 'file': False, 'log_dir': str(tmp_path / 'logs')},
+        })
+    return crear
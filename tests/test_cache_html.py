@@ -0,0 +1,40 @@
+import asyncio
+
+from html_scraper_mejorado import CacheHTML
+
+
+def preparar(crear_scraper, tmp_path):
+    pagina = tmp_path / "pagina.html"
+    pagina.write_text("<html><body><nav><a href='/otra'>Otra</a></nav><p>Texto</p></body></html>",
+                      encoding="utf-8")
+    scraper = crear_scraper(browser_extraction='pruned', html_cache={'enabled': True})
+    scraper._collect_links = True
+    return scraper, scraper._get_html_cache(), pagina.as_uri()
+
+
+def test_cache_guarda_enlaces_y_poda(tmp_path):
+    cache = CacheHTML(tmp_path, "config")
+    cache.guardar("https://sitio.com/", "<p>x</p>", {"etag": "1"}, podado=True, enlaces=["https://sitio.com/a"])
+
+    html, metadatos = cache.leer("https://sitio.com/")
+    assert html == "<p>x</p>"
+    assert metadatos["podado"] is True
+    assert metadatos["enlaces"] == ["https://sitio.com/a"]
+
+
+def test_rastreo_usa_los_enlaces_guardados_con_la_entrada(crear_scraper, tmp_path):
+    scraper, cache, url = preparar(crear_scraper, tmp_path)
+    cache.guardar(url, "<p>Texto</p>", CacheHTML.validadores_archivo(url), podado=True,
+                  enlaces=["https://sitio.com/otra"])
+
+    assert asyncio.run(scraper._lookup_html_cache(url)) == "<p>Texto</p>"
+    assert scraper._discovered_links[url] == ["https://sitio.com/otra"]
+
+
+def test_rastreo_ignora_entradas_podadas_sin_enlaces(crear_scraper, tmp_path):
+    scraper, cache, url = preparar(crear_scraper, tmp_path)
+    cache.guardar(url, "<p>Texto</p>", CacheHTML.validadores_archivo(url), podado=True)
+
+    assert asyncio.run(scraper._lookup_html_cache(url)) is None
+    scraper._collect_links = False
+    assert asyncio.run(scraper._lookup_html_cache(url)) == "<p>Texto</p>"
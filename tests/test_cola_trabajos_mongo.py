@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+pymongo = pytest.importorskip("pymongo")
+
+from html_scraper_mejorado import ColaTrabajos, ColaTrabajosMongo  # noqa: E402
+
+
+@pytest.fixture
+def cola(monkeypatch):
+    monkeypatch.setattr(pymongo, "MongoClient", mongomock.MongoClient)
+    cola = ColaTrabajosMongo("mongodb://localhost", "scraper", "cola_trabajos")
+    yield cola
+    cola.cerrar()
+
+
+def test_interfaz_abstracta():
+    with pytest.raises(TypeError):
+        ColaTrabajos()
+
+
+def test_indices_consecutivos_sin_huecos(cola):
+    cola.encolar(["u1", "u2", "u3"])
+
+    assert cola.encolar(["u2", "u4", "u1", "u5", "u4"]) == 2
+    assert [(d["_id"], d["indice"]) for d in cola._cola.find().sort("indice")] == [
+        ("u1", 1), ("u2", 2), ("u3", 3), ("u4", 4), ("u5", 5)]
+
+
+def test_arriendo_en_lote_con_un_numero_fijo_de_consultas(cola, monkeypatch):
+    cola.encolar([f"u{i}" for i in range(10)])
+    llamadas = []
+    for metodo in ("find", "update_many", "find_one_and_update"):
+        original = getattr(cola._cola, metodo)
+        monkeypatch.setattr(cola._cola, metodo,
+                            lambda *a, _m=metodo, _o=original, **k: llamadas.append(_m) or _o(*a, **k))
+
+    arrendadas = cola.arrendar("w1", 8, visibilidad_s=60, max_intentos=3)
+
+    assert arrendadas == [(i + 1, f"u{i}") for i in range(8)]
+    # Vencidos + candidatos + marcado + recogida, sin importar el tamaño del lote
+    assert llamadas == ["update_many", "find", "update_many", "find"]
+
+
+def test_arriendos_no_se_solapan(cola):
+    cola.encolar([f"u{i}" for i in range(5)])
+
+    primero = cola.arrendar("w1", 3, visibilidad_s=60, max_intentos=3)
+    segundo = cola.arrendar("w2", 3, visibilidad_s=60, max_intentos=3)
+
+    assert [url for _, url in primero] == ["u0", "u1", "u2"]
+    assert [url for _, url in segundo] == ["u3", "u4"]
+    assert cola.arrendar("w3", 3, visibilidad_s=60, max_intentos=3) == []
+
+
+def test_arriendo_vencido_y_confirmacion(cola):
+    cola.encolar(["u1", "u2"])
+    cola.arrendar("w1", 2, visibilidad_s=0.01, max_intentos=3)
+    time.sleep(0.02)
+
+    assert cola.arrendar("w2", 1, visibilidad_s=60, max_intentos=3) == [(1, "u1")]
+    assert cola.confirmar("w1", [("u1", True, None)]) == 0
+    assert cola.confirmar("w2", [("u1", True, None)]) == 1
+    assert cola.liberar("w1") == 1
+    assert cola.resumen() == {"completado": 1, "pendiente": 1}
@@ -0,0 +1,99 @@
+import time
+
+from html_scraper_mejorado import ColaTrabajosSQLite
+
+
+def cola_con(tmp_path, urls):
+    cola = ColaTrabajosSQLite(tmp_path / "cola.sqlite")
+    cola.encolar(urls)
+    return cola
+
+
+def test_cola_encolar_ignora_repetidas(tmp_path):
+    cola = ColaTrabajosSQLite(tmp_path / "cola.sqlite")
+
+    assert cola.encolar(["u1", "u2", "u3"], lote=2) == 3
+    assert cola.encolar(["u2", "u4"]) == 1
+    assert cola.resumen() == {"pendiente": 4}
+    cola.cerrar()
+
+
+def test_cola_indices_consecutivos_sin_huecos(tmp_path):
+    cola = cola_con(tmp_path, ["u1", "u2", "u3"])
+
+    assert cola.encolar(["u2", "u4", "u1", "u5", "u4"]) == 2
+    filas = cola._conexion.execute("SELECT url, indice FROM cola ORDER BY indice").fetchall()
+    assert filas == [("u1", 1), ("u2", 2), ("u3", 3), ("u4", 4), ("u5", 5)]
+    cola.cerrar()
+
+
+def test_cola_arriendos_no_se_solapan(tmp_path):
+    cola = cola_con(tmp_path, [f"u{i}" for i in range(5)])
+    otra = ColaTrabajosSQLite(tmp_path / "cola.sqlite")
+
+    primero = cola.arrendar("w1", 3, visibilidad_s=60, max_intentos=3)
+    segundo = otra.arrendar("w2", 3, visibilidad_s=60, max_intentos=3)
+
+    assert [url for _, url in primero] == ["u0", "u1", "u2"]
+    assert [url for _, url in segundo] == ["u3", "u4"]
+    assert [indice for indice, _ in primero + segundo] == [1, 2, 3, 4, 5]
+    assert otra.arrendar("w2", 3, visibilidad_s=60, max_intentos=3) == []
+    cola.cerrar()
+    otra.cerrar()
+
+
+def test_cola_confirmar_solo_del_propietario(tmp_path):
+    cola = cola_con(tmp_path, ["u1", "u2"])
+    cola.arrendar("w1", 2, visibilidad_s=60, max_intentos=3)
+
+    assert cola.confirmar("w2", [("u1", True, None)]) == 0
+    assert cola.confirmar("w1", [("u1", True, None), ("u2", False, "timeout")]) == 2
+    assert cola.resumen() == {"completado": 1, "fallido": 1}
+    assert not cola.abierta()
+    cola.cerrar()
+
+
+def test_cola_arriendo_vencido_vuelve_a_repartirse(tmp_path):
+    cola = cola_con(tmp_path, ["u1"])
+    cola.arrendar("w1", 1, visibilidad_s=0.01, max_intentos=3)
+    time.sleep(0.02)
+
+    assert cola.arrendar("w2", 1, visibilidad_s=60, max_intentos=3) == [(1, "u1")]
+    # El worker que perdió el arriendo ya no puede confirmar
+    assert cola.confirmar("w1", [("u1", True, None)]) == 0
+    assert cola.confirmar("w2", [("u1", True, None)]) == 1
+    cola.cerrar()
+
+
+def test_cola_agota_los_intentos(tmp_path):
+    cola = cola_con(tmp_path, ["u1"])
+    for trabajador in ("w1", "w2"):
+        assert cola.arrendar(trabajador, 1, visibilidad_s=0.01, max_intentos=2)
+        time.sleep(0.02)
+
+    assert cola.arrendar("w3", 1, visibilidad_s=60, max_intentos=2) == []
+    assert cola.resumen() == {"fallido": 1}
+    cola.cerrar()
+
+
+def test_cola_renovar_y_liberar(tmp_path):
+    cola = cola_con(tmp_path, ["u1", "u2"])
+    cola.arrendar("w1", 2, visibilidad_s=0.05, max_intentos=1)
+
+    assert cola.renovar("w1", visibilidad_s=60) == 2
+    time.sleep(0.06)
+    assert cola.arrendar("w2", 2, visibilidad_s=60, max_intentos=1) == []
+    # Liberar no consume intentos: otro worker puede tomarlas aun con max_intentos=1
+    assert cola.liberar("w1") == 2
+    assert len(cola.arrendar("w2", 2, visibilidad_s=60, max_intentos=1)) == 2
+    cola.cerrar()
+
+
+def test_cola_estadisticas_por_nodo(tmp_path):
+    cola = ColaTrabajosSQLite(tmp_path / "cola.sqlite")
+    cola.publicar("w2", {"archivos_procesados": 2})
+    cola.publicar("w1", {"archivos_procesados": 1})
+    cola.publicar("w1", {"archivos_procesados": 5})
+
+    assert cola.estadisticas() == [{"archivos_procesados": 5}, {"archivos_procesados": 2}]
+    cola.cerrar()
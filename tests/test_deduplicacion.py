@@ -0,0 +1,55 @@
+from html_scraper_mejorado import ConjuntoHuellas, FiltroBloom
+
+
+def test_conjunto_huellas_sin_falsos_negativos_al_ampliarse():
+    vistos = ConjuntoHuellas(capacidad_inicial=8)
+    urls = [f"https://sitio.com/pagina/{i}" for i in range(5000)]
+    for url in urls:
+        vistos.add(url)
+
+    assert len(vistos) == len(urls)
+    assert all(url in vistos for url in urls)
+    assert not any(f"https://otro.com/pagina/{i}" in vistos for i in range(5000))
+
+
+def test_conjunto_huellas_ignora_repetidas():
+    vistos = ConjuntoHuellas()
+    vistos.add("https://sitio.com/")
+    vistos.add("https://sitio.com/")
+
+    assert len(vistos) == 1
+
+
+def test_conjunto_huellas_ocupa_como_mucho_32_bytes_por_url():
+    vistos = ConjuntoHuellas()
+    for i in range(10000):
+        vistos.add(f"https://sitio.com/{i}")
+
+    assert vistos._tabla.itemsize * len(vistos._tabla) <= 32 * len(vistos)
+
+
+def test_filtro_bloom_sin_falsos_negativos():
+    filtro = FiltroBloom(capacidad=2000, tasa_error=0.01)
+    urls = [f"https://sitio.com/pagina/{i}" for i in range(2000)]
+    for url in urls:
+        filtro.add(url)
+
+    assert len(filtro) == 2000
+    assert all(url in filtro for url in urls)
+
+
+def test_filtro_bloom_respeta_la_tasa_de_error():
+    filtro = FiltroBloom(capacidad=5000, tasa_error=0.01)
+    for i in range(5000):
+        filtro.add(f"https://sitio.com/{i}")
+
+    falsos_positivos = sum(f"https://otro.com/{i}" in filtro for i in range(20000))
+
+    assert falsos_positivos / 20000 < 0.02
+
+
+def test_filtro_bloom_tamano_fijo():
+    filtro = FiltroBloom(capacidad=1_000_000, tasa_error=0.001)
+
+    # ~1,8 MB para un millón de URLs al 0,1 %
+    assert 1_700_000 < len(filtro._bits) < 1_900_000
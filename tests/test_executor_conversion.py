@@ -0,0 +1,27 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_cerrar_executor_no_bloquea_el_bucle(crear_scraper):
+    scraper = crear_scraper()
+
+    async def escenario():
+        scraper._conversion_executor = ThreadPoolExecutor(max_workers=1)
+        scraper._conversion_executor.submit(time.sleep, 0.3)
+        latidos = 0
+
+        async def latir():
+            nonlocal latidos
+            while True:
+                await asyncio.sleep(0.01)
+                latidos += 1
+
+        latido = asyncio.create_task(latir())
+        await scraper._shutdown_conversion_executor()
+        latido.cancel()
+        return latidos
+
+    # Mientras espera la conversión en curso el bucle sigue atendiendo tareas
+    assert asyncio.run(escenario()) >= 10
+    assert scraper._conversion_executor is None
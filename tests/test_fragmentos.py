@@ -0,0 +1,56 @@
+import asyncio
+import queue
+import threading
+
+from html_scraper_mejorado import indice_fragmento
+
+
+class ProcesoFalso:
+    def __init__(self, vivo: bool):
+        self.vivo = vivo
+
+    def is_alive(self) -> bool:
+        return self.vivo
+
+
+def test_indice_fragmento_estable_y_por_host():
+    urls = [f"https://sitio{i % 7}.com/pagina/{i}" for i in range(200)]
+
+    indices = [indice_fragmento(url, 4) for url in urls]
+
+    assert indices == [indice_fragmento(url, 4) for url in urls]
+    assert all(0 <= indice < 4 for indice in indices)
+    # Todas las URLs de un host van al mismo proceso
+    assert len({indice_fragmento(f"https://sitio1.com/{i}", 4) for i in range(50)}) == 1
+    assert len({indice_fragmento(f"https://sitio1.com/{i}", 4, por_host=False) for i in range(50)}) > 1
+
+
+def test_reparto_registra_fallos_en_el_event_loop(crear_scraper):
+    scraper = crear_scraper()
+    urls = [f"https://sitio.com/{i}" for i in range(3)]
+    grupos = [[(i, url)] for i, url in enumerate(urls, 1)]
+    # Un único proceso, ya muerto, con su cola llena: todo el reparto falla
+    colas = [queue.Queue(maxsize=1)]
+    colas[0].put('ocupada')
+    hilos_registro = set()
+    registrar = scraper._record_result
+
+    def registrar_y_anotar(url, success, error=None):
+        hilos_registro.add(threading.get_ident())
+        registrar(url, success, error)
+
+    scraper._record_result = registrar_y_anotar
+
+    async def repartir():
+        repartidas = await asyncio.to_thread(
+            scraper._deal_work_groups, grupos, colas, [ProcesoFalso(False)], True,
+            asyncio.get_running_loop(),
+        )
+        return repartidas, threading.get_ident()
+
+    repartidas, hilo_loop = asyncio.run(repartir())
+
+    assert repartidas == [0]
+    assert scraper.stats.archivos_fallidos == 3
+    assert scraper.stats.urls_fallidas == urls
+    assert hilos_registro == {hilo_loop}
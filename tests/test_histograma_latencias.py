@@ -0,0 +1,66 @@
+import pytest
+
+from html_scraper_mejorado import HistogramaLatencias, LIMITES_HISTOGRAMA_S
+
+
+def histograma_con(*mediciones):
+    histograma = HistogramaLatencias()
+    for segundos in mediciones:
+        histograma.observar(segundos)
+    return histograma
+
+
+def test_vacio():
+    histograma = HistogramaLatencias()
+
+    assert histograma.percentil(50) == 0.0
+    assert histograma.resumen()['n'] == 0
+    assert histograma.resumen()['media_ms'] == 0
+
+
+def test_buckets_y_totales():
+    histograma = histograma_con(0.0005, 0.002, 0.002, 100.0)
+
+    assert len(histograma.conteos) == len(LIMITES_HISTOGRAMA_S) + 1
+    assert histograma.conteos[0] == 1
+    assert histograma.conteos[1] == 2
+    assert histograma.conteos[-1] == 1
+    assert histograma.total == 4
+    assert histograma.suma == pytest.approx(100.0045)
+
+
+def test_percentiles_acotados_por_minimo_y_maximo():
+    histograma = histograma_con(*([0.3] * 99), 0.4)
+
+    assert 0.3 <= histograma.percentil(50) <= 0.4
+    assert histograma.percentil(100) == pytest.approx(0.4)
+    assert histograma.percentil(0.1) >= 0.3
+
+
+def test_percentiles_monotonos():
+    histograma = histograma_con(*(i / 1000 for i in range(1, 2000)))
+    percentiles = [histograma.percentil(p) for p in (10, 50, 90, 95, 99)]
+
+    assert percentiles == sorted(percentiles)
+    assert percentiles[1] == pytest.approx(1.0, rel=0.3)
+
+
+def test_exportar_e_importar():
+    histograma = histograma_con(0.01, 0.2, 3.0)
+
+    copia = HistogramaLatencias.importar(histograma.exportar())
+
+    assert copia.exportar() == histograma.exportar()
+    assert HistogramaLatencias.importar(HistogramaLatencias().exportar()).percentil(50) == 0.0
+
+
+def test_combinar():
+    a = histograma_con(0.01, 0.02)
+    b = histograma_con(0.5, 5.0)
+
+    a.combinar(b)
+
+    assert a.total == 4
+    assert a.minimo == 0.01
+    assert a.maximo == 5.0
+    assert a.exportar()['conteos'] == histograma_con(0.01, 0.02, 0.5, 5.0).exportar()['conteos']
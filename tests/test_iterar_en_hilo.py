@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from html_scraper_mejorado import iterar_en_hilo
+
+
+async def recoger(iterable, **opciones):
+    return [elemento async for elemento in iterar_en_hilo(iterable, **opciones)]
+
+
+def test_conserva_orden_y_elementos():
+    assert asyncio.run(recoger(range(1000), lote=7)) == list(range(1000))
+
+
+def test_entrega_lote_parcial_si_la_fuente_se_detiene():
+    def fuente_lenta():
+        yield 'a'
+        time.sleep(1.0)
+        yield 'b'
+
+    async def primer_elemento():
+        inicio = time.monotonic()
+        iterador = iterar_en_hilo(fuente_lenta(), max_espera_s=0.05)
+        elemento = await iterador.__anext__()
+        transcurrido = time.monotonic() - inicio
+        await iterador.aclose()
+        return elemento, transcurrido
+
+    elemento, transcurrido = asyncio.run(primer_elemento())
+    assert elemento == 'a'
+    assert transcurrido < 0.5
+
+
+def test_propaga_errores_de_la_fuente():
+    def fuente():
+        yield 1
+        raise ValueError('entrada rota')
+
+    with pytest.raises(ValueError, match='entrada rota'):
+        asyncio.run(recoger(fuente()))
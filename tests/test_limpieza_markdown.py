@@ -0,0 +1,97 @@
+from html_scraper_mejorado import limpiar_markdown
+
+
+CODIGO = "```python\ndef f(x):\n    y  =  x   * 2  \n\n\n\n    return y\n```"
+TABLA = "| a  |  b |\n|----|----|\n|  1 |   2  |"
+
+
+def test_limpia_espacios_y_lineas_vacias():
+    markdown = "Texto   con  espacios   \n\n\n\n\n\nFin  de   linea \t\n    sangria  conservada"
+
+    assert limpiar_markdown(markdown) == "Texto con espacios\n\n\nFin de linea\n    sangria conservada"
+
+
+def test_vacio():
+    assert limpiar_markdown("") == ""
+    assert limpiar_markdown(None) == ""
+
+
+def test_conserva_bloques_de_codigo_cercados():
+    markdown = f"Antes   de\n\n\n\n\n{CODIGO}\n\n\n\n\nDespues   de"
+
+    limpio = limpiar_markdown(markdown)
+
+    assert CODIGO in limpio
+    assert limpio.startswith("Antes de\n\n\n```python")
+    assert limpio.endswith("```\n\n\nDespues de")
+
+
+def test_conserva_vallas_de_tildes_y_bloques_sin_cerrar():
+    tildes = "~~~\na    b\n\n\n\n~~~"
+    sin_cerrar = "```\nx    y\n\n\n\n\nz  "
+
+    assert tildes in limpiar_markdown(f"texto\n{tildes}\nmas   texto")
+    assert limpiar_markdown(f"texto\n{sin_cerrar}").endswith("x    y\n\n\n\n\nz")
+
+
+def test_codigo_en_linea_no_abre_un_bloque():
+    markdown = "```codigo```   en linea\n\n\n\n\nsiguiente    parrafo"
+
+    assert limpiar_markdown(markdown) == "```codigo``` en linea\n\n\nsiguiente parrafo"
+
+
+def test_conserva_tablas():
+    markdown = f"Tabla:\n\n{TABLA}\n\ntexto    final"
+
+    assert limpiar_markdown(markdown) == f"Tabla:\n\n{TABLA}\n\ntexto final"
+
+
+def test_proteccion_desactivable():
+    reglas = {'protect_code': False, 'protect_tables': False}
+
+    assert "|----|----|\n| 1 | 2 |" in limpiar_markdown(TABLA, reglas)
+    assert "y = x * 2" in limpiar_markdown(CODIGO, reglas)
+
+
+def test_reglas_desactivables():
+    markdown = "a    b   \n\n\n\n\nc"
+    reglas = {'strip_trailing_spaces': False, 'collapse_spaces': False, 'max_blank_lines': None}
+
+    assert limpiar_markdown(markdown, reglas) == markdown
+    assert limpiar_markdown(markdown, {'max_blank_lines': 0}) == "a b\nc"
+
+
+def test_reglas_extra_no_tocan_regiones_protegidas():
+    reglas = {'extra_rules': [{'pattern': r'x', 'replace': 'X'}]}
+    markdown = f"x antes\n{CODIGO}\n{TABLA}\nx despues"
+
+    limpio = limpiar_markdown(markdown, reglas)
+
+    assert limpio.startswith("X antes")
+    assert limpio.endswith("X despues")
+    assert CODIGO in limpio and TABLA in limpio
+
+
+def test_regla_extra_que_abarca_un_bloque_no_lo_desplaza():
+    # Sin aplicar las reglas por fragmento, esta regla borraría el separador
+    # entre los dos fragmentos y el bloque acabaría al final del documento
+    reglas = {'extra_rules': [{'pattern': r'inicio[\s\S]*fin', 'replace': 'RESUMEN'}]}
+    markdown = f"inicio del texto\n{CODIGO}\ntexto hasta el fin"
+
+    limpio = limpiar_markdown(markdown, reglas)
+
+    assert limpio == f"inicio del texto\n{CODIGO}\ntexto hasta el fin"
+
+
+def test_regla_extra_dentro_de_un_fragmento():
+    reglas = {'extra_rules': [{'pattern': r'^Anuncio:.*$\n?', 'replace': ''}]}
+    markdown = f"Anuncio: compre ya\nTexto\n{CODIGO}\nAnuncio: otra vez\nMas texto"
+
+    assert limpiar_markdown(markdown, reglas) == f"Texto\n{CODIGO}\nMas texto"
+
+
+def test_regla_extra_no_puede_inyectar_separadores():
+    reglas = {'extra_rules': [{'pattern': r'a', 'replace': '\x00'}]}
+    markdown = f"a\n{CODIGO}\nb"
+
+    assert limpiar_markdown(markdown, reglas) == f"{CODIGO}\nb"
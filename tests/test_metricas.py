@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+
+URL = "https://sitio.com/pagina"
+
+
+def procesar(scraper, url=URL):
+    scraper._record_stage(url, 'descarga', 0.01)
+    scraper._record_result(url, True)
+
+
+def test_metricas_por_url_desactivadas_por_defecto(crear_scraper):
+    scraper = crear_scraper()
+
+    procesar(scraper)
+
+    assert scraper.stats.metricas_por_url == {}
+    assert scraper.stats.latencias['total'].total == 1
+    assert scraper._metricas_en_curso == {}
+
+
+def test_metricas_por_url_activables(crear_scraper):
+    scraper = crear_scraper(metrics={'per_url': True})
+
+    procesar(scraper)
+
+    assert scraper.stats.metricas_por_url[URL]['ms']['descarga'] == 10.0
+
+
+def test_metricas_jsonl_sin_guardar_en_memoria(crear_scraper, tmp_path):
+    scraper = crear_scraper(metrics={'jsonl': 'metricas.jsonl'})
+
+    procesar(scraper)
+    scraper._close_metrics_stream()
+
+    lineas = (tmp_path / 'salida' / 'metricas.jsonl').read_text(encoding='utf-8').splitlines()
+    assert len(lineas) == 1 and URL in lineas[0]
+    assert scraper.stats.metricas_por_url == {}
+
+
+def test_modo_servicio_desactiva_metricas_por_url(crear_scraper, tmp_path):
+    pytest.importorskip("playwright")
+    scraper = crear_scraper(fetch_mode='static', metrics={'per_url': True})
+    pagina = tmp_path / "pagina.html"
+    parrafos = "".join(f"<p>Párrafo {i} con texto suficiente para no parecer vacío.</p>" for i in range(20))
+    pagina.write_text(f"<html><body><h1>Título</h1>{parrafos}</body></html>", encoding="utf-8")
+
+    async def escenario():
+        await scraper.start()
+        try:
+            return await scraper.convert_url(pagina.as_uri()), await scraper.convert_url("ftp://sitio.com/")
+        finally:
+            await scraper.close()
+
+    resultado, invalida = asyncio.run(escenario())
+
+    assert resultado['ok'] and not invalida['ok']
+    assert (scraper.stats.archivos_procesados, scraper.stats.archivos_fallidos) == (1, 1)
+    assert scraper.stats.urls_procesadas == [] and scraper.stats.urls_fallidas == []
+    assert scraper.config['options']['metrics']['per_url'] is False
+    assert scraper.stats.metricas_por_url == {}
+    assert scraper._metricas_en_curso == {}
@@ -0,0 +1,90 @@
+import logging
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from html_scraper_mejorado import LIMITES_HISTOGRAMA_S, ServidorMetricas, TIPO_OPENMETRICS, TIPO_PROMETHEUS
+
+
+@pytest.fixture
+def scraper(crear_scraper):
+    scraper = crear_scraper()
+    scraper.stats.archivos_procesados = 2
+    scraper.stats.archivos_fallidos = 1
+    scraper.stats.errores_por_categoria['timeout'] = 3
+    scraper.stats.errores_por_categoria['raro "a"\\b\nc'] = 1
+    for segundos in (0.0005, 0.002, 100.0):
+        scraper.stats.registrar_etapa('descarga', segundos)
+    return scraper
+
+
+def muestras(texto):
+    return dict(linea.rsplit(' ', 1) for linea in texto.splitlines() if not linea.startswith('#'))
+
+
+def test_formato_prometheus(scraper):
+    texto = scraper.prometheus_metrics()
+    valores = muestras(texto)
+
+    assert '# TYPE scraper_pages_completed_total counter' in texto
+    assert valores['scraper_pages_completed_total'] == '2'
+    assert valores['scraper_pages_failed_total'] == '1'
+    assert valores['scraper_fetch_errors_total{category="timeout"}'] == '3'
+    assert '# EOF' not in texto
+    assert texto.endswith('\n')
+
+
+def test_formato_openmetrics_declara_contadores_sin_total(scraper):
+    texto = scraper.prometheus_metrics(openmetrics=True)
+
+    assert '# TYPE scraper_pages_completed counter' in texto
+    assert '# TYPE scraper_pages_completed_total' not in texto
+    assert muestras(texto)['scraper_pages_completed_total'] == '2'
+    assert '# TYPE scraper_in_flight_urls gauge' in texto
+    assert texto.endswith('# EOF\n')
+    assert texto.count('# EOF') == 1
+
+
+def test_etiquetas_escapadas(scraper):
+    texto = scraper.prometheus_metrics()
+
+    assert 'scraper_fetch_errors_total{category="raro \\"a\\"\\\\b\\nc"} 1' in texto
+    # Ningún valor de etiqueta parte una muestra en dos líneas
+    assert all(re.fullmatch(r'\w+(\{.*\})? \S+', linea) for linea in texto.splitlines() if not linea.startswith('#'))
+
+
+def test_histograma_con_buckets_acumulados(scraper):
+    valores = muestras(scraper.prometheus_metrics())
+    prefijo = 'scraper_stage_duration_seconds_bucket{stage="descarga",le="'
+    buckets = [int(valor) for muestra, valor in valores.items() if muestra.startswith(prefijo)]
+
+    assert len(buckets) == len(LIMITES_HISTOGRAMA_S) + 1
+    assert buckets == sorted(buckets)
+    assert buckets[0] == 1
+    assert valores[prefijo + '+Inf"}'] == '3'
+    assert valores['scraper_stage_duration_seconds_count{stage="descarga"}'] == '3'
+    assert float(valores['scraper_stage_duration_seconds_sum{stage="descarga"}']) == pytest.approx(100.0025)
+
+
+def test_servidor_negocia_el_formato(scraper):
+    servidor = ServidorMetricas(scraper.prometheus_metrics, '127.0.0.1', 0, logging.getLogger('prueba'))
+    servidor.iniciar()
+    base = f"http://127.0.0.1:{servidor.puerto}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics", timeout=5) as respuesta:
+            assert respuesta.headers['Content-Type'] == TIPO_PROMETHEUS
+            assert b'# EOF' not in respuesta.read()
+
+        peticion = urllib.request.Request(f"{base}/metrics",
+                                          headers={'Accept': 'application/openmetrics-text; version=1.0.0'})
+        with urllib.request.urlopen(peticion, timeout=5) as respuesta:
+            assert respuesta.headers['Content-Type'] == TIPO_OPENMETRICS
+            assert respuesta.read().endswith(b'# EOF\n')
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{base}/otra", timeout=5)
+        assert error.value.code == 404
+    finally:
+        servidor.detener()
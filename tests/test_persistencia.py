@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from html_scraper_mejorado import DiarioTrabajos, ManifiestoSalida
+
+
+URL = "https://sitio.com/pagina"
+
+
+# ManifiestoSalida
+
+def test_manifiesto_sin_cambios(tmp_path):
+    (tmp_path / "pagina.md").write_text("# Página", encoding="utf-8")
+    manifiesto = ManifiestoSalida(tmp_path, "config-1")
+    manifiesto.actualizar(URL, html_hash="h1", markdown_hash="m1", archivo="pagina.md")
+
+    assert manifiesto.sin_cambios(URL, "h1", "pagina.md") is not None
+    assert manifiesto.sin_cambios(URL, "h2", "pagina.md") is None
+    assert manifiesto.sin_cambios(URL, "h1", "otra.md") is None
+    assert manifiesto.markdown_sin_cambios(URL, "m1", "pagina.md")
+    assert not manifiesto.markdown_sin_cambios(URL, "m2", "pagina.md")
+
+
+def test_manifiesto_invalida_si_cambia_la_config_o_falta_el_archivo(tmp_path):
+    (tmp_path / "pagina.md").write_text("# Página", encoding="utf-8")
+    manifiesto = ManifiestoSalida(tmp_path, "config-1")
+    manifiesto.actualizar(URL, html_hash="h1", markdown_hash="m1", archivo="pagina.md")
+    manifiesto.guardar()
+
+    assert ManifiestoSalida(tmp_path, "config-2").sin_cambios(URL, "h1", "pagina.md") is None
+    (tmp_path / "pagina.md").unlink()
+    assert ManifiestoSalida(tmp_path, "config-1").sin_cambios(URL, "h1", "pagina.md") is None
+
+
+def test_manifiesto_guarda_solo_si_hay_cambios(tmp_path):
+    manifiesto = ManifiestoSalida(tmp_path, "config-1")
+    manifiesto.guardar()
+    assert not manifiesto.ruta.exists()
+
+    manifiesto.actualizar(URL, html_hash="h1", archivo="pagina.md")
+    manifiesto.guardar()
+    assert json.loads(manifiesto.ruta.read_text(encoding="utf-8"))[URL]["html_hash"] == "h1"
+
+
+def test_manifiesto_fusionar_conserva_entradas_de_otro_worker(tmp_path):
+    primero = ManifiestoSalida(tmp_path, "c")
+    segundo = ManifiestoSalida(tmp_path, "c")
+    primero.actualizar("https://a.com/", html_hash="a", archivo="a.md")
+    segundo.actualizar("https://b.com/", html_hash="b", archivo="b.md")
+
+    primero.guardar(fusionar=True)
+    segundo.guardar(fusionar=True)
+
+    assert set(ManifiestoSalida(tmp_path, "c").entradas) == {"https://a.com/", "https://b.com/"}
+
+
+def test_manifiesto_fragmentos_de_proceso(tmp_path):
+    ruta = ManifiestoSalida.ruta_fragmento(tmp_path, 1)
+    fragmento = ManifiestoSalida(tmp_path, "c", destino=ruta)
+    fragmento.actualizar(URL, html_hash="h1", archivo="pagina.md")
+    fragmento.guardar()
+
+    coordinador = ManifiestoSalida(tmp_path, "c")
+    assert coordinador.incorporar(ruta) == 1
+    assert not ruta.exists()
+    coordinador.guardar()
+    assert URL in ManifiestoSalida(tmp_path, "c").entradas
+
+
+# DiarioTrabajos
+
+def test_diario_vuelca_solo_el_ultimo_estado(tmp_path):
+    diario = DiarioTrabajos(tmp_path, lote=10)
+    diario.registrar(URL, "pendiente", indice=3)
+    diario.registrar(URL, "descargado")
+    diario.registrar(URL, "completado")
+
+    assert diario.volcar() == 1
+    assert diario.completada(URL)
+    assert diario.resumen() == {"completado": 1}
+    fila = diario._conexion.execute("SELECT indice FROM trabajos WHERE url = ?", (URL,)).fetchone()
+    assert fila == (3,)
+    diario.cerrar()
+
+
+def test_diario_cuenta_fallos_y_reanuda(tmp_path):
+    diario = DiarioTrabajos(tmp_path)
+    diario.registrar(URL, "fallido", error="timeout")
+    diario.volcar()
+    diario.registrar(URL, "fallido", error="timeout")
+    diario.cerrar()
+
+    reabierto = DiarioTrabajos(tmp_path)
+    fila = reabierto._conexion.execute("SELECT fallos, error FROM trabajos").fetchone()
+    assert fila == (2, "timeout")
+    assert not reabierto.completada(URL)
+    reabierto.reiniciar()
+    assert reabierto.resumen() == {}
+    reabierto.cerrar()
+
+
+def test_diario_debe_volcar_por_lote_o_intervalo(tmp_path):
+    diario = DiarioTrabajos(tmp_path, lote=2, intervalo_s=60)
+    assert not diario.debe_volcar()
+    diario.registrar("https://a.com/", "pendiente")
+    assert not diario.debe_volcar()
+    diario.registrar("https://b.com/", "pendiente")
+    assert diario.debe_volcar()
+
+    diario.volcar()
+    diario.intervalo_s = 0
+    diario.registrar("https://c.com/", "pendiente")
+    assert diario.debe_volcar()
+    diario.cerrar()
+
+
+def test_diario_conserva_el_lote_si_otro_proceso_bloquea_la_escritura(tmp_path):
+    diario = DiarioTrabajos(tmp_path, timeout_s=0.3)
+    diario.registrar(URL, "pendiente", indice=3)
+    bloqueo = sqlite3.connect(str(diario.ruta), isolation_level=None)
+    bloqueo.execute("BEGIN IMMEDIATE")
+
+    errores = []
+
+    def volcar():
+        try:
+            diario.volcar()
+        except sqlite3.OperationalError as e:
+            errores.append(e)
+
+    hilo = threading.Thread(target=volcar)
+    hilo.start()
+    time.sleep(0.05)
+    # Mientras el volcado espera, registrar y consultar no se bloquean
+    inicio = time.monotonic()
+    diario.registrar(URL, "completado")
+    assert diario.completada(URL)
+    assert time.monotonic() - inicio < 0.1
+    hilo.join()
+    bloqueo.rollback()
+    bloqueo.close()
+
+    assert errores and "locked" in str(errores[0])
+    # El estado más reciente gana y conserva el índice del lote fallido
+    assert diario.volcar() == 1
+    fila = diario._conexion.execute("SELECT estado, indice FROM trabajos WHERE url = ?", (URL,)).fetchone()
+    assert fila == ("completado", 3)
+    diario.cerrar()
+
+
+def test_diario_volcado_fallido_se_reintenta(tmp_path):
+    diario = DiarioTrabajos(tmp_path, timeout_s=0.05)
+    diario.registrar(URL, "completado", indice=1)
+    bloqueo = sqlite3.connect(str(diario.ruta), isolation_level=None)
+    bloqueo.execute("BEGIN IMMEDIATE")
+
+    with pytest.raises(sqlite3.OperationalError):
+        diario.volcar()
+    bloqueo.rollback()
+    bloqueo.close()
+
+    assert diario.volcar() == 1
+    diario.cerrar()
+    reabierto = DiarioTrabajos(tmp_path)
+    assert reabierto.completada(URL)
+    reabierto.cerrar()
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from html_scraper_mejorado import PlanificadorHosts
+
+
+def sin_limite(maximo: int = 1):
+    return lambda host: (0.0, 1, maximo)
+
+
+def test_turno_rotatorio_entre_hosts():
+    async def escenario():
+        planificador = PlanificadorHosts(sin_limite(maximo=1), capacidad=10)
+        await planificador.put('a1', 'a')
+        await planificador.put('a2', 'a')
+        await planificador.put('b1', 'b')
+
+        primero = await planificador.get()
+        segundo = await planificador.get()
+        await planificador.release('a')
+        tercero = await planificador.get()
+        return [primero, segundo, tercero]
+
+    assert asyncio.run(escenario()) == ['a1', 'b1', 'a2']
+
+
+def test_limite_de_peticiones_simultaneas_por_host():
+    async def escenario():
+        planificador = PlanificadorHosts(sin_limite(maximo=1), capacidad=10)
+        await planificador.put('a1', 'a')
+        await planificador.put('a2', 'a')
+        await planificador.get()
+        try:
+            await asyncio.wait_for(planificador.get(), 0.1)
+        except asyncio.TimeoutError:
+            bloqueado = True
+        else:
+            bloqueado = False
+        await planificador.release('a')
+        return bloqueado, await asyncio.wait_for(planificador.get(), 1)
+
+    assert asyncio.run(escenario()) == (True, 'a2')
+
+
+def test_token_bucket_espacia_las_peticiones():
+    async def escenario():
+        planificador = PlanificadorHosts(lambda host: (10.0, 1, 5), capacidad=10)
+        for elemento in range(3):
+            await planificador.put(elemento, 'lento')
+        inicio = time.monotonic()
+        for _ in range(3):
+            await planificador.get()
+        return time.monotonic() - inicio
+
+    # Ráfaga de 1 y 10 peticiones/s: la 2ª y la 3ª esperan 0,1 s cada una
+    assert asyncio.run(escenario()) >= 0.18
+
+
+def test_put_later_retrasa_el_elemento():
+    async def escenario():
+        planificador = PlanificadorHosts(sin_limite(), capacidad=10)
+        await planificador.put_later('reintento', 'a', 0.1)
+        assert planificador.qsize() == 1
+        inicio = time.monotonic()
+        elemento = await planificador.get()
+        return elemento, time.monotonic() - inicio
+
+    elemento, espera = asyncio.run(escenario())
+    assert elemento == 'reintento'
+    assert espera >= 0.09
+
+
+def test_get_retorna_none_al_cerrar_sin_trabajo():
+    async def escenario():
+        planificador = PlanificadorHosts(sin_limite(), capacidad=10)
+        await planificador.put('a1', 'a')
+        await planificador.close()
+        elemento = await planificador.get()
+        await planificador.release('a')
+        return elemento, await asyncio.wait_for(planificador.get(), 1)
+
+    assert asyncio.run(escenario()) == ('a1', None)
+
+
+def test_put_espera_si_el_planificador_esta_lleno():
+    async def escenario():
+        planificador = PlanificadorHosts(sin_limite(maximo=5), capacidad=1)
+        await planificador.put('a1', 'a')
+        bloqueado = asyncio.create_task(planificador.put('a2', 'a'))
+        await asyncio.sleep(0.05)
+        lleno = not bloqueado.done()
+        await planificador.get()
+        await asyncio.wait_for(bloqueado, 1)
+        return lleno, planificador.qsize()
+
+    assert asyncio.run(escenario()) == (True, 1)
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from bson.errors import InvalidDocument  # noqa: E402
+from pymongo.errors import BulkWriteError, PyMongoError  # noqa: E402
+
+
+def test_status_cursor_round_trip():
+    timestamp = datetime(2026, 10, 17, 3, 28, 28, 123456)
+    cursor = server.encode_status_cursor({"timestamp": timestamp, "id": "abc"})
+
+    assert server.decode_status_cursor(cursor) == {"$or": [
+        {"timestamp": {"$gt": timestamp}},
+        {"timestamp": timestamp, "id": {"$gt": "abc"}},
+    ]}
+
+
+def test_status_cursor_is_url_safe():
+    cursor = server.encode_status_cursor({"timestamp": datetime(2026, 1, 1), "id": "?/+" * 10})
+
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24=", "WyJub3QgYSBkYXRlIiwgImEiXQ==", "WzFd"])
+def test_invalid_status_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        server.decode_status_cursor(cursor)
+
+    assert error.value.status_code == 400
+
+
+def test_pool_without_config_file_is_unavailable(tmp_path):
+    pool = server.ScrapeWorkerPool(str(tmp_path / "missing.json"), workers=1, retention=10,
+                                   allow_file_urls=False)
+
+    asyncio.run(pool.start())
+
+    assert not pool.available
+    assert "missing.json" in pool.error
+    with pytest.raises(HTTPException) as error:
+        pool.submit(["https://example.com/"])
+    assert error.value.status_code == 503
+
+
+def test_job_and_metrics_endpoints_answer_503_before_start():
+    assert not server.scrape_pool.available
+
+    for call in (server.scraper_metrics(None), server.get_scrape_job("x"), server.cancel_scrape_job("x")):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(call)
+        assert error.value.status_code == 503
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+
+def read_status_checks(monkeypatch, count, **params):
+    documents = [{"id": f"id{i}", "client_name": "c", "timestamp": datetime(2026, 1, 1, 0, 0, i)}
+                 for i in range(count)]
+    fake_db = type("FakeDb", (), {})()
+    fake_db.status_checks = type("FakeCollection", (), {"find": lambda self, *a: FakeCursor(documents)})()
+    monkeypatch.setattr(server, "db", fake_db)
+
+    async def read():
+        response = await server.get_status_checks(**{"limit": None, "cursor": None, "paginate": False, **params})
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    return json.loads(asyncio.run(read()))
+
+
+def test_status_checks_keep_the_list_shape_by_default(monkeypatch):
+    body = read_status_checks(monkeypatch, 3)
+
+    assert [status_check["id"] for status_check in body] == ["id0", "id1", "id2"]
+    assert body[0]["timestamp"] == "2026-01-01T00:00:00"
+
+
+def test_status_checks_paginate_on_request(monkeypatch):
+    body = read_status_checks(monkeypatch, 3, limit=2, paginate=True)
+
+    assert [status_check["id"] for status_check in body["items"]] == ["id0", "id1"]
+    assert server.decode_status_cursor(body["next_cursor"])["$or"][1]["id"] == {"$gt": "id1"}
+    assert read_status_checks(monkeypatch, 2, limit=2, paginate=True)["next_cursor"] is None
+
+
+class FakeCollection:
+    """Async stand-in for a motor collection that records each insert_many."""
+
+    def __init__(self, rejected=(), delay_s=0.0, errors=()):
+        self.rejected = set(rejected)
+        self.delay_s = delay_s
+        self.errors = list(errors)
+        self.batches = []
+        self.stored = []
+        self.inserting = asyncio.Event()
+
+    def with_options(self, write_concern):
+        return self
+
+    async def insert_many(self, documents, ordered):
+        self.batches.append(len(documents))
+        self.inserting.set()
+        await asyncio.sleep(self.delay_s)
+        if self.errors:
+            raise self.errors.pop(0)
+        errors = [{"index": index, "code": 11000} for index in range(len(documents)) if index in self.rejected]
+        self.stored += [document for index, document in enumerate(documents) if index not in self.rejected]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": []})
+
+
+def run_buffer(collection, scenario, **options):
+    async def run():
+        buffer = server.WriteBehindBuffer(collection, **options)
+        buffer.start()
+        try:
+            return await scenario(buffer)
+        finally:
+            await buffer.close()
+
+    return asyncio.run(run())
+
+
+def test_write_behind_flushes_a_full_batch_without_waiting():
+    collection = FakeCollection()
+
+    async def scenario(buffer):
+        await asyncio.wait_for(asyncio.gather(*(buffer.add({"n": n}) for n in range(3))), 1)
+
+    run_buffer(collection, scenario, max_batch=3, max_delay_s=60)
+
+    assert collection.batches == [3]
+
+
+def test_write_behind_flushes_after_the_delay():
+    collection = FakeCollection()
+
+    async def scenario(buffer):
+        start = time.monotonic()
+        await asyncio.wait_for(buffer.add({"n": 1}), 1)
+        return time.monotonic() - start
+
+    assert run_buffer(collection, scenario, max_batch=100, max_delay_s=0.05) >= 0.04
+    assert collection.batches == [1]
+
+
+def test_write_behind_writes_at_once_and_coalesces_during_an_insert():
+    collection = FakeCollection(delay_s=0.05)
+
+    async def scenario(buffer):
+        start = time.monotonic()
+        first = asyncio.create_task(buffer.add({"n": 0}))
+        await collection.inserting.wait()
+        waited = time.monotonic() - start
+        # These arrive while the first insert is in flight and share the next one
+        await asyncio.wait_for(asyncio.gather(first, *(buffer.add({"n": n}) for n in range(1, 4))), 1)
+        return waited
+
+    assert run_buffer(collection, scenario) < 0.02
+    assert collection.batches == [1, 3]
+
+
+def test_write_behind_fails_only_rejected_documents():
+    collection = FakeCollection(rejected={1})
+
+    async def scenario(buffer):
+        return await asyncio.gather(*(buffer.add({"n": n}) for n in range(3)), return_exceptions=True)
+
+    outcomes = run_buffer(collection, scenario, max_batch=3, max_delay_s=60)
+
+    assert outcomes[0] is None and outcomes[2] is None
+    assert isinstance(outcomes[1], BulkWriteError)
+    assert collection.stored == [{"n": 0}, {"n": 2}]
+
+
+def test_write_behind_survives_unexpected_errors():
+    collection = FakeCollection(errors=[InvalidDocument("cannot encode object")])
+
+    async def scenario(buffer):
+        with pytest.raises(InvalidDocument):
+            await asyncio.wait_for(buffer.add({"n": 1}), 1)
+        # The flush loop is still running
+        await asyncio.wait_for(buffer.add({"n": 2}), 1)
+
+    run_buffer(collection, scenario, max_batch=10, max_delay_s=0.01)
+
+    assert collection.stored == [{"n": 2}]
+
+
+def test_write_behind_close_lets_the_insert_in_progress_finish():
+    collection = FakeCollection(delay_s=0.1)
+
+    async def scenario(buffer):
+        adds = [asyncio.create_task(buffer.add({"n": n})) for n in range(2)]
+        await collection.inserting.wait()
+        await buffer.close()
+        with pytest.raises(PyMongoError):
+            await buffer.add({"n": 2})
+        return await asyncio.wait_for(asyncio.gather(*adds), 1)
+
+    assert run_buffer(collection, scenario, max_batch=10, max_delay_s=0) == [None, None]
+    assert collection.stored == [{"n": 0}, {"n": 1}]
+
+
+def test_write_behind_cancelled_close_fails_unwritten_documents():
+    collection = FakeCollection(delay_s=10)
+
+    async def scenario(buffer):
+        adds = [asyncio.create_task(buffer.add({"n": n})) for n in range(2)]
+        await collection.inserting.wait()
+        closing = asyncio.create_task(buffer.close())
+        await asyncio.sleep(0.01)
+        closing.cancel()
+        return await asyncio.wait_for(asyncio.gather(*adds, return_exceptions=True), 1)
+
+    outcomes = run_buffer(collection, scenario, max_batch=10, max_delay_s=0)
+
+    assert all(isinstance(outcome, PyMongoError) for outcome in outcomes)
+
+
+def finished_job(pool, markdown):
+    job = server.ScrapeJob(total=1, results=[server.ScrapeResult(url="https://example.com/")],
+                           finished_at=datetime.utcnow())
+    job.results[0].markdown = markdown
+    pool.jobs[job.id] = job
+    pool.stored_chars += len(markdown)
+    return job
+
+
+def test_finished_jobs_are_evicted_by_stored_markdown():
+    pool = server.ScrapeWorkerPool(None, workers=1, retention=100, allow_file_urls=False, retention_chars=25)
+    first, second, third = (finished_job(pool, "x" * 10) for _ in range(3))
+    running = server.ScrapeJob(total=1, results=[server.ScrapeResult(url="https://example.com/")])
+    pool.jobs[running.id] = running
+
+    pool._evict_finished()
+
+    assert list(pool.jobs) == [second.id, third.id, running.id]
+    assert pool.stored_chars == 20
+
+
+def test_job_size_is_capped():
+    with pytest.raises(ValueError):
+        server.ScrapeJobCreate(urls=["https://example.com/"] * (server.MAX_URLS_PER_JOB + 1))